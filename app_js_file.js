@@ -222,45 +222,78 @@ async function sendToPython() {
         
         let allExtractedTexts = [];
         
-        for (let i = 0; i < uploadedFiles.length; i++) {
-            const file = uploadedFiles[i];
-            const formData = new FormData();
-            formData.append('file', file);
-            formData.append('filename', file.name);
-
-            console.log(`📤 Sending file ${i + 1}/${uploadedFiles.length}: ${file.name}`);
-
-            const response = await fetch('https://text-recognition-2.onrender.com/upload', {
-                method: 'POST',
-                body: formData
-            });
+        // Send every file in one batch request; the server streams back
+        // one JSON line per file as soon as that file is done
+        const formData = new FormData();
+        uploadedFiles.forEach(file => formData.append('files', file, file.name));
+
+        console.log(`📤 Sending ${uploadedFiles.length} file(s) in one batch`);
+
+        const response = await fetch('https://text-recognition-2.onrender.com/upload_batch', {
+            method: 'POST',
+            body: formData
+        });
+        
+        if (!response.ok) {
+            const errorText = await response.text();
+            console.error('❌ Server error for batch:', response.status, errorText);
+            throw new Error(`Failed to process files: ${response.status} - ${errorText}`);
+        }
+        
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffered = '';
+        
+        const handleLine = (line) => {
+            if (!line.trim()) return;
+            const result = JSON.parse(line);
             
-            if (response.ok) {
-                const result = await response.json();
-                console.log(`✅ File ${i + 1} processed successfully:`, result);
+            if (result.summary) {
+                console.log('📦 Batch summary:', result.summary);
+                return;
+            }
+            
+            const file = uploadedFiles[result.index];
+            const fileName = file ? file.name : result.original_name;
+            
+            if (result.error) {
+                console.error(`❌ Server error for ${fileName}:`, result.error);
+                return;
+            }
+            
+            console.log(`✅ File ${result.index + 1} processed successfully:`, result);
+            
+            // Check if we have extracted_text in the response
+            if (result.extracted_text) {
+                console.log('📝 Found extracted text for', fileName);
+                allExtractedTexts.push({
+                    filename: fileName,
+                    textData: result.extracted_text
+                });
                 
-                // Check if we have extracted_text in the response
-                if (result.extracted_text) {
-                    console.log('📝 Found extracted text for', file.name);
-                    allExtractedTexts.push({
-                        filename: file.name,
-                        textData: result.extracted_text
-                    });
-                } else {
-                    console.warn('⚠️ No extracted_text in response for', file.name);
+                // Show the first result as soon as it arrives
+                if (allExtractedTexts.length === 1) {
+                    displayExtractedText(result.extracted_text, fileName);
                 }
             } else {
-                const errorText = await response.text();
-                console.error(`❌ Server error for ${file.name}:`, response.status, errorText);
-                throw new Error(`Failed to process ${file.name}: ${response.status} - ${errorText}`);
+                console.warn('⚠️ No extracted_text in response for', fileName);
             }
+        };
+        
+        while (true) {
+            const { done, value } = await reader.read();
+            if (done) break;
+            buffered += decoder.decode(value, { stream: true });
+            const lines = buffered.split('\n');
+            buffered = lines.pop();
+            lines.forEach(handleLine);
         }
+        handleLine(buffered);
         
         hideProcessing();
         
         if (allExtractedTexts.length > 0) {
-            // Display the first extracted text result
-            displayExtractedText(allExtractedTexts[0].textData, allExtractedTexts[0].filename);
+            // The first extracted text result is already displayed
             showSuccess(`Successfully processed ${uploadedFiles.length} files! Text and translation from first file are displayed below.`);
         } else {
             showError('No text could be extracted from the uploaded files.');
@@ -0,0 +1,420 @@
+"""OCR pipeline benchmark on a synthetic, fully offline image corpus.
+
+Renders label-like test images with PIL (varied fonts, sizes, noise, blur,
+rotation and resolutions up to the 16MB upload limit) with known ground
+truth, then measures per-stage latency, throughput per core, peak memory
+and character accuracy of every OCR variant. Results are written as JSON
+so runs can be compared across commits:
+
+    python benchmark.py --output bench.json
+    python benchmark.py --output new.json --compare bench.json
+
+It also times a cold `import server` in fresh interpreters and exits
+non-zero when that exceeds --import-budget, so startup regressions from
+eager heavy imports fail the run.
+
+Multi-target translation is timed against a local LibreTranslate-compatible
+stand-in server with a fixed per-call latency: three languages one after
+another versus fanned out, and how many connections that took.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, REPO_DIR)
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+PHRASES = [
+    "Paracetamol Tablets BP 500 mg",
+    "Albendazole Oral Suspension",
+    "Each tablet contains Amoxicillin 250 mg",
+    "Store below 30C in a dry place",
+    "Keep out of reach of children",
+    "Ketoconazole Cream 2 percent",
+    "Batch No 24A117 Exp 06 2027",
+    "For external use only",
+    "Rhinil Cold Syrup 100 ml",
+    "Shake well before use",
+]
+
+FONT_PATHS = [
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSerif.ttf",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSansMono.ttf",
+    "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
+    "/Library/Fonts/Arial.ttf",
+    r"C:\Windows\Fonts\arial.ttf",
+]
+
+# (name, canvas size, font size, noise sigma, blur radius, rotation degrees)
+PROFILES = [
+    ("clean_small", (800, 400), 28, 0, 0, 0),
+    ("clean_phone", (3000, 2000), 90, 4, 0, 0),
+    ("noisy", (1600, 1000), 40, 18, 0, 0),
+    ("blurred", (1600, 1000), 44, 4, 1.2, 0),
+    ("rotated", (1600, 1000), 44, 4, 0, 4),
+    ("tiny_text", (900, 500), 13, 2, 0, 0),
+    ("sparse_photo", (4000, 3000), 80, 8, 0, 0),
+    ("max_upload", (5600, 4200), 120, 10, 0, 0),
+]
+
+def available_fonts():
+    fonts = [path for path in FONT_PATHS if os.path.exists(path)]
+    return fonts or [None]  # None: Pillow's built-in scalable font
+
+def load_font(path, size):
+    if path is None:
+        return ImageFont.load_default(size=size)
+    return ImageFont.truetype(path, size)
+
+def render_sample(rng, profile, font_path, max_bytes):
+    """Render one JPEG; returns (jpeg bytes, ground-truth text)"""
+    name, (width, height), font_size, noise, blur, rotation = profile
+    lines = rng.sample(PHRASES, 3)
+    truth = "\n".join(lines)
+
+    background = rng.randint(215, 245)
+    img = Image.new('L', (width, height), background)
+    draw = ImageDraw.Draw(img)
+    font = load_font(font_path, font_size)
+    if name == "sparse_photo":
+        x, y = width // 10, height // 8  # one small label in a big frame
+    else:
+        x, y = rng.randint(10, max(10, width // 12)), rng.randint(10, max(10, height // 10))
+    draw.multiline_text((x, y), truth, fill=rng.randint(0, 50), font=font, spacing=font_size // 3)
+
+    if rotation:
+        img = img.rotate(rng.choice([-1, 1]) * rotation, expand=False, fillcolor=background,
+                         resample=Image.BICUBIC)
+    if blur:
+        img = img.filter(ImageFilter.GaussianBlur(blur))
+
+    pixels = np.asarray(img, dtype=np.float32)
+    if noise:
+        pixels = pixels + np.random.default_rng(rng.randint(0, 2 ** 31)).normal(0, noise, pixels.shape)
+    rgb = np.clip(np.stack([pixels, pixels * 0.98, pixels * 0.95], axis=-1), 0, 255).astype(np.uint8)
+
+    # Highest quality that still fits the upload limit
+    for quality in (95, 90, 85, 75, 60):
+        buffer = io.BytesIO()
+        Image.fromarray(rgb).save(buffer, 'JPEG', quality=quality)
+        if buffer.tell() <= max_bytes:
+            break
+    return buffer.getvalue(), truth
+
+def build_corpus(count, seed, max_bytes):
+    """Deterministic list of samples cycling through every profile and font"""
+    rng = random.Random(seed)
+    fonts = available_fonts()
+    corpus = []
+    for i in range(count):
+        profile = PROFILES[i % len(PROFILES)]
+        font_path = fonts[(i // len(PROFILES)) % len(fonts)]
+        data, truth = render_sample(rng, profile, font_path, max_bytes)
+        corpus.append({
+            'id': i,
+            'profile': profile[0],
+            'font': os.path.basename(font_path) if font_path else 'default',
+            'bytes': len(data),
+            'data': data,
+            'truth': truth
+        })
+    return corpus
+
+def edit_distance(a, b):
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+def char_accuracy(predicted, truth):
+    """1 - normalized edit distance, ignoring whitespace layout differences"""
+    predicted = " ".join((predicted or "").split())
+    truth = " ".join(truth.split())
+    if predicted.startswith("Error"):
+        predicted = ""
+    return max(0.0, 1 - edit_distance(predicted, truth) / max(len(truth), 1))
+
+def summarize(values):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return {
+        'mean': round(statistics.fmean(ordered), 4),
+        'p50': round(ordered[len(ordered) // 2], 4),
+        'p95': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 4),
+        'max': round(ordered[-1], 4)
+    }
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def preprocess_frame(engine, frames, preparations):
+    """Build every preparation of one frame, an engine pass per source buffer"""
+    for source, frame in frames.items():
+        engine.run(frame, [name for name in preparations if engine.source(name) == source])
+
+def measure_import_time(runs=5):
+    """Median seconds for a cold `import server` in a fresh interpreter"""
+    code = ("import sys, time; sys.path.insert(0, %r); start = time.perf_counter(); "
+            "import server; print(time.perf_counter() - start)" % REPO_DIR)
+    env = dict(os.environ, LOG_LEVEL='WARNING')
+    timings = []
+    for _ in range(runs):
+        output = subprocess.check_output([sys.executable, '-c', code], env=env, text=True)
+        timings.append(float(output.strip().splitlines()[-1]))
+    return statistics.median(timings)
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=REPO_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+def start_translation_stand_in(latency):
+    """LibreTranslate-compatible server on a free local port that tags text with the target language
+
+    `latency` is the seconds every call takes, or a {target: seconds} map.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # keep-alive, like the real service
+
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            time.sleep(latency.get(payload['target'], 0) if isinstance(latency, dict) else latency)
+            texts = payload['q'] if isinstance(payload['q'], list) else [payload['q']]
+            body = json.dumps({
+                'translatedText': [f"[{payload['target']}] {text}" for text in texts],
+                'detectedLanguage': [{'language': 'en', 'confidence': 90.0}] * len(texts)
+            }).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd
+
+def benchmark_translation(server, targets, latency, record):
+    """Sequential versus concurrent multi-target translation of PHRASES against the stand-in"""
+    httpd = start_translation_stand_in(latency)
+    backend = server.LibreTranslateBackend(f"http://127.0.0.1:{httpd.server_address[1]}/translate")
+    translator = server.CachedTranslator(backend, max_entries=0)  # every call goes upstream
+    try:
+        for phrase in PHRASES:
+            _, seconds = timed(lambda: [translator.translate(phrase, dest) for dest in targets])
+            record('translate_sequential', seconds)
+            outcomes, seconds = timed(translator.translate_many, phrase, targets)
+            record('translate_concurrent', seconds)
+            failed = [dest for dest, outcome in outcomes.items() if isinstance(outcome, Exception)]
+            if failed:
+                print(f"  ❌ {phrase!r}: no translation to {', '.join(failed)}")
+        return {'targets': targets, 'stand_in_latency_seconds': latency, **backend.stats()}
+    finally:
+        backend.close()
+        httpd.shutdown()
+
+def run_benchmark(args):
+    import_seconds = measure_import_time()
+    print(f"⏱️  Cold import of server.py: {import_seconds * 1000:.0f}ms (budget {args.import_budget * 1000:.0f}ms)")
+
+    import server
+
+    print(f"🎨 Rendering {args.count} synthetic image(s) (seed {args.seed})...")
+    corpus = build_corpus(args.count, args.seed, server.MAX_FILE_SIZE)
+    variants = [v for v in server.OCR_VARIANTS if not args.variants or v[0] in args.variants]
+    preparations = sorted({preparation for _, preparation, *_ in variants if preparation != 'rgb'})
+
+    server.get_ocr_backend()
+    server.test_tesseract()  # warm-up: pool threads and Tesseract handles
+
+    stages = {}
+    accuracy = {variant[0]: [] for variant in variants}
+    accuracy['pipeline'] = []
+    per_profile = {}
+
+    def record(stage, seconds):
+        stages.setdefault(stage, []).append(seconds)
+
+    # Per-stage latency and per-variant accuracy
+    for sample in corpus:
+        image, seconds = timed(server.DecodedImage.from_bytes, sample['data'])
+        record('open_and_hash', seconds)
+        _, seconds = timed(image.gray)
+        record('decode_and_normalize', seconds)
+        regions, seconds = timed(image.text_regions)
+        record('region_detection', seconds)
+        frames = {'gray': image.gray(), 'rgb': image.rgb()}
+        _, seconds = timed(preprocess_frame, server.preprocessing, frames, preparations)
+        record('preprocess_full_frame', seconds)
+
+        for variant in variants:
+            [(method, text, *_)], seconds = timed(server.run_ocr_variants, image, [variant])
+            record(f'ocr:{method}', seconds)
+            accuracy[method].append(char_accuracy(text, sample['truth']))
+
+        result, seconds = timed(server.extract_text_from_image, server.DecodedImage.from_bytes(sample['data']))
+        record('extract_text_from_image', seconds)
+        score = char_accuracy(result.get('best_text'), sample['truth'])
+        accuracy['pipeline'].append(score)
+        per_profile.setdefault(sample['profile'], {'latency': [], 'accuracy': []})
+        per_profile[sample['profile']]['latency'].append(seconds)
+        per_profile[sample['profile']]['accuracy'].append(score)
+        print(f"  #{sample['id']:3d} {sample['profile']:<13} {sample['bytes'] / 1e6:5.1f}MB "
+              f"{seconds * 1000:7.0f}ms acc {score:.3f} via {result.get('method_used')}"
+              f"{f' ({len(regions)} regions)' if regions else ''}")
+
+    # Throughput: the whole corpus back to back through the pipeline
+    start = time.perf_counter()
+    for sample in corpus:
+        server.extract_text_from_image(server.DecodedImage.from_bytes(sample['data']))
+    wall = time.perf_counter() - start
+    images_per_second = len(corpus) / wall if wall else 0.0
+
+    # End-to-end HTTP path with the stub translator
+    if not args.skip_upload:
+        client = server.app.test_client()
+        for sample in corpus:
+            response, seconds = timed(client.post, '/upload', content_type='multipart/form-data',
+                                      data={'file': (io.BytesIO(sample['data']), f"bench_{sample['id']}.jpg")})
+            if response.status_code == 200:
+                record('upload_endpoint', seconds)
+
+    translation = None
+    if not args.skip_translation:
+        translation = benchmark_translation(server, ['bn', 'hi', 'en'], args.translation_latency, record)
+        print(f"🌐 {len(PHRASES)} phrase(s) x {len(translation['targets'])} language(s): "
+              f"{translation['requests']} upstream call(s) over {translation['connections_opened']} connection(s)")
+
+    # Peak Python-side memory per image, measured separately so tracing doesn't skew timings
+    peaks = []
+    for sample in corpus:
+        tracemalloc.start()
+        server.extract_text_from_image(server.DecodedImage.from_bytes(sample['data']))
+        peaks.append(tracemalloc.get_traced_memory()[1] / (1024 * 1024))
+        tracemalloc.stop()
+
+    cores = os.cpu_count() or 1
+    return {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': cores,
+            'ocr_backend': server.get_ocr_backend(),
+            'tesseract': server.get_tesseract_version(),
+            'ocr_pool': f"{server.OCR_POOL_KIND} x {server.OCR_POOL_WORKERS}",
+            'ocr_schedule': server.OCR_SCHEDULE
+        },
+        'corpus': {
+            'count': len(corpus),
+            'seed': args.seed,
+            'profiles': sorted({sample['profile'] for sample in corpus}),
+            'total_megabytes': round(sum(sample['bytes'] for sample in corpus) / 1e6, 2)
+        },
+        'import_time': {
+            'seconds': round(import_seconds, 4),
+            'budget': args.import_budget,
+            'within_budget': import_seconds <= args.import_budget
+        },
+        'latency_seconds': {stage: summarize(values) for stage, values in stages.items()},
+        'translation': translation,
+        'throughput': {
+            'images_per_second': round(images_per_second, 3),
+            'images_per_second_per_core': round(images_per_second / cores, 3)
+        },
+        'memory_mb': {
+            'peak_traced_per_image': summarize(peaks),
+            'max_rss': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+        },
+        'accuracy': {name: summarize(values) for name, values in accuracy.items()},
+        'profiles': {
+            name: {'latency': summarize(values['latency']), 'accuracy': summarize(values['accuracy'])}
+            for name, values in sorted(per_profile.items())
+        }
+    }
+
+def compare(current, baseline):
+    """Print mean deltas of latency and accuracy against an earlier run"""
+    print(f"\n📈 Compared with {baseline.get('commit') or 'baseline'}:")
+    for section, better in (('latency_seconds', 'lower'), ('accuracy', 'higher')):
+        for name, stats in current[section].items():
+            old = baseline.get(section, {}).get(name)
+            if not stats or not old:
+                continue
+            delta = stats['mean'] - old['mean']
+            change = f"{delta / old['mean'] * 100:+.1f}%" if old['mean'] else f"{delta:+.4f}"
+            print(f"  {section[:8]:<8} {name:<28} {old['mean']:9.4f} -> {stats['mean']:9.4f} ({change}, {better} is better)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--count', type=int, default=len(PROFILES) * 2, help='number of synthetic images')
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--output', default='bench_output.json', help='where to write the JSON results')
+    parser.add_argument('--compare', help='earlier results JSON to diff against')
+    parser.add_argument('--variants', nargs='*', help='only benchmark these OCR variants')
+    parser.add_argument('--skip-upload', action='store_true', help='skip the /upload endpoint stage')
+    parser.add_argument('--skip-translation', action='store_true', help='skip the multi-target translation stage')
+    parser.add_argument('--translation-latency', type=float, default=0.05,
+                        help='seconds the stand-in translation server takes per call')
+    parser.add_argument('--import-budget', type=float, default=0.5, help='max seconds for a cold import of server.py')
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output)
+    baseline_path = os.path.abspath(args.compare) if args.compare else None
+
+    # Everything runs offline: stub translator, no result cache, scratch upload
+    # folder. Set here rather than at import, so the tests can reuse the helpers
+    os.environ.setdefault('TRANSLATION_BACKEND', 'stub')
+    os.environ.setdefault('OCR_CACHE_SIZE', '0')
+    os.environ.pop('OCR_CACHE_DIR', None)
+    # The server writes uploads relative to the working directory
+    os.chdir(tempfile.mkdtemp(prefix='ocr-bench-'))
+    results = run_benchmark(args)
+
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"\n💾 Results written to {output}")
+    print(f"⚡ {results['throughput']['images_per_second']} images/sec "
+          f"({results['throughput']['images_per_second_per_core']} per core), "
+          f"pipeline accuracy {results['accuracy']['pipeline']['mean']}")
+
+    if baseline_path:
+        with open(baseline_path, encoding='utf-8') as f:
+            compare(results, json.load(f))
+
+    if not results['import_time']['within_budget']:
+        print(f"❌ Import took {results['import_time']['seconds']}s, over the {args.import_budget}s budget")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,274 @@
+"""Offline bulk OCR of a directory tree, without going through the HTTP server.
+
+Walks the tree for JPGs (and multi-page TIFF/PDF documents), runs the same
+extract_text_from_image and Bengali translation steps as /upload in a pool
+of worker processes, and appends one JSON line per file to --output:
+
+    python bulk_ocr.py /archive/labels --output labels.jsonl
+    python bulk_ocr.py /archive/labels --output labels.jsonl --fields best_text,translation
+    python bulk_ocr.py /archive/labels --output labels.jsonl --languages bn,hi,en
+
+Every finished file is also recorded in a manifest (--output plus
+`.manifest`) with its size and modification time. Rerunning the same
+command skips those files, so an interrupted backfill resumes where it
+stopped; files that changed since are done again. Results are written
+before their manifest entry, so a crash at the wrong moment can repeat a
+line in --output but never lose one.
+
+Ctrl-C stops handing out files and lets the ones in progress finish.
+"""
+import argparse
+import json
+import os
+import signal
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+# One OCR thread per worker process: the pool supplies the parallelism.
+# Per-image logging is left to the progress lines.
+os.environ.setdefault('OCR_POOL_WORKERS', '1')
+os.environ.setdefault('OMP_THREAD_LIMIT', '1')
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, REPO_DIR)
+
+from cpu_cores import available_cores  # noqa: E402
+
+def find_files(root, allowed):
+    """Files under `root` that `allowed(name)` accepts, in a stable order"""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if allowed(name):
+                yield os.path.join(dirpath, name)
+
+def trim_torn_line(path, chunk_size=64 * 1024):
+    """Cut off a partial last line left by a crash, reading only the end of the file"""
+    if not os.path.exists(path):
+        return
+    with open(path, 'rb+') as f:
+        end = f.seek(0, os.SEEK_END)
+        position = end
+        while position > 0:
+            start = max(0, position - chunk_size)
+            f.seek(start)
+            newline = f.read(position - start).rfind(b'\n')
+            if newline >= 0:
+                position = start + newline + 1
+                break
+            position = start
+        if position < end:
+            f.truncate(position)
+
+def read_jsonl(path):
+    """Parsed lines of a JSONL file, after trimming a torn last line"""
+    if not os.path.exists(path):
+        return []
+    trim_torn_line(path)
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def load_manifest(path, retry_errors=False):
+    """{path: (size, mtime)} of files a previous run already finished"""
+    done = {}
+    for entry in read_jsonl(path):
+        if entry['status'] == 'ok' or not retry_errors:
+            done[entry['path']] = (entry['size'], entry['mtime'])
+        else:
+            done.pop(entry['path'], None)
+    return done
+
+def file_stamp(path):
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime
+
+def init_worker():
+    # tesserocr can only be imported on the main thread, before the OCR pool starts
+    import server
+    server.get_ocr_backend()
+    # Ctrl-C goes to the whole process group; only the parent decides when to stop.
+    # Set after the import, which installs its own SIGINT handler
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+def ocr_file(path, translate=True, fields=None, languages=None):
+    """OCR (and translate) one file; runs in a worker process"""
+    import server
+
+    start = time.perf_counter()
+    size, mtime = file_stamp(path)
+    line = {'path': path, 'size': size, 'mtime': mtime}
+    try:
+        if server.is_document(path):
+            pages = []
+            for number, image in server.pipeline_document_pages(path):
+                extracted_text = server.extract_text_from_image(image)
+                if translate:
+                    server.translate_extracted_text(extracted_text, languages)
+                pages.append(server.select_fields({'page': number, 'extracted_text': extracted_text},
+                                                  fields, keep=('page',)))
+            line['pages'] = pages
+            failed = [page for page in pages if 'error' in page.get('extracted_text', {})]
+            if failed and len(failed) == len(pages):
+                line['error'] = failed[0]['extracted_text']['error']
+        else:
+            image = server.DecodedImage.from_path(path)
+            extracted_text = server.extract_text_from_image(image)
+            if translate:
+                server.translate_extracted_text(extracted_text, languages)
+            line.update({'sha256': image.sha256, 'width': image.width, 'height': image.height})
+            line['extracted_text'] = server.select_fields(extracted_text, fields)
+            if 'error' in extracted_text:
+                line['error'] = extracted_text['error']
+    except Exception as e:
+        line['error'] = str(e)
+    line['seconds'] = round(time.perf_counter() - start, 3)
+    return line
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
+
+class Progress:
+    """Periodic progress and throughput lines"""
+
+    def __init__(self, total, interval):
+        self.total = total
+        self.interval = interval
+        self.done = 0
+        self.errors = 0
+        self.ocr_seconds = 0.0
+        self.start = time.monotonic()
+        self.last_report = self.start
+
+    def record(self, line):
+        self.done += 1
+        self.errors += 'error' in line
+        self.ocr_seconds += line['seconds']
+        if time.monotonic() - self.last_report >= self.interval:
+            self.report()
+
+    def report(self, final=False):
+        self.last_report = time.monotonic()
+        elapsed = self.last_report - self.start
+        rate = self.done / elapsed if elapsed else 0.0
+        remaining = self.total - self.done
+        eta = f", ETA {format_duration(remaining / rate)}" if rate and remaining and not final else ''
+        percent = self.done / self.total * 100 if self.total else 100.0
+        print(f"{'🏁' if final else '📈'} {self.done}/{self.total} ({percent:.1f}%) in {format_duration(elapsed)}, "
+              f"{rate:.2f} files/sec, {self.ocr_seconds / self.done if self.done else 0:.2f}s per file"
+              f"{eta}, {self.errors} error(s)", flush=True)
+
+def run(args):
+    import server
+
+    output = args.output
+    manifest_path = args.manifest or f"{output}.manifest"
+    done = load_manifest(manifest_path, retry_errors=args.retry_errors)
+    trim_torn_line(output)
+
+    print(f"🔎 Scanning {args.root}...", flush=True)
+    pending = []
+    skipped = 0
+    for path in find_files(args.root, server.allowed_file):
+        if done.get(path) == file_stamp(path):
+            skipped += 1
+        else:
+            pending.append(path)
+    if args.limit:
+        pending = pending[:args.limit]
+    print(f"📂 {len(pending)} file(s) to process, {skipped} already done; "
+          f"{args.workers} worker(s), results to {output}", flush=True)
+    if not pending:
+        return 0
+
+    progress = Progress(len(pending), args.progress_interval)
+    fields = [field.strip() for field in args.fields.split(',')] if args.fields else None
+    languages = server.parse_target_languages(args.languages)
+    files = iter(pending)
+    interrupted = False
+
+    with open(output, 'a', encoding='utf-8') as out, \
+            open(manifest_path, 'a', encoding='utf-8') as manifest, \
+            ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker) as executor:
+
+        def submit_next():
+            path = next(files, None)
+            if path is not None:
+                running.add(executor.submit(ocr_file, path, not args.no_translate, fields, languages))
+
+        # A couple of files queued per worker keeps them busy without
+        # materializing a future for every file in the archive
+        running = set()
+        for _ in range(args.workers * 2):
+            submit_next()
+
+        while running:
+            try:
+                finished, running = wait(running, return_when=FIRST_COMPLETED)
+            except KeyboardInterrupt:
+                if interrupted:
+                    raise
+                interrupted = True
+                print(f"\n⏸️  Interrupted, finishing {len(running)} file(s) in progress "
+                      f"(Ctrl-C again to abort)", flush=True)
+                continue
+
+            for future in finished:
+                line = future.result()
+                out.write(json.dumps(line, ensure_ascii=False) + '\n')
+                out.flush()
+                manifest.write(json.dumps({
+                    'path': line['path'],
+                    'size': line['size'],
+                    'mtime': line['mtime'],
+                    'status': 'error' if 'error' in line else 'ok'
+                }) + '\n')
+                manifest.flush()
+                progress.record(line)
+                if 'error' in line:
+                    print(f"❌ {line['path']}: {line['error']}", flush=True)
+                if not interrupted:
+                    submit_next()
+
+        os.fsync(out.fileno())
+        os.fsync(manifest.fileno())
+
+    progress.report(final=True)
+    if interrupted:
+        print("⏹️  Stopped early; rerun the same command to resume", flush=True)
+        return 130
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('root', help='directory to walk for JPG, TIFF and PDF files')
+    parser.add_argument('--output', default='bulk_ocr.jsonl', help='JSONL file results are appended to')
+    parser.add_argument('--manifest', help='resume manifest (default: OUTPUT.manifest)')
+    parser.add_argument('--workers', type=int, default=available_cores(),
+                        help='OCR worker processes (default: the cores within the CPU quota)')
+    parser.add_argument('--fields', help='only keep these result fields, as /upload?fields= does')
+    parser.add_argument('--no-translate', action='store_true', help='skip the Bengali translation step')
+    parser.add_argument('--languages', help='comma-separated translation targets (default: bn)')
+    parser.add_argument('--retry-errors', action='store_true', help='redo files that failed in earlier runs')
+    parser.add_argument('--limit', type=int, help='process at most this many files this run')
+    parser.add_argument('--progress-interval', type=float, default=10, help='seconds between progress lines')
+    args = parser.parse_args()
+
+    args.root = os.path.abspath(args.root)
+    args.output = os.path.abspath(args.output)
+    if args.manifest:
+        args.manifest = os.path.abspath(args.manifest)
+
+    # The server module creates its upload folder relative to the working directory
+    os.chdir(tempfile.mkdtemp(prefix='bulk-ocr-'))
+    sys.exit(run(args))
+
+if __name__ == '__main__':
+    main()
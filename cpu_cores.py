@@ -0,0 +1,35 @@
+"""How many cores this process may use, for sizing worker pools
+
+Shared by gunicorn.conf.py, server.py's OCR pool and bulk_ocr.py, and
+kept free of heavy imports so each of them can load it early.
+"""
+import math
+import os
+
+
+def available_cores():
+    """Cores this process may run on: its CPU affinity, capped by a cgroup CPU quota
+
+    os.cpu_count() reports the host's cores even when the container is
+    limited to a few of them.
+    """
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count() or 1
+    quota = None
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:  # cgroup v2: "<quota> <period>" or "max <period>"
+            limit, period = f.read().split()[:2]
+            if limit != 'max':
+                quota = int(limit) / int(period)
+    except (OSError, ValueError):
+        try:
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_quota_us') as f:  # cgroup v1, -1 without a quota
+                limit = int(f.read())
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_period_us') as f:
+                period = int(f.read())
+            if limit > 0 and period > 0:
+                quota = limit / period
+        except (OSError, ValueError):
+            pass
+    if quota is not None:
+        cores = min(cores, max(1, math.ceil(quota)))
+    return cores
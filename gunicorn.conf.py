@@ -0,0 +1,73 @@
+"""Gunicorn settings for production serving
+
+    gunicorn -c gunicorn.conf.py "server:create_app()"
+
+Runs one worker process and scales with threads. Async jobs, the upload
+index, rate limits, request coalescing and the in-memory caches all live
+in the worker's memory, so with several workers a job polled on another
+worker is "not found", each worker allows the full rate, and the same
+image is OCRed once per worker. Recognition releases the GIL, so the
+worker's OCR pool already uses every core. WEB_CONCURRENCY > 1 still
+works, for stateless use only: each worker then gets an equal share of
+the cores. There is one OpenMP thread per recognition, so workers × OCR
+threads never exceeds the cores the container may use. Workers load the
+app after forking (no preload), because thread pools and Tesseract
+handles don't survive fork. Each worker warms up in create_app before it
+accepts requests.
+
+Environment: PORT, WEB_CONCURRENCY (workers, default 1), WEB_THREADS
+(requests in flight per worker), OCR_POOL_WORKERS (OCR threads per worker).
+"""
+import os
+import sys
+
+# Gunicorn execs this file by path; cpu_cores.py sits next to it
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from cpu_cores import available_cores  # noqa: E402
+
+cores = available_cores()
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+
+# Threads let slow clients, SSE streams and /metrics scrapes share the
+# worker without holding up its OCR; admission control bounds the OCR itself
+worker_class = 'gthread'
+threads = int(os.environ.get('WEB_THREADS', max(4, cores * 2)))
+
+# Split the cores between workers; inherited by the workers at fork
+os.environ.setdefault('OCR_POOL_WORKERS', str(max(1, cores // workers)))
+os.environ.setdefault('OMP_THREAD_LIMIT', '1')
+
+preload_app = False
+
+# A request may spend OCR_TOTAL_TIMEOUT in OCR plus translation time
+timeout = int(os.environ.get('WEB_TIMEOUT', 120))
+# SIGTERM: stop accepting, let in-flight requests and queued jobs finish
+graceful_timeout = int(os.environ.get('WEB_GRACEFUL_TIMEOUT', 90))
+keepalive = 5
+
+# Recycle workers now and then to bound memory growth from large images
+max_requests = int(os.environ.get('WEB_MAX_REQUESTS', 1000))
+max_requests_jitter = max_requests // 10
+
+accesslog = '-'
+
+
+def on_starting(server):
+    server.log.info(f"🚀 {workers} worker(s) x {threads} thread(s), "
+                    f"{os.environ['OCR_POOL_WORKERS']} OCR thread(s) per worker on {cores} core(s)")
+    if workers > 1:
+        server.log.warning(f"⚠️  {workers} workers don't share async jobs, the upload index or rate limits; "
+                           f"use WEB_CONCURRENCY=1 unless clients are stateless")
+
+
+def post_worker_init(worker):
+    # create_app() has already run the warm-up OCR at this point
+    worker.log.info(f"✅ Worker {worker.pid} ready")
+
+
+def worker_exit(server, worker):
+    app_module = sys.modules.get('server')
+    if app_module is not None:
+        app_module.shutdown()
@@ -1,59 +1,1016 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response
 from flask_cors import CORS
 import os
 from werkzeug.utils import secure_filename
-from PIL import Image, ImageEnhance, ImageFilter
+from PIL import Image, ImageDraw, ImageFont
+import io
 import json
+import copy
+import hashlib
+import re
+import uuid
+from collections import Counter
+from itertools import islice
 from datetime import datetime
-import pytesseract
-import cv2
-import numpy as np
-import sys
+import importlib
 import platform
-from googletrans import Translator
 import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, as_completed, TimeoutError as FuturesTimeoutError
+import threading
+import logging
+import random
+import math
+import queue
+import zlib
+import difflib
+import http.client
+from urllib.parse import urlsplit
+from contextlib import contextmanager
+from collections import OrderedDict
+
+from cpu_cores import available_cores
+
+# One OpenMP thread per recognition: the OCR pool already runs one
+# recognition per core, and libgomp reads this when Tesseract loads
+os.environ.setdefault('OMP_THREAD_LIMIT', '1')
+
+class LazyModule:
+    """Stands in for a module and imports it on first attribute access"""
+    
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+    
+    def load(self):
+        """Import the module now, on the calling thread; raises ImportError when it isn't installed"""
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return self._module
+    
+    def __getattr__(self, attr):
+        return getattr(self.load(), attr)
+
+# Heavy dependencies stay off the import path; the first request (or the
+# warm-up in create_app) loads them
+cv2 = LazyModule('cv2')
+np = LazyModule('numpy')
+pytesseract = LazyModule('pytesseract')
+pdfium = LazyModule('pypdfium2')  # optional: PDF rendering
+# Optional in-process Tesseract API. Its import installs signal handlers, which
+# only works on the main thread: get_ocr_backend() loads it, and create_app,
+# the __main__ block and the CLI tools call that before starting any threads
+tesserocr = LazyModule('tesserocr')
+
+try:
+    import brotli  # optional: br response encoding, gzip is used without it
+except ImportError:
+    brotli = None
 
 
 
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for frontend communication
+STARTED_AT = time.time()
 
 # Configuration
 UPLOAD_FOLDER = 'uploads'
-ALLOWED_EXTENSIONS = {'jpg', 'jpeg'}
+DOCUMENT_EXTENSIONS = {'tif', 'tiff', 'pdf'}
+ALLOWED_EXTENSIONS = {'jpg', 'jpeg'} | DOCUMENT_EXTENSIONS
 MAX_FILE_SIZE = 16 * 1024 * 1024  # 16MB
 
+# Multi-page documents (TIFF, PDF) are streamed to disk and OCRed one page at
+# a time, decoding the next page while the current one is OCRed
+DOCUMENT_MAX_BYTES = int(os.environ.get('DOCUMENT_MAX_BYTES', 256 * 1024 * 1024))  # 256MB
+DOCUMENT_MAX_PAGES = int(os.environ.get('DOCUMENT_MAX_PAGES', 500))
+DOCUMENT_PREFETCH_PAGES = int(os.environ.get('DOCUMENT_PREFETCH_PAGES', 1))  # decoded pages waiting for OCR
+PDF_RENDER_DPI = int(os.environ.get('PDF_RENDER_DPI', 300))
+
+# OCR worker pool: 'thread' or 'process'. Both Tesseract backends release the
+# GIL while recognizing, so threads are enough to keep every core busy;
+# 'process' also parallelizes the Python-side preprocessing. The pool
+# defaults to the cores this process may run on, within the container's
+# CPU quota.
+OCR_POOL_KIND = os.environ.get('OCR_POOL_KIND', 'thread')
+OCR_POOL_WORKERS = int(os.environ.get('OCR_POOL_WORKERS', available_cores()))
+OCR_VARIANT_TIMEOUT = float(os.environ.get('OCR_VARIANT_TIMEOUT', 30))  # seconds per variant
+OCR_TOTAL_TIMEOUT = float(os.environ.get('OCR_TOTAL_TIMEOUT', 60))  # seconds per image
+
+# OCR scheduling: 'early_exit' runs the most promising variant first and stops
+# when its confidence clears the threshold; 'all' always runs every variant
+OCR_SCHEDULE = os.environ.get('OCR_SCHEDULE', 'early_exit')
+OCR_CONFIDENCE_THRESHOLD = float(os.environ.get('OCR_CONFIDENCE_THRESHOLD', 80))  # 0-100
+OCR_ADAPTIVE_MIN_RUNS = int(os.environ.get('OCR_ADAPTIVE_MIN_RUNS', 20))  # runs before win rates reorder the plan
+
+# Resolution normalization: rescale so text lands near Tesseract's preferred
+# size, using JPEG draft (DCT-scaled) decoding when shrinking
+OCR_NORMALIZE = os.environ.get('OCR_NORMALIZE', '1') not in ('0', 'false', 'no')
+OCR_TARGET_TEXT_HEIGHT = float(os.environ.get('OCR_TARGET_TEXT_HEIGHT', 32))  # px, median glyph height
+OCR_MIN_TEXT_HEIGHT = float(os.environ.get('OCR_MIN_TEXT_HEIGHT', 14))  # px, upscale below this
+OCR_MAX_UPSCALE = 2.0
+OCR_PROBE_SIZE = 1200  # px, long side of the text-height probe
+
+# Text-region detection: OCR only the detected text blocks, as parallel tiles;
+# fall back to the whole frame when text covers most of it
+OCR_DETECT_REGIONS = os.environ.get('OCR_DETECT_REGIONS', '1') not in ('0', 'false', 'no')
+OCR_REGION_MAX_COVERAGE = float(os.environ.get('OCR_REGION_MAX_COVERAGE', 0.6))  # fraction of the frame
+OCR_MAX_REGIONS = int(os.environ.get('OCR_MAX_REGIONS', 24))
+# Edge blobs to consider before merging lines into blocks; busier frames
+# (noise, texture, dense print) go straight to whole-frame OCR
+OCR_MAX_REGION_CONTOURS = int(os.environ.get('OCR_MAX_REGION_CONTOURS', OCR_MAX_REGIONS * 10))
+# Region OCR that reads fewer letters and digits per region than this, or
+# is less confident, is checked against the whole frame
+OCR_REGION_MIN_CHARS = int(os.environ.get('OCR_REGION_MIN_CHARS', 3))
+OCR_REGION_MIN_CONFIDENCE = float(os.environ.get('OCR_REGION_MIN_CONFIDENCE', 50))  # 0-100
+
+# OCR backend: 'tesserocr' keeps warm in-process Tesseract handles,
+# 'pytesseract' starts a tesseract subprocess per call, 'auto' prefers tesserocr
+OCR_BACKEND = os.environ.get('OCR_BACKEND', 'auto')
+OCR_LANG = os.environ.get('OCR_LANG', 'eng')
+TESSDATA_PATH = os.environ.get('TESSDATA_PREFIX')
+
+# Orientation and script detection (Tesseract OSD): turns sideways or upside
+# down images upright, picks the traineddata for the detected script and runs
+# one targeted variant (no ASCII whitelist, PSM by layout). 'fallback' runs it
+# only when the first planned variant isn't confident, 'prepass' before any
+# OCR on every image (~150-250ms each), 'off' never
+OCR_OSD = os.environ.get('OCR_OSD', 'fallback')
+OCR_OSD_MIN_CONFIDENCE = float(os.environ.get('OCR_OSD_MIN_CONFIDENCE', 2.0))
+OCR_OSD_MAX_SIDE = 1600  # px, long side of the OSD input; smaller text stops being detected
+# Detected script -> Tesseract languages (script:lang+lang,...); Latin and
+# scripts without installed traineddata are read with OCR_LANG
+OCR_SCRIPT_LANGS = dict(item.split(':', 1) for item in os.environ.get(
+    'OCR_SCRIPT_LANGS',
+    'Bengali:ben+eng,Devanagari:hin+eng,Arabic:ara,Cyrillic:rus,Han:chi_sim,'
+    'Japanese:jpn,Hangul:kor,Greek:ell,Thai:tha,Tamil:tam'
+).split(',') if ':' in item)
+
+# OCR result cache: in-memory LRU entries, plus an optional on-disk tier
+OCR_CACHE_SIZE = int(os.environ.get('OCR_CACHE_SIZE', 256))
+OCR_CACHE_DIR = os.environ.get('OCR_CACHE_DIR') or None
+
+# Near-duplicate reuse: a perceptual hash of a small grayscale thumbnail finds
+# cached results for re-encoded or re-photographed copies of an image.
+# 'verify' re-reads the copy with the matched result's best variant and reuses
+# the result only when the texts agree (matches read by a single variant are
+# just OCRed: verifying would cost as much), 'reuse' trusts the hash, 'off' disables.
+# Re-encodes and rescales land within ~15 bits, unrelated labels 80+ apart, but
+# labels differing in one character hash alike: 'reuse' would hand them the
+# same text, so it only suits known re-uploads
+NEAR_DUPLICATE_MODE = os.environ.get('NEAR_DUPLICATE_MODE', 'verify')
+NEAR_DUPLICATE_MAX_DISTANCE = int(os.environ.get('NEAR_DUPLICATE_MAX_DISTANCE', 16))  # differing bits of PHASH_BITS
+# 'verify' text agreement, 0-1; below 1.0 a changed digit (500 mg / 250 mg) can pass
+NEAR_DUPLICATE_MIN_SIMILARITY = float(os.environ.get('NEAR_DUPLICATE_MIN_SIMILARITY', 1.0))
+NEAR_DUPLICATE_INDEX_SIZE = int(os.environ.get('NEAR_DUPLICATE_INDEX_SIZE', 10000))  # hashes remembered
+PHASH_SIZE = 16  # thumbnail rows; the hash has PHASH_SIZE x PHASH_SIZE bits
+PHASH_BITS = PHASH_SIZE * PHASH_SIZE
+
+# Translation: 'google', a LibreTranslate-compatible 'http' server at
+# TRANSLATION_URL, or the offline 'stub' backend, behind a sentence cache
+TRANSLATION_BACKEND = os.environ.get('TRANSLATION_BACKEND', 'google')
+TRANSLATION_URL = os.environ.get('TRANSLATION_URL', 'http://localhost:5001/translate')
+TRANSLATION_API_KEY = os.environ.get('TRANSLATION_API_KEY')
+TRANSLATION_CACHE_SIZE = int(os.environ.get('TRANSLATION_CACHE_SIZE', 4096))  # segments
+TRANSLATION_CACHE_TTL = float(os.environ.get('TRANSLATION_CACHE_TTL', 24 * 3600))  # seconds
+TRANSLATION_BATCH_SIZE = int(os.environ.get('TRANSLATION_BATCH_SIZE', 32))  # segments per upstream call
+# Target languages of one request are translated concurrently on a shared
+# pool, which is also the number of kept-alive upstream connections
+TRANSLATION_CONCURRENCY = int(os.environ.get('TRANSLATION_CONCURRENCY', 8))
+TRANSLATION_TIMEOUT = float(os.environ.get('TRANSLATION_TIMEOUT', 10))  # seconds per upstream call
+TRANSLATION_DEADLINE = float(os.environ.get('TRANSLATION_DEADLINE', 20))  # seconds for all targets of a request
+TRANSLATION_MAX_TARGETS = int(os.environ.get('TRANSLATION_MAX_TARGETS', 8))  # languages per request
+
+# Async uploads (/upload?async=1): background workers and how many jobs may wait
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))
+JOB_QUEUE_SIZE = int(os.environ.get('JOB_QUEUE_SIZE', 32))
+JOB_TTL = float(os.environ.get('JOB_TTL', 3600))  # seconds a finished job stays queryable
+
+# Admission control: images OCRed at once per process, how many requests may
+# queue for a slot, and how long they wait before a 429 with Retry-After
+OCR_MAX_CONCURRENT = int(os.environ.get('OCR_MAX_CONCURRENT', OCR_POOL_WORKERS))
+OCR_MAX_WAITING = int(os.environ.get('OCR_MAX_WAITING', 2 * OCR_MAX_CONCURRENT))
+OCR_QUEUE_TIMEOUT = float(os.environ.get('OCR_QUEUE_TIMEOUT', 10))  # seconds
+REQUEST_DEADLINE = float(os.environ.get('REQUEST_DEADLINE', 90))  # seconds for a synchronous OCR request
+
+# Per-client token bucket on OCR endpoints (0 disables). Clients are keyed by
+# the first X-Forwarded-For address when behind a trusted proxy (Render)
+RATE_LIMIT_PER_MINUTE = float(os.environ.get('RATE_LIMIT_PER_MINUTE', 60))
+RATE_LIMIT_BURST = int(os.environ.get('RATE_LIMIT_BURST', 10))
+RATE_LIMIT_TRUST_FORWARDED = os.environ.get('RATE_LIMIT_TRUST_FORWARDED', '1') not in ('0', 'false', 'no')
+
+# Batch uploads (/upload_batch)
+BATCH_MAX_FILES = int(os.environ.get('BATCH_MAX_FILES', 100))
+BATCH_CONCURRENCY = int(os.environ.get('BATCH_CONCURRENCY', 4))  # files processed at once per request
+
+# Upload retention, enforced by a background janitor thread
+UPLOAD_MAX_AGE = float(os.environ.get('UPLOAD_MAX_AGE', 3600))  # seconds
+UPLOAD_MAX_BYTES = int(os.environ.get('UPLOAD_MAX_BYTES', 1024 * 1024 * 1024))  # 1GB
+UPLOAD_JANITOR_INTERVAL = float(os.environ.get('UPLOAD_JANITOR_INTERVAL', 60))  # seconds
+FILES_PAGE_SIZE = 100
+FILES_MAX_PAGE_SIZE = 1000
+
+# Logging: level, 'text' or 'json' lines, and the fraction of per-request
+# detail messages (extraction progress, previews) that are kept
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'text')
+LOG_SAMPLE_RATE = float(os.environ.get('LOG_SAMPLE_RATE', 1.0))  # 0-1
+
+# Health probes (Tesseract, translation) run in the background; /test serves
+# the cached results and flags them stale after HEALTH_CHECK_TTL
+HEALTH_CHECK_INTERVAL = float(os.environ.get('HEALTH_CHECK_INTERVAL', 300))  # seconds
+HEALTH_CHECK_TTL = float(os.environ.get('HEALTH_CHECK_TTL', 900))  # seconds
+
+# Response compression: JSON and NDJSON bodies of at least COMPRESS_MIN_BYTES
+# are sent as br (when brotli is installed) or gzip, whichever the client prefers
+COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', 1024))
+COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', 6))  # gzip, 1-9
+BROTLI_QUALITY = int(os.environ.get('BROTLI_QUALITY', 5))  # 0-11
+COMPRESS_MIMETYPES = {'application/json', 'application/x-ndjson', 'text/plain'}
+
+# Histogram buckets (seconds) for the stage timers on /metrics
+METRICS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE
 
 # Create upload directory if it doesn't exist
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
-# Initialize Google Translator
-translator = Translator()
+class JsonLogFormatter(logging.Formatter):
+    """One JSON object per line, for log shippers"""
+    
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'thread': record.threadName,
+            'message': record.getMessage()
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+class SampledLogFilter(logging.Filter):
+    """Keeps LOG_SAMPLE_RATE of the records logged with extra=SAMPLED"""
+    
+    def __init__(self, rate=LOG_SAMPLE_RATE):
+        super().__init__()
+        self.rate = rate
+    
+    def filter(self, record):
+        return not getattr(record, 'sampled', False) or random.random() < self.rate
+
+# Marks per-request detail messages that may be sampled away
+SAMPLED = {'sampled': True}
+
+def configure_logging():
+    """Set up the app logger from LOG_LEVEL, LOG_FORMAT and LOG_SAMPLE_RATE"""
+    logger = logging.getLogger('text_recognition')
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        if LOG_FORMAT == 'json':
+            handler.setFormatter(JsonLogFormatter())
+        else:
+            handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)-7s %(message)s'))
+        handler.addFilter(SampledLogFilter())
+        logger.addHandler(handler)
+        logger.setLevel(LOG_LEVEL)
+        logger.propagate = False
+    return logger
 
-def clean_old_uploads(folder_path, age_limit_seconds=3600):
-    """Delete files older than given time and log to console"""
-    now = time.time()
-    deleted = 0
+log = configure_logging()
 
-    for filename in os.listdir(folder_path):
-        file_path = os.path.join(folder_path, filename)
-        if os.path.isfile(file_path):
-            file_age = now - os.path.getmtime(file_path)
-            if file_age > age_limit_seconds:
+class MetricsRegistry:
+    """Counters, histograms and callback gauges, rendered in the Prometheus text format.
+    
+    Values live in this process only. With OCR_POOL_KIND=process the
+    timings taken inside OCR workers stay in the workers; the per-image
+    stages are recorded in the serving process either way.
+    """
+    
+    def __init__(self, buckets=METRICS_BUCKETS):
+        self.buckets = buckets
+        self._meta = OrderedDict()
+        self._counters = {}
+        self._histograms = {}
+        self._gauges = {}
+        self._lock = threading.Lock()
+    
+    def describe(self, name, kind, help_text, func=None):
+        """Declare a metric; gauges take `func`, returning a number or {labels tuple: number}"""
+        self._meta[name] = (kind, help_text)
+        if kind == 'gauge':
+            self._gauges[name] = func
+    
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+    
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram['buckets'][i] += 1
+            histogram['sum'] += value
+            histogram['count'] += 1
+    
+    @contextmanager
+    def timer(self, name, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+    
+    @staticmethod
+    def _format_labels(labels):
+        if not labels:
+            return ''
+        def escape(value):
+            return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        return '{' + ','.join(f'{key}="{escape(value)}"' for key, value in labels) + '}'
+    
+    def render(self):
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = copy.deepcopy(self._histograms)
+        
+        lines = []
+        for name, (kind, help_text) in self._meta.items():
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            if kind == 'counter':
+                for (metric, labels), value in counters.items():
+                    if metric == name:
+                        lines.append(f'{name}{self._format_labels(labels)} {value}')
+            elif kind == 'histogram':
+                for (metric, labels), histogram in histograms.items():
+                    if metric != name:
+                        continue
+                    for bound, count in zip(self.buckets, histogram['buckets']):
+                        lines.append(f'{name}_bucket{self._format_labels(labels + (("le", bound),))} {count}')
+                    lines.append(f'{name}_bucket{self._format_labels(labels + (("le", "+Inf"),))} {histogram["count"]}')
+                    lines.append(f'{name}_sum{self._format_labels(labels)} {histogram["sum"]:.6f}')
+                    lines.append(f'{name}_count{self._format_labels(labels)} {histogram["count"]}')
+            else:
                 try:
-                    os.remove(file_path)
-                    deleted += 1
-                    print(f"🧹 Deleted old file: {filename}")
+                    value = self._gauges[name]()
                 except Exception as e:
-                    print(f"❌ Could not delete {filename}: {e}")
+                    log.warning(f"⚠️  Could not read gauge {name}: {e}")
+                    continue
+                samples = value.items() if isinstance(value, dict) else [((), value)]
+                for labels, sample in samples:
+                    if sample is not None:
+                        lines.append(f'{name}{self._format_labels(labels)} {float(sample)}')
+        return '\n'.join(lines) + '\n'
+
+metrics = MetricsRegistry()
+metrics.describe('http_requests_total', 'counter', 'HTTP requests by endpoint, method and status')
+metrics.describe('http_request_duration_seconds', 'histogram', 'HTTP request latency by endpoint')
+metrics.describe('upload_stage_duration_seconds', 'histogram',
+                 'Upload pipeline stages: receive, save, decode, decode_page, ocr, translation, serialize')
+metrics.describe('ocr_variant_duration_seconds', 'histogram', 'One OCR variant on one frame or region')
+metrics.describe('ocr_variant_runs_total', 'counter', 'OCR variant runs by method and outcome')
+metrics.describe('tesseract_subprocess_calls_total', 'counter', 'tesseract processes started by the pytesseract backend')
+metrics.describe('ocr_admission_wait_seconds', 'histogram', 'Time spent waiting for an OCR slot')
+metrics.describe('ocr_admission_rejections_total', 'counter', 'OCR requests turned away: queue_full, deadline or timeout')
+metrics.describe('rate_limit_rejections_total', 'counter', 'Requests over the per-client rate limit')
+metrics.describe('http_response_bytes_total', 'counter', 'Buffered response bytes by content encoding, before and after compression')
+metrics.describe('singleflight_calls_total', 'counter',
+                 'Coalesced OCR and translation work by kind and role: leader (computed), shared (saved) '
+                 'or timeout (follower gave up)')
+metrics.describe('translation_targets_total', 'counter', 'Translations per target language: ok, error or timeout')
+metrics.describe('ocr_osd_duration_seconds', 'histogram', 'Orientation and script detection passes')
+metrics.describe('ocr_osd_total', 'counter', 'OSD outcomes: rotated, script (non-Latin), upright or no_text')
+metrics.describe('ocr_near_duplicate_total', 'counter', 'Perceptual-hash matches by outcome: reused, rejected by verification, or unverified (OCRed instead)')
+metrics.describe('ocr_region_fallback_total', 'counter', 'Weak region readings retried on the whole frame, by the reading kept')
+metrics.describe('http_not_modified_total', 'counter', 'Conditional GETs answered with 304 by endpoint')
+
+def stage_timer(stage):
+    """Time one upload pipeline stage into upload_stage_duration_seconds"""
+    return metrics.timer('upload_stage_duration_seconds', stage=stage)
+
+@app.before_request
+def start_request_timer():
+    request.environ['metrics.start'] = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    start = request.environ.get('metrics.start')
+    endpoint = request.endpoint or 'unmatched'
+    if start is not None:
+        metrics.observe('http_request_duration_seconds', time.perf_counter() - start, endpoint=endpoint)
+    metrics.inc('http_requests_total', endpoint=endpoint, method=request.method, status=response.status_code)
+    return response
+
+def _compress_stream(chunks, encoding):
+    """Compress a streamed body, flushing after every chunk so NDJSON lines still arrive as they're produced"""
+    try:
+        if encoding == 'br':
+            compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+            for chunk in chunks:
+                yield compressor.process(chunk) + compressor.flush()
+            yield compressor.finish()
+        else:
+            compressor = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            for chunk in chunks:
+                yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            yield compressor.flush()
+    finally:
+        # Client went away: let the wrapped generator run its cleanup
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+@app.after_request
+def compress_response(response):
+    """gzip or brotli for JSON bodies, negotiated from Accept-Encoding"""
+    if (response.mimetype not in COMPRESS_MIMETYPES or response.status_code < 200
+            or response.status_code in (204, 304) or request.method == 'HEAD'
+            or 'Content-Encoding' in response.headers):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = request.accept_encodings.best_match(['br', 'gzip'] if brotli is not None else ['gzip'])
+    if encoding is None:
+        return response
     
-    if deleted == 0:
-        print("✅ No old files found to delete.")
+    if response.is_streamed:
+        response.response = _compress_stream(response.iter_encoded(), encoding)
+        response.headers.pop('Content-Length', None)
     else:
-        print(f"🧹 Total {deleted} file(s) deleted.")
+        data = response.get_data()
+        if len(data) < COMPRESS_MIN_BYTES:
+            return response
+        if encoding == 'br':
+            compressed = brotli.compress(data, quality=BROTLI_QUALITY)
+        else:
+            # zlib.compress() only takes wbits from Python 3.11; the image runs 3.10
+            compressor = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            compressed = compressor.compress(data) + compressor.flush()
+        metrics.inc('http_response_bytes_total', len(data), encoding='identity')
+        metrics.inc('http_response_bytes_total', len(compressed), encoding=encoding)
+        response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+@app.before_request
+def start_background_workers():
+    upload_store.start_janitor()
+    health_prober.start()
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into one computation.
+    
+    The first caller for a key (the leader) runs the work; callers arriving
+    while it runs wait for it and get its result instead of repeating it.
+    Followers get `copy_result(result)` when results are mutable, taken
+    from a snapshot made as the leader finishes, so the leader's caller
+    can keep changing its own copy. A leader failure is re-raised in the
+    followers, except for `retry_errors` (e.g. the leader's own deadline),
+    where they try again themselves. Followers wait no longer than their
+    own deadline, then raise `timeout_error()`.
+    """
+    
+    class _Call:
+        def __init__(self):
+            self.done = threading.Event()
+            self.waiters = 0
+            self.result = None
+            self.error = None
+    
+    def __init__(self, name, copy_result=None, retry_errors=(), timeout_error=TimeoutError):
+        self.name = name
+        self.copy_result = copy_result
+        self.retry_errors = retry_errors
+        self.timeout_error = timeout_error
+        self.leaders = 0
+        self.shared = 0
+        self._calls = {}
+        self._lock = threading.Lock()
+    
+    def do(self, key, func, deadline=None):
+        """Return (func() or the in-flight call's result for `key`, whether it was shared)
+        
+        `deadline` is a time.monotonic() value bounding a follower's wait.
+        """
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = self._calls[key] = self._Call()
+                    self.leaders += 1
+                else:
+                    call.waiters += 1
+            
+            if leader:
+                metrics.inc('singleflight_calls_total', kind=self.name, role='leader')
+                try:
+                    result = func()
+                except BaseException as e:
+                    call.error = e
+                    raise
+                else:
+                    call.result = result
+                    return result, False
+                finally:
+                    with self._lock:
+                        del self._calls[key]
+                        waiters = call.waiters
+                    # No one joins once the key is gone, so the snapshot is only needed now
+                    if waiters and call.error is None and self.copy_result is not None:
+                        call.result = self.copy_result(call.result)
+                    call.done.set()
+            
+            if not call.done.wait(None if deadline is None else max(0.0, deadline - time.monotonic())):
+                metrics.inc('singleflight_calls_total', kind=self.name, role='timeout')
+                raise self.timeout_error()
+            if call.error is not None:
+                if isinstance(call.error, self.retry_errors):
+                    continue
+                raise call.error
+            with self._lock:
+                self.shared += 1
+            metrics.inc('singleflight_calls_total', kind=self.name, role='shared')
+            result = call.result
+            return (self.copy_result(result) if self.copy_result is not None else result), True
+    
+    def stats(self):
+        with self._lock:
+            return {
+                'in_flight': len(self._calls),
+                'computed': self.leaders,
+                'shared': self.shared,
+                'saved_ratio': round(self.shared / (self.leaders + self.shared), 3) if self.shared else 0.0
+            }
+
+# Identical translations in flight at once (same stripped text, languages) go upstream once
+translation_flights = SingleFlight('translation')
+
+class TranslationBackend:
+    """Interface for translation services used by CachedTranslator"""
+    
+    name = 'Unknown'
+    
+    def translate_batch(self, texts, dest, src='auto'):
+        """Translate a list of texts; returns a list of (translated_text, detected_language)"""
+        raise NotImplementedError
+    
+    def close(self):
+        """Drop kept-alive connections"""
+
+class GoogleTranslateBackend(TranslationBackend):
+    """googletrans backend; a list of texts is sent as one translate call
+    
+    Translator objects aren't safe to share between threads, so each
+    translation thread keeps its own, and with it its keep-alive session.
+    """
+    
+    name = 'Google Translate'
+    
+    def __init__(self, timeout=TRANSLATION_TIMEOUT):
+        self.timeout = timeout
+        self._local = threading.local()
+    
+    @property
+    def translator(self):
+        translator = getattr(self._local, 'translator', None)
+        if translator is None:
+            from googletrans import Translator
+            translator = self._local.translator = Translator(timeout=self.timeout)
+        return translator
+    
+    def translate_batch(self, texts, dest, src='auto'):
+        results = self.translator.translate(list(texts), dest=dest, src=src)
+        return [(result.text, result.src) for result in results]
+
+class LibreTranslateBackend(TranslationBackend):
+    """LibreTranslate-compatible JSON API over a pool of keep-alive connections
+    
+    POSTs {q, source, target, format} to the /translate URL. Connections go
+    back to the pool after each call, so concurrent targets of one request
+    and consecutive requests reuse warm sockets instead of reconnecting.
+    """
+    
+    name = 'LibreTranslate'
+    
+    def __init__(self, url=TRANSLATION_URL, api_key=TRANSLATION_API_KEY, timeout=TRANSLATION_TIMEOUT,
+                 pool_size=TRANSLATION_CONCURRENCY):
+        parts = urlsplit(url)
+        self.https = parts.scheme == 'https'
+        self.host = parts.hostname
+        self.port = parts.port
+        self.path = parts.path or '/translate'
+        self.api_key = api_key
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.connections_opened = 0
+        self.requests = 0
+        self._idle = []
+        self._lock = threading.Lock()
+    
+    def _connect(self):
+        connection_class = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+        with self._lock:
+            self.connections_opened += 1
+        return connection_class(self.host, self.port, timeout=self.timeout)
+    
+    def _post(self, payload):
+        body = json.dumps(payload).encode('utf-8')
+        headers = {'Content-Type': 'application/json', 'Connection': 'keep-alive'}
+        with self._lock:
+            connection = self._idle.pop() if self._idle else None
+            self.requests += 1
+        reused = connection is not None
+        while True:
+            if connection is None:
+                connection = self._connect()
+            try:
+                connection.request('POST', self.path, body=body, headers=headers)
+                response = connection.getresponse()
+                data = response.read()
+                break
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                connection.close()
+                connection = None
+                # The server closed an idle keep-alive socket: one retry on a fresh one
+                if not reused:
+                    raise
+                reused = False
+            except Exception:
+                connection.close()
+                raise
+        
+        if response.will_close:
+            connection.close()
+        else:
+            with self._lock:
+                if len(self._idle) < self.pool_size:
+                    self._idle.append(connection)
+                    connection = None
+            if connection is not None:
+                connection.close()
+        
+        if response.status != 200:
+            raise RuntimeError(f"{self.name} returned HTTP {response.status}: {data[:200].decode('utf-8', 'replace')}")
+        return json.loads(data)
+    
+    def translate_batch(self, texts, dest, src='auto'):
+        payload = {'q': list(texts), 'source': src, 'target': dest, 'format': 'text'}
+        if self.api_key:
+            payload['api_key'] = self.api_key
+        data = self._post(payload)
+        translated = data['translatedText']
+        detected = data.get('detectedLanguage') or {}
+        if not isinstance(detected, list):
+            detected = [detected] * len(translated)
+        return [(text, (language or {}).get('language', src)) for text, language in zip(translated, detected)]
+    
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+    
+    def stats(self):
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'connections_opened': self.connections_opened,
+                'idle_connections': len(self._idle)
+            }
+
+class StubTranslationBackend(TranslationBackend):
+    """Offline backend for tests and benchmarks: tags text with the target language"""
+    
+    name = 'Offline stub'
+    
+    def __init__(self):
+        self.calls = 0
+        # Targets and coalesced requests call in from several threads at once
+        self._lock = threading.Lock()
+    
+    def translate_batch(self, texts, dest, src='auto'):
+        with self._lock:
+            self.calls += 1
+        detected = 'en' if src == 'auto' else src
+        return [(f"[{dest}] {text}", detected) for text in texts]
+
+def create_translation_backend(kind=TRANSLATION_BACKEND):
+    """Build the translation backend named by TRANSLATION_BACKEND"""
+    if kind == 'stub':
+        return StubTranslationBackend()
+    if kind == 'http':
+        return LibreTranslateBackend()
+    return GoogleTranslateBackend()
+
+_translation_executor = None
+_translation_executor_lock = threading.Lock()
+
+def get_translation_executor():
+    """Return the shared pool target languages are translated on, creating it on first use"""
+    global _translation_executor
+    with _translation_executor_lock:
+        if _translation_executor is None:
+            _translation_executor = ThreadPoolExecutor(max_workers=TRANSLATION_CONCURRENCY,
+                                                       thread_name_prefix='translate')
+        return _translation_executor
+
+class CachedTranslator:
+    """Sentence-level memoizing front for a TranslationBackend.
+    
+    Text is split into sentences/lines, repeated segments within a request
+    are translated once, cached segments (LRU with TTL, per target language)
+    are reused, and only the misses go upstream in batches.
+    """
+    
+    # Sentence ends and line breaks; the separators are kept for reassembly
+    _SEGMENT_SPLIT = re.compile(r'(\n+|(?<=[.!?।])\s+)')
+    
+    def __init__(self, backend, max_entries=TRANSLATION_CACHE_SIZE,
+                 ttl=TRANSLATION_CACHE_TTL, batch_size=TRANSLATION_BATCH_SIZE):
+        self.backend = backend
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.batch_size = batch_size
+        self.hits = 0
+        self.misses = 0
+        self.upstream_calls = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def _lookup(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            translated, detected, expires = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return translated, detected
+    
+    def _store(self, key, translated, detected):
+        with self._lock:
+            self._entries[key] = (translated, detected, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def translate(self, text, dest, src='auto'):
+        """Translate text; returns (translated_text, detected_language)
+        
+        Concurrent calls for the same text and languages share one
+        translation (see SingleFlight).
+        """
+        result, _ = translation_flights.do((dest, src, text), lambda: self._translate(text, dest, src))
+        return result
+    
+    def _translate(self, text, dest, src):
+        parts = self._SEGMENT_SPLIT.split(text)
+        # Even indexes are segments, odd indexes the separators between them
+        segments = {part.strip() for part in parts[::2] if part.strip()}
+        
+        translations = {}
+        misses = []
+        for segment in segments:
+            cached = self._lookup((dest, src, segment))
+            if cached is None:
+                misses.append(segment)
+            else:
+                translations[segment] = cached
+        
+        with self._lock:
+            self.hits += len(translations)
+            self.misses += len(misses)
+        
+        for start in range(0, len(misses), self.batch_size):
+            batch = misses[start:start + self.batch_size]
+            with self._lock:
+                self.upstream_calls += 1
+            for segment, (translated, detected) in zip(batch, self.backend.translate_batch(batch, dest, src)):
+                self._store((dest, src, segment), translated, detected)
+                translations[segment] = (translated, detected)
+        
+        output = []
+        for i, part in enumerate(parts):
+            if i % 2 == 0 and part.strip():
+                leading = part[:len(part) - len(part.lstrip())]
+                trailing = part[len(part.rstrip()):]
+                output.append(leading + translations[part.strip()][0] + trailing)
+            else:
+                output.append(part)
+        
+        detected_languages = Counter(detected for _, detected in translations.values())
+        detected = detected_languages.most_common(1)[0][0] if detected_languages else src
+        return ''.join(output), detected
+    
+    def translate_many(self, text, dests, src='auto', timeout=TRANSLATION_DEADLINE):
+        """Translate text into several languages concurrently; returns {dest: (translated, detected) or exception}
+        
+        Targets that haven't answered within `timeout` seconds come back as
+        TimeoutError while the rest are returned; calls still running are
+        bounded by the backend's own per-call timeout. A single target goes
+        through the pool too, so the deadline holds for it as well.
+        """
+        executor = get_translation_executor()
+        futures = {dest: executor.submit(self.translate, text, dest, src) for dest in dests}
+        wait(futures.values(), timeout=timeout)
+        outcomes = {}
+        for dest, future in futures.items():
+            if not future.done():
+                future.cancel()
+                outcomes[dest] = TimeoutError(f"No translation within {timeout:g}s")
+            elif future.exception() is not None:
+                outcomes[dest] = future.exception()
+            else:
+                outcomes[dest] = future.result()
+        return outcomes
+    
+    def stats(self):
+        backend_stats = self.backend.stats() if hasattr(self.backend, 'stats') else None
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'backend_connections': backend_stats,
+                'backend': self.backend.name,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'upstream_calls': self.upstream_calls,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0
+            }
+
+# Initialize the translation backend behind the segment cache
+translation_service = CachedTranslator(create_translation_backend())
+
+def allowed_file(filename):
+    return '.' in filename and \
+           filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+
+def is_document(filename):
+    """True for multi-page document formats (TIFF, PDF)"""
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in DOCUMENT_EXTENSIONS
+
+class UploadStore:
+    """In-memory index of the upload folder: filename, size, mtime and hash.
+    
+    The folder is scanned once at startup; after that save_upload and the
+    janitor keep the index current, so requests never list or stat the
+    directory. Entries are kept oldest first, which lets the janitor stop
+    at the first file that is still young enough. Files a request is still
+    working on are pinned, and the janitor passes over them.
+    """
+    
+    def __init__(self, folder, max_age=UPLOAD_MAX_AGE, max_bytes=UPLOAD_MAX_BYTES):
+        self.folder = folder
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.deleted = 0
+        self._entries = OrderedDict()
+        self._pins = {}
+        self._lock = threading.Lock()
+        self._janitor = None
+    
+    def scan(self):
+        """Rebuild the index from disk"""
+        found = []
+        with os.scandir(self.folder) as it:
+            for entry in it:
+                if entry.is_file() and allowed_file(entry.name):
+                    stat = entry.stat()
+                    found.append((stat.st_mtime, entry.name, stat.st_size))
+        found.sort()
+        
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+            for mtime, filename, size in found:
+                self._entries[filename] = {'filename': filename, 'size': size, 'mtime': mtime,
+                                           'sha256': None, 'info': None}
+                self.total_bytes += size
+        log.info(f"🗂️  Indexed {len(found)} uploaded file(s)")
+    
+    def add(self, filename, size, sha256=None, pin=False):
+        """Index a new file; with pin=True it stays pinned until unpin()"""
+        with self._lock:
+            old = self._entries.pop(filename, None)
+            if old:
+                self.total_bytes -= old['size']
+            self._entries[filename] = {'filename': filename, 'size': size, 'mtime': time.time(),
+                                       'sha256': sha256, 'info': None}
+            self.total_bytes += size
+            if pin:
+                self._pins[filename] = self._pins.get(filename, 0) + 1
+    
+    def pin(self, filename):
+        """Keep the janitor away from a file while a request reads it"""
+        with self._lock:
+            self._pins[filename] = self._pins.get(filename, 0) + 1
+    
+    def unpin(self, filename):
+        with self._lock:
+            count = self._pins.get(filename, 0) - 1
+            if count > 0:
+                self._pins[filename] = count
+            else:
+                self._pins.pop(filename, None)
+    
+    @contextmanager
+    def pinned(self, filename):
+        self.pin(filename)
+        try:
+            yield
+        finally:
+            self.unpin(filename)
+    
+    def update(self, filename, **fields):
+        """Remember details worked out later (sha256, info) for a file still in the index"""
+        with self._lock:
+            entry = self._entries.get(filename)
+            if entry is not None:
+                entry.update(fields)
+    
+    def get(self, filename):
+        with self._lock:
+            entry = self._entries.get(filename)
+            return dict(entry) if entry else None
+    
+    def page(self, offset=0, limit=FILES_PAGE_SIZE):
+        """Newest-first slice of the index; returns (entries, total)"""
+        with self._lock:
+            entries = [dict(entry) for entry in islice(reversed(self._entries.values()), offset, offset + limit)]
+            return entries, len(self._entries)
+    
+    def enforce_quotas(self, now=None):
+        """Delete files past the age limit, then the oldest until under the size quota
+        
+        Pinned files are skipped, so a large document being processed can
+        leave the folder over quota until its request finishes.
+        """
+        now = time.time() if now is None else now
+        doomed = []
+        with self._lock:
+            for filename, entry in self._entries.items():
+                if now - entry['mtime'] <= self.max_age and self.total_bytes <= self.max_bytes:
+                    break
+                if filename in self._pins:
+                    continue
+                self.total_bytes -= entry['size']
+                doomed.append(filename)
+            for filename in doomed:
+                del self._entries[filename]
+        
+        for filename in doomed:
+            try:
+                os.remove(os.path.join(self.folder, filename))
+                self.deleted += 1
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                log.error(f"❌ Could not delete {filename}: {e}")
+        
+        if doomed:
+            log.info(f"🧹 Janitor removed {len(doomed)} upload(s), {self.total_bytes} bytes kept")
+        return len(doomed)
+    
+    def start_janitor(self, interval=UPLOAD_JANITOR_INTERVAL):
+        """Start the background cleanup thread once per process"""
+        with self._lock:
+            if self._janitor is not None:
+                return
+            self._janitor = threading.Thread(target=self._run_janitor, args=(interval,),
+                                             name='upload-janitor', daemon=True)
+        self._janitor.start()
+    
+    def _run_janitor(self, interval):
+        while True:
+            try:
+                self.enforce_quotas()
+            except Exception as e:
+                log.error(f"❌ Upload janitor error: {e}")
+            time.sleep(interval)
+    
+    def stats(self):
+        with self._lock:
+            return {
+                'files': len(self._entries),
+                'total_bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+                'max_age_seconds': self.max_age,
+                'deleted': self.deleted
+            }
+
+upload_store = UploadStore(UPLOAD_FOLDER)
+upload_store.scan()
 
 # Configure Tesseract path based on operating system
 def configure_tesseract():
@@ -71,7 +1028,7 @@ def configure_tesseract():
         for path in possible_paths:
             if os.path.exists(path):
                 pytesseract.pytesseract.tesseract_cmd = path
-                print(f"✅ Tesseract found at: {path}")
+                log.info(f"✅ Tesseract found at: {path}")
                 return True
                 
     elif system == "darwin":  # macOS
@@ -85,7 +1042,7 @@ def configure_tesseract():
         for path in possible_paths:
             if os.path.exists(path):
                 pytesseract.pytesseract.tesseract_cmd = path
-                print(f"✅ Tesseract found at: {path}")
+                log.info(f"✅ Tesseract found at: {path}")
                 return True
                 
     else:  # Linux
@@ -99,10 +1056,10 @@ def configure_tesseract():
         for path in possible_paths:
             if os.path.exists(path):
                 pytesseract.pytesseract.tesseract_cmd = path
-                print(f"✅ Tesseract found at: {path}")
+                log.info(f"✅ Tesseract found at: {path}")
                 return True
     
-    print("⚠️  Tesseract not found in common locations")
+    log.warning("⚠️  Tesseract not found in common locations")
     return False
 
 def test_tesseract():
@@ -113,306 +1070,1110 @@ def test_tesseract():
         # You can add text to this image or just test with the blank image
         
         # Try to run OCR
-        result = pytesseract.image_to_string(test_image, config='--psm 6')
-        print("✅ Tesseract is working correctly")
+        result = ocr_image(test_image, psm=6)
+        log.info(f"✅ Tesseract is working correctly ({get_ocr_backend()} backend)")
         return True
     except Exception as e:
-        print(f"❌ Tesseract test failed: {str(e)}")
+        log.error(f"❌ Tesseract test failed: {str(e)}")
         return False
 
 def test_google_translate():
     """Test if Google Translate is working properly"""
     try:
         # Test translation
-        result = translator.translate("Hello", dest='bn')
-        print(f"✅ Google Translate is working: 'Hello' -> '{result.text}'")
+        # Goes straight to the backend so the cache can't mask an outage
+        [(translated, _)] = translation_service.backend.translate_batch(["Hello"], dest='bn')
+        log.info(f"✅ Google Translate is working: 'Hello' -> '{translated}'")
         return True
     except Exception as e:
-        print(f"❌ Google Translate test failed: {str(e)}")
+        log.error(f"❌ Google Translate test failed: {str(e)}")
         return False
 
+class HealthProber:
+    """Runs the dependency probes on a background thread and caches their results.
+    
+    Each probe is a function returning True/False. Health endpoints read
+    the cache, so they cost nothing and keep answering while the network
+    or Tesseract is slow; results older than the TTL are marked stale.
+    """
+    
+    def __init__(self, probes, interval=HEALTH_CHECK_INTERVAL, ttl=HEALTH_CHECK_TTL):
+        self.probes = probes
+        self.interval = interval
+        self.ttl = ttl
+        self._results = {}
+        self._lock = threading.Lock()
+        self._thread = None
+    
+    def refresh(self):
+        """Run every probe now and cache the results"""
+        for name, probe in self.probes.items():
+            start = time.perf_counter()
+            try:
+                ok = bool(probe())
+            except Exception as e:
+                log.error(f"❌ Health probe {name} failed: {e}")
+                ok = False
+            with self._lock:
+                self._results[name] = {
+                    'ok': ok,
+                    'checked_at': time.time(),
+                    'latency_seconds': round(time.perf_counter() - start, 3)
+                }
+    
+    def start(self):
+        """Start the background prober once per process"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='health-prober', daemon=True)
+        self._thread.start()
+    
+    def _run(self):
+        while True:
+            self.refresh()
+            time.sleep(self.interval)
+    
+    def status(self):
+        """Cached result per probe; 'ok' is None until the first probe has run"""
+        now = time.time()
+        with self._lock:
+            results = {name: dict(result) for name, result in self._results.items()}
+        status = {}
+        for name in self.probes:
+            result = results.get(name, {'ok': None, 'checked_at': None, 'latency_seconds': None})
+            age = now - result['checked_at'] if result['checked_at'] else None
+            result['age_seconds'] = round(age, 1) if age is not None else None
+            result['stale'] = age is None or age > self.ttl
+            if result['checked_at']:
+                result['checked_at'] = datetime.fromtimestamp(result['checked_at']).isoformat()
+            status[name] = result
+        return status
+
+health_prober = HealthProber({'tesseract': test_tesseract, 'google_translate': test_google_translate})
+
 def translate_text_to_bengali(text):
     """Translate text to Bengali using Google Translate API"""
-    try:
-        if not text or text.strip() == '':
-            return {
-                'bengali_text': '',
-                'original_text': text,
-                'translation_success': False,
-                'error': 'Empty text provided'
-            }
-        
-        # Clean the text
-        clean_text = text.strip()
-        
-        # Skip translation if text is too short or seems like OCR error
-        if len(clean_text) < 2:
-            return {
-                'bengali_text': clean_text,
-                'original_text': text,
-                'translation_success': False,
-                'error': 'Text too short to translate'
-            }
-        
-        print(f"🌐 Translating text: '{clean_text[:50]}...' to Bengali")
-        
-        # Perform translation
-        result = translator.translate(clean_text, dest='bn', src='auto')
-        
-        bengali_text = result.text
-        detected_lang = result.src
-        
-        print(f"✅ Translation successful: '{clean_text[:30]}...' -> '{bengali_text[:30]}...'")
-        print(f"🔍 Detected source language: {detected_lang}")
+    return translate_text_to_languages(text, ['bn'])['bn']
+
+def translation_failure(text, translated_text, dest, error):
+    result = {
+        'translated_text': translated_text,
+        'original_text': text,
+        'target_language': dest,
+        'translation_success': False,
+        'error': error
+    }
+    if dest == 'bn':
+        result['bengali_text'] = translated_text
+    return result
+
+def translate_text_to_languages(text, target_languages, timeout=TRANSLATION_DEADLINE):
+    """Translate text into each target language; returns {language: translation result}
+    
+    The targets are translated concurrently. One that fails or misses the
+    `timeout` gets a failed result (with `timed_out` for the latter) while
+    the others are still returned. Bengali results keep their
+    `bengali_text` key.
+    """
+    if not text or text.strip() == '':
+        return {dest: translation_failure(text, '', dest, 'Empty text provided') for dest in target_languages}
+    
+    # Clean the text
+    clean_text = text.strip()
+    
+    # Skip translation if text is too short or seems like OCR error
+    if len(clean_text) < 2:
+        return {dest: translation_failure(text, clean_text, dest, 'Text too short to translate')
+                for dest in target_languages}
+    
+    log.debug(f"🌐 Translating text: '{clean_text[:50]}...' to {', '.join(target_languages)}")
+    
+    # Perform translation (cached per sentence, targets in parallel)
+    outcomes = translation_service.translate_many(clean_text, list(target_languages), src='auto', timeout=timeout)
+    
+    results = {}
+    for dest, outcome in outcomes.items():
+        if isinstance(outcome, Exception):
+            timed_out = isinstance(outcome, TimeoutError)
+            log.error(f"❌ Translation to {dest} failed: {str(outcome)}")
+            metrics.inc('translation_targets_total', outcome='timeout' if timed_out else 'error')
+            # Return original text if translation fails
+            results[dest] = translation_failure(text, text, dest, str(outcome))
+            if timed_out:
+                results[dest]['timed_out'] = True
+            continue
         
-        return {
-            'bengali_text': bengali_text,
+        translated_text, detected_lang = outcome
+        log.debug(f"✅ Translation successful ({detected_lang} -> {dest}): "
+                  f"'{clean_text[:30]}...' -> '{translated_text[:30]}...'")
+        metrics.inc('translation_targets_total', outcome='ok')
+        results[dest] = {
+            'translated_text': translated_text,
             'original_text': text,
             'detected_language': detected_lang,
+            'target_language': dest,
             'translation_success': True,
-            'translator_service': 'Google Translate'
-        }
-        
-    except Exception as e:
-        print(f"❌ Translation failed: {str(e)}")
-        return {
-            'bengali_text': text,  # Return original text if translation fails
-            'original_text': text,
-            'translation_success': False,
-            'error': str(e)
+            'translator_service': translation_service.backend.name
         }
+        if dest == 'bn':
+            results[dest]['bengali_text'] = translated_text
+    return results
 
-def allowed_file(filename):
-    return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+LANGUAGE_CODE = re.compile(r'^[a-z]{2,3}(-[a-z]{2,4})?$', re.IGNORECASE)
 
-@app.route('/upload', methods=['POST'])
-def upload_file():
-    try:
-        if 'file' not in request.files:
-            return jsonify({'error': 'No file provided'}), 400
-        
-        file = request.files['file']
-        original_filename = request.form.get('filename', file.filename)
-        
-        if file.filename == '':
-            return jsonify({'error': 'No file selected'}), 400
-        
-        if not allowed_file(original_filename):
-            return jsonify({'error': 'Only JPG files are allowed'}), 400
-        
-        # Secure the filename
-        filename = secure_filename(original_filename)
-        
-        # Add timestamp to avoid conflicts
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        name, ext = os.path.splitext(filename)
-        filename = f"{name}_{timestamp}{ext}"
-        
-        # Save file
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        
-        file.save(filepath)
-        clean_old_uploads(app.config['UPLOAD_FOLDER'], age_limit_seconds=3600)
+def parse_target_languages(value, default=('bn',)):
+    """Target languages from a list or comma-separated string; raises ValueError on bad input"""
+    if value is None or value == '' or value == []:
+        return list(default)
+    if isinstance(value, str):
+        value = value.split(',')
+    if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+        raise ValueError('target_languages must be a language code or a list of them')
+    
+    languages = []
+    for language in (item.strip() for item in value):
+        if not LANGUAGE_CODE.match(language):
+            raise ValueError(f"Invalid target language: {language!r}")
+        if language not in languages:
+            languages.append(language)
+    if not languages:
+        return list(default)
+    if len(languages) > TRANSLATION_MAX_TARGETS:
+        raise ValueError(f"Too many target languages (max {TRANSLATION_MAX_TARGETS})")
+    return languages
 
-        # Get basic file info
-        file_info = get_file_info(filepath, original_filename)
-        
-        # Extract text from image using OCR
-        extracted_text = extract_text_from_image(filepath)
-        file_info['extracted_text'] = extracted_text
-        
-        # Translate extracted text to Bengali
-        translation_result = None
-        if isinstance(extracted_text, dict) and extracted_text.get('best_text'):
-            best_text = extracted_text['best_text']
-            if best_text and not best_text.startswith('Error extracting text:'):
-                print(f"🌐 Starting translation for extracted text...")
-                translation_result = translate_text_to_bengali(best_text)
-                extracted_text['translation'] = translation_result
-        
-        print(f"✅ File received and saved: {filepath}")
-        print(f"📊 File info: {file_info}")
-        
-        if isinstance(extracted_text, dict) and extracted_text.get('best_text'):
-            preview = extracted_text['best_text'][:100] + '...' if len(extracted_text['best_text']) > 100 else extracted_text['best_text']
-            print(f"📝 Extracted text: {preview}")
-            
-            if translation_result and translation_result.get('translation_success'):
-                bengali_preview = translation_result['bengali_text'][:100] + '...' if len(translation_result['bengali_text']) > 100 else translation_result['bengali_text']
-                print(f"🌐 Bengali translation: {bengali_preview}")
-        else:
-            print(f"📝 Text extraction result: {extracted_text}")
-        
-        return jsonify({
-            'message': 'File uploaded, text extracted, and translated successfully',
-            'filename': filename,
-            'original_name': original_filename,
-            'path': filepath,
-            'info': file_info,
-            'extracted_text': extracted_text
-        })
-        
-    except Exception as e:
-        print(f"❌ Error processing file: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        return jsonify({'error': f'Server error: {str(e)}'}), 500
+def requested_target_languages():
+    """?target_languages=bn,hi,en (or the form field) on upload endpoints; Bengali by default"""
+    return parse_target_languages(request.args.get('target_languages', request.form.get('target_languages')))
 
-@app.route('/translate', methods=['POST'])
-def translate_text():
-    """Endpoint to translate any text to Bengali"""
+def create_upload_file(original_filename):
+    """Create a new file under a secure, timestamped name in the upload folder
+    
+    Returns (filename, filepath, file open for binary writing). The file is
+    created exclusively, so concurrent uploads of the same name in the same
+    second (batches, retries) each get their own counter-suffixed file.
+    """
+    # Secure the filename
+    name, ext = os.path.splitext(secure_filename(original_filename))
+    
+    # Add timestamp to avoid conflicts
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    counter = 0
+    while True:
+        suffix = f"_{counter}" if counter else ""
+        filename = f"{name}_{timestamp}{suffix}{ext}"
+        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+        try:
+            return filename, filepath, open(filepath, 'xb')
+        except FileExistsError:
+            counter += 1
+
+def save_upload(file, original_filename):
+    """Save an uploaded file under a unique timestamped name and open it
+    
+    Returns (filename, DecodedImage). Raises ValueError for files that are
+    too large or not decodable images.
+    """
+    # Read the upload once; the same bytes are saved and decoded
+    data = file.read(MAX_FILE_SIZE + 1)
+    if len(data) > MAX_FILE_SIZE:
+        raise ValueError(f'File too large (max {MAX_FILE_SIZE // (1024 * 1024)}MB)')
+    filename, filepath, f = create_upload_file(original_filename)
+    with stage_timer('save'), f:
+        f.write(data)
+    
     try:
-        data = request.get_json()
-        
-        if not data or 'text' not in data:
-            return jsonify({'error': 'No text provided'}), 400
-        
-        text = data['text']
-        target_language = data.get('target_language', 'bn')  # Default to Bengali
-        
-        if target_language == 'bn':
-            translation_result = translate_text_to_bengali(text)
-        else:
-            # For other languages (future enhancement)
-            try:
-                result = translator.translate(text, dest=target_language, src='auto')
-                translation_result = {
-                    'translated_text': result.text,
-                    'original_text': text,
-                    'detected_language': result.src,
-                    'target_language': target_language,
-                    'translation_success': True,
-                    'translator_service': 'Google Translate'
-                }
-            except Exception as e:
-                translation_result = {
-                    'translated_text': text,
-                    'original_text': text,
-                    'translation_success': False,
-                    'error': str(e)
-                }
-        
-        return jsonify({
-            'message': 'Translation completed',
-            'translation': translation_result
-        })
-        
+        image = DecodedImage.from_bytes(data, path=filepath)
     except Exception as e:
-        print(f"❌ Translation error: {str(e)}")
-        return jsonify({'error': f'Translation error: {str(e)}'}), 500
+        upload_store.add(filename, len(data))
+        raise ValueError(f'Could not decode image: {str(e)}')
+    upload_store.add(filename, len(data), sha256=image.sha256)
+    return filename, image
 
-def extract_text_from_image(filepath):
-    """Extract text from image using OCR with preprocessing"""
+def save_document(file, original_filename, chunk_size=1024 * 1024):
+    """Stream an uploaded TIFF or PDF to disk without holding it in memory
+    
+    Returns (filename, filepath, page_count). Raises ValueError for files
+    that are too large, have too many pages or can't be opened; those are
+    deleted before they are indexed. An accepted file is indexed pinned,
+    and the caller must upload_store.unpin() it once it is processed.
+    """
+    filename, filepath, f = create_upload_file(original_filename)
     try:
-        print(f"🔍 Starting text extraction from: {filepath}")
+        size = 0
+        with stage_timer('save'), f:
+            for chunk in iter(lambda: file.stream.read(chunk_size), b''):
+                size += len(chunk)
+                if size > DOCUMENT_MAX_BYTES:
+                    raise ValueError(f'File too large (max {DOCUMENT_MAX_BYTES // (1024 * 1024)}MB)')
+                f.write(chunk)
         
-        # Verify file exists and is readable
-        if not os.path.exists(filepath):
-            return create_error_result("File not found")
-        
-        # Try to read the image file
         try:
-            # First try with PIL
-            pil_img = Image.open(filepath)
-            print(f"📷 Image loaded: {pil_img.size}, mode: {pil_img.mode}")
+            page_count = count_document_pages(filepath)
+        except ImportError:
+            raise ValueError('PDF support is not installed on this server (pip install pypdfium2)')
+        except Exception as e:
+            raise ValueError(f'Could not open document: {str(e)}')
+        if page_count > DOCUMENT_MAX_PAGES:
+            raise ValueError(f'Too many pages (max {DOCUMENT_MAX_PAGES})')
+    except BaseException:
+        os.remove(filepath)
+        raise
+    
+    upload_store.add(filename, size, pin=True)
+    return filename, filepath, page_count
+
+def count_document_pages(filepath):
+    """Page count from the TIFF directory chain or the PDF page tree, without decoding pages"""
+    if filepath.lower().endswith('.pdf'):
+        pdf = pdfium.PdfDocument(filepath)
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+    with Image.open(filepath) as img:
+        return getattr(img, 'n_frames', 1)
+
+def iter_document_pages(filepath):
+    """Yield each page of a TIFF or PDF as a PIL image, decoding one page at a time"""
+    if filepath.lower().endswith('.pdf'):
+        pdf = pdfium.PdfDocument(filepath)
+        try:
+            for index in range(len(pdf)):
+                page = pdf[index]
+                bitmap = page.render(scale=PDF_RENDER_DPI / 72)
+                # Copy out of pdfium's buffer so the page can be freed now
+                pil_img = bitmap.to_pil().convert('RGB')
+                bitmap.close()
+                page.close()
+                yield pil_img
+        finally:
+            pdf.close()
+    else:
+        with Image.open(filepath) as img:
+            for index in range(getattr(img, 'n_frames', 1)):
+                img.seek(index)
+                yield img.copy()
+
+def pipeline_document_pages(filepath, prefetch=DOCUMENT_PREFETCH_PAGES):
+    """Yield (page_number, DecodedImage) with decoding running ahead on its own thread
+    
+    A decoder thread renders page N+1, normalizes it and finds its text
+    regions while the caller OCRs page N. At most `prefetch` decoded pages
+    wait in the queue, so memory stays bounded whatever the page count.
+    Decoding errors are raised in the caller.
+    """
+    pages = queue.Queue(maxsize=max(1, prefetch))
+    stop = threading.Event()
+    doc_format = 'PDF' if filepath.lower().endswith('.pdf') else 'TIFF'
+    
+    def put(item):
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                pass
+        return False
+    
+    def decode():
+        try:
+            for number, pil_img in enumerate(iter_document_pages(filepath), 1):
+                with stage_timer('decode_page'):
+                    image = DecodedImage.from_page(pil_img, path=filepath, format=doc_format)
+                    del pil_img
+                    image.gray()
+                    image.text_regions()
+                if not put((number, image, None)):
+                    return
+        except Exception as e:
+            put((None, None, e))
+        put((None, None, None))
+    
+    decoder = threading.Thread(target=decode, name='page-decoder', daemon=True)
+    decoder.start()
+    try:
+        while True:
+            number, image, error = pages.get()
+            if error is not None:
+                raise error
+            if number is None:
+                return
+            yield number, image
+    finally:
+        # Consumer done or gone: let the decoder stop at its next page
+        stop.set()
+
+def translate_extracted_text(extracted_text, target_languages=None):
+    """Translate a successful OCR result in place; returns the primary translation or None
+    
+    `translation` is the Bengali result (or the first target's when
+    Bengali wasn't asked for); other targets add a `translations` map of
+    every language.
+    """
+    best_text = extracted_text.get('best_text') if isinstance(extracted_text, dict) else None
+    if not best_text or best_text.startswith('Error extracting text:'):
+        return None
+    target_languages = target_languages or ['bn']
+    with stage_timer('translation'):
+        translations = translate_text_to_languages(best_text, target_languages)
+    translation_result = translations.get('bn') or translations[target_languages[0]]
+    extracted_text['translation'] = translation_result
+    if target_languages != ['bn']:
+        extracted_text['translations'] = translations
+    return translation_result
+
+def process_document(filepath, filename, original_filename, progress=None, target_languages=None):
+    """OCR and translate a multi-page document; yields one result dict per page as it finishes"""
+    for number, image in pipeline_document_pages(filepath):
+        with stage_timer('ocr'):
+            extracted_text = extract_text_cached(image)
+        translate_extracted_text(extracted_text, target_languages)
+        if progress:
+            progress('page_done', page=number, method_used=extracted_text.get('method_used'),
+                     characters=len(extracted_text.get('best_text') or ''))
+        log.info(f"📄 {filename} page {number}: {len((extracted_text.get('best_text') or '').strip())} characters",
+                 extra=SAMPLED)
+        yield {
+            'page': number,
+            'filename': filename,
+            'original_name': original_filename,
+            'size': image.size,
+            'extracted_text': extracted_text
+        }
+
+def process_upload(image, filename, original_filename, progress=None, deadline=None, target_languages=None):
+    """OCR and translate a saved upload; returns the /upload response body
+    
+    `progress(stage, **data)` is called as the pipeline advances. With a
+    `deadline`, Overloaded is raised when OCR capacity can't meet it.
+    `target_languages` defaults to Bengali only.
+    """
+    filepath = image.path
+    
+    # Get basic file info
+    file_info = get_file_info(filepath, original_filename, image=image)
+    
+    # Extract text from image using OCR (or reuse a cached result)
+    with stage_timer('ocr'):
+        extracted_text = extract_text_cached(image, progress=progress, deadline=deadline)
+    file_info['extracted_text'] = extracted_text
+    if progress:
+        progress('ocr_done', method_used=extracted_text.get('method_used'),
+                 characters=len(extracted_text.get('best_text') or ''))
+    
+    # Translate extracted text (to Bengali unless other targets were asked for)
+    translation_result = translate_extracted_text(extracted_text, target_languages)
+    if translation_result and progress:
+        progress('translated', translation_success=translation_result.get('translation_success'))
+    
+    log.info(f"✅ Processed {filepath}: {len((extracted_text.get('best_text') or '').strip())} characters"
+             f" via {extracted_text.get('method_used')}", extra=SAMPLED)
+    log.debug(f"📊 File info: {file_info}")
+    
+    return {
+        'message': 'File uploaded, text extracted, and translated successfully',
+        'filename': filename,
+        'original_name': original_filename,
+        'path': filepath,
+        'info': file_info,
+        'extracted_text': extracted_text
+    }
+
+class JobStore:
+    """In-process store of async upload jobs and their progress events.
+    
+    Every stage a job reaches is appended to its event list; SSE readers
+    block on the condition until new events arrive. Finished jobs are
+    dropped JOB_TTL seconds after they complete.
+    """
+    
+    def __init__(self, ttl=JOB_TTL):
+        self.ttl = ttl
+        self._jobs = {}
+        self._cond = threading.Condition()
+    
+    def create(self, filename):
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._cond:
+            self._expire(now)
+            self._jobs[job_id] = {
+                'job_id': job_id,
+                'filename': filename,
+                'status': 'queued',
+                'stage': 'queued',
+                'created': now,
+                'updated': now,
+                'events': [],
+                'result': None,
+                'error': None
+            }
+        return job_id
+    
+    def add_event(self, job_id, stage, **data):
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                if job['status'] == 'queued' and stage != 'saved':
+                    job['status'] = 'running'
+                self._append(job, stage, data)
+    
+    def finish(self, job_id, result=None, error=None):
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job['result'] = result
+                job['error'] = error
+                job['status'] = 'failed' if error else 'done'
+                self._append(job, job['status'], {'result': result, 'error': error})
+    
+    def _append(self, job, stage, data):
+        now = time.time()
+        job['events'].append({'stage': stage, 'time': now, **data})
+        job['stage'] = stage
+        job['updated'] = now
+        self._cond.notify_all()
+    
+    def get(self, job_id):
+        with self._cond:
+            job = self._jobs.get(job_id)
+            return copy.deepcopy(job) if job else None
+    
+    def wait_events(self, job_id, start, timeout):
+        """Events after index `start`, waiting up to `timeout`; returns (events, finished)"""
+        with self._cond:
+            self._cond.wait_for(lambda: job_id not in self._jobs or
+                                len(self._jobs[job_id]['events']) > start, timeout=timeout)
+            job = self._jobs.get(job_id)
+            if job is None:
+                return [], True
+            return list(job['events'][start:]), job['status'] in ('done', 'failed')
+    
+    def counts(self):
+        """Number of jobs per status"""
+        with self._cond:
+            return Counter(job['status'] for job in self._jobs.values())
+    
+    def _expire(self, now):
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job['status'] in ('done', 'failed') and now - job['updated'] > self.ttl]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+job_store = JobStore()
+_job_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix='job')
+_job_slots = threading.BoundedSemaphore(JOB_WORKERS + JOB_QUEUE_SIZE)
+
+def submit_upload_job(filename, work):
+    """Queue `work(progress)` on the job pool; returns the job ID, or None when full
+    
+    `work` returns the job result, e.g. process_upload's response body.
+    """
+    if not _job_slots.acquire(blocking=False):
+        return None
+    
+    job_id = job_store.create(filename)
+    job_store.add_event(job_id, 'saved', filename=filename)
+    
+    def run():
+        try:
+            result = work(lambda stage, **data: job_store.add_event(job_id, stage, **data))
+            job_store.finish(job_id, result=result)
         except Exception as e:
-            print(f"❌ Failed to load image with PIL: {e}")
-            return create_error_result(f"Failed to load image: {str(e)}")
+            log.error(f"❌ Job {job_id} failed: {str(e)}")
+            job_store.finish(job_id, error=str(e))
+        finally:
+            _job_slots.release()
+    
+    _job_executor.submit(run)
+    log.info(f"📥 Queued job {job_id} for {filename}", extra=SAMPLED)
+    return job_id
+
+def requested_fields():
+    """The ?fields= list (query string or form field), or None for the whole body"""
+    fields = request.args.get('fields') or request.form.get('fields')
+    if not fields:
+        return None
+    return [field.strip() for field in fields.split(',') if field.strip()]
+
+def _lookup_field(body, field):
+    for scope in (body, body.get('extracted_text'), body.get('info')):
+        value = scope
+        for part in field.split('.'):
+            if not isinstance(value, dict) or part not in value:
+                break
+            value = value[part]
+        else:
+            return True, value
+    return False, None
+
+def select_fields(body, fields, keep=()):
+    """Only the requested fields of a result body, keyed by the names asked for
+    
+    Dotted names reach into nested dicts (`translation.bengali_text`),
+    and names missing at the top level are looked up in `extracted_text`
+    and `info`, so `?fields=best_text,translation` works on /upload bodies.
+    Keys in `keep` (line indexes, page numbers) and error bodies pass through.
+    """
+    if not fields or 'error' in body:
+        return body
+    selected = {key: body[key] for key in keep if key in body}
+    for field in fields:
+        found, value = _lookup_field(body, field)
+        if found:
+            selected[field] = value
+    return selected
+
+def make_etag(*parts):
+    """Validator for a representation built from `parts` and the requested fields"""
+    parts = parts + (','.join(requested_fields() or ()),)
+    return hashlib.sha256('\0'.join(map(str, parts)).encode()).hexdigest()[:32]
+
+def not_modified(etag):
+    """304 response when the client already holds `etag`, otherwise None
+    
+    ETags are weak: the same result compressed differently (or with a
+    different cache_hit flag) is still the same result.
+    """
+    if request.method not in ('GET', 'HEAD') or not request.if_none_match.contains_weak(etag):
+        return None
+    metrics.inc('http_not_modified_total', endpoint=request.endpoint)
+    response = Response(status=304)
+    response.set_etag(etag, weak=True)
+    return response
+
+def with_etag(response, etag):
+    """Tag a response so clients can revalidate it with If-None-Match"""
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def file_sha256(filepath, chunk_size=1024 * 1024):
+    """SHA-256 of a file on disk, read in chunks"""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class Overloaded(Exception):
+    """No OCR capacity for a request; `retry_after` is a hint in whole seconds"""
+    
+    def __init__(self, message, retry_after, reason):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.reason = reason
+
+class AdmissionController:
+    """Bounded OCR concurrency with a short wait queue.
+    
+    At most `max_active` images are OCRed at once. A request with a
+    deadline joins a queue of at most `max_waiting` and is turned away
+    straight away when the queue is full or when the expected wait plus an
+    average OCR run would overshoot its deadline; it gives up waiting after
+    `queue_timeout`. Background work (async jobs, batch items, document
+    pages) passes no deadline and waits its turn.
+    """
+    
+    def __init__(self, max_active=OCR_MAX_CONCURRENT, max_waiting=OCR_MAX_WAITING,
+                 queue_timeout=OCR_QUEUE_TIMEOUT):
+        self.max_active = max_active
+        self.max_waiting = max_waiting
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        self.service_time = None  # moving average of seconds per admitted image
+        self._cond = threading.Condition()
+    
+    def _expected_wait(self):
+        """Seconds until a new arrival would get a slot (caller holds the lock)"""
+        if self.active < self.max_active:
+            return 0.0
+        return (self.waiting + 1) / self.max_active * (self.service_time or 1.0)
+    
+    def timeout_error(self):
+        """The Overloaded raised when a request runs out of time waiting for OCR"""
+        with self._cond:
+            return self._reject('timeout', 'Server is busy, try again later')
+    
+    def retry_after(self):
+        with self._cond:
+            return max(1, math.ceil(self._expected_wait() + (self.service_time or 1.0)))
+    
+    def _reject(self, reason, message):
+        self.rejected += 1
+        metrics.inc('ocr_admission_rejections_total', reason=reason)
+        retry_after = max(1, math.ceil(self._expected_wait() + (self.service_time or 1.0)))
+        return Overloaded(message, retry_after, reason)
+    
+    @contextmanager
+    def admit(self, deadline=None):
+        start = time.monotonic()
+        with self._cond:
+            if deadline is not None and self.active >= self.max_active:
+                if self.waiting >= self.max_waiting:
+                    raise self._reject('queue_full', 'Server is busy, try again later')
+                if start + self._expected_wait() + (self.service_time or 0) > deadline:
+                    raise self._reject('deadline', 'Server is busy and could not finish in time, try again later')
+            
+            self.waiting += 1
+            try:
+                while self.active >= self.max_active:
+                    if deadline is None:
+                        self._cond.wait()
+                        continue
+                    # Stop waiting once an average OCR run would no longer fit
+                    give_up = min(start + self.queue_timeout, deadline - (self.service_time or 0))
+                    remaining = give_up - time.monotonic()
+                    if remaining <= 0:
+                        raise self._reject('timeout', 'Server is busy, try again later')
+                    self._cond.wait(remaining)
+            finally:
+                self.waiting -= 1
+            self.active += 1
+        
+        admitted = time.monotonic()
+        metrics.observe('ocr_admission_wait_seconds', admitted - start)
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - admitted
+            with self._cond:
+                self.active -= 1
+                self.service_time = elapsed if self.service_time is None else 0.8 * self.service_time + 0.2 * elapsed
+                self._cond.notify_all()
+    
+    def stats(self):
+        with self._cond:
+            return {
+                'active': self.active,
+                'waiting': self.waiting,
+                'max_active': self.max_active,
+                'max_waiting': self.max_waiting,
+                'rejected': self.rejected,
+                'service_time_seconds': round(self.service_time, 3) if self.service_time is not None else None
+            }
+
+ocr_admission = AdmissionController()
+
+class RateLimiter:
+    """Per-client token buckets: `per_minute` tokens a minute, up to `burst` saved up.
+    
+    Buckets are kept in LRU order and the least recently seen clients are
+    dropped beyond `max_clients`; by then their buckets are usually full.
+    """
+    
+    def __init__(self, per_minute=RATE_LIMIT_PER_MINUTE, burst=RATE_LIMIT_BURST, max_clients=10000):
+        self.rate = per_minute / 60.0
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def take(self, client, cost=1):
+        """Spend `cost` tokens (capped at the burst size); returns 0, or seconds to wait"""
+        if self.rate <= 0:
+            return 0
+        cost = min(cost, self.burst)
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(client, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            wait = 0 if tokens >= cost else (cost - tokens) / self.rate
+            if not wait:
+                tokens -= cost
+            self._buckets[client] = (tokens, now)
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        return wait
+
+rate_limiter = RateLimiter()
+
+def client_id():
+    """Address the rate limit is keyed on"""
+    if RATE_LIMIT_TRUST_FORWARDED:
+        forwarded = request.headers.get('X-Forwarded-For', '').split(',')[0].strip()
+        if forwarded:
+            return forwarded
+    return request.remote_addr or 'unknown'
+
+def too_many_requests(message, retry_after):
+    """429 response with a Retry-After header"""
+    response = jsonify({'error': message, 'retry_after': retry_after})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+def check_rate_limit(cost=1):
+    """429 response when the client is over its rate limit, otherwise None"""
+    wait = rate_limiter.take(client_id(), cost)
+    if not wait:
+        return None
+    metrics.inc('rate_limit_rejections_total', endpoint=request.endpoint)
+    return too_many_requests('Rate limit exceeded, slow down', max(1, math.ceil(wait)))
+
+@app.route('/upload', methods=['POST'])
+def upload_file():
+    deadline = time.monotonic() + REQUEST_DEADLINE
+    limited = check_rate_limit()
+    if limited:
+        return limited
+    
+    try:
+        # Documents may be larger than single images; save_upload still
+        # enforces MAX_FILE_SIZE for JPGs
+        request.max_content_length = max(MAX_FILE_SIZE, DOCUMENT_MAX_BYTES)
+        
+        # Reading request.files parses (and spools) the multipart body
+        with stage_timer('receive'):
+            files = request.files
+        if 'file' not in files:
+            return jsonify({'error': 'No file provided'}), 400
         
-        # Convert to RGB if necessary
-        if pil_img.mode != 'RGB':
-            pil_img = pil_img.convert('RGB')
-            print("🔄 Converted image to RGB")
+        file = files['file']
+        original_filename = request.form.get('filename', file.filename)
         
-        text_results = []
+        if file.filename == '':
+            return jsonify({'error': 'No file selected'}), 400
         
-        # Method 1: Direct OCR on original image
+        if not allowed_file(original_filename):
+            return jsonify({'error': 'Only JPG, TIFF and PDF files are allowed'}), 400
+        
+        run_async = request.args.get('async', request.form.get('async', '')).lower() in ('1', 'true', 'yes')
+        fields = requested_fields()
         try:
-            print("🔍 Trying direct OCR...")
-            text1 = pytesseract.image_to_string(pil_img, config='--psm 6 -c tessedit_char_whitelist=0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz ')
-            text_results.append(("Original", text1.strip()))
-            print(f"✅ Direct OCR result: {len(text1.strip())} characters")
-        except Exception as e:
-            print(f"❌ Direct OCR failed: {e}")
-            text_results.append(("Original", f"Error: {str(e)}"))
+            target_languages = requested_target_languages()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if is_document(original_filename):
+            return upload_document(file, original_filename, run_async, fields=fields,
+                                   target_languages=target_languages)
         
-        # Method 2: Grayscale conversion
+        # Save file
         try:
-            print("🔍 Trying grayscale OCR...")
-            gray_img = pil_img.convert('L')
-            text2 = pytesseract.image_to_string(gray_img, config='--psm 6')
-            text_results.append(("Grayscale", text2.strip()))
-            print(f"✅ Grayscale OCR result: {len(text2.strip())} characters")
-        except Exception as e:
-            print(f"❌ Grayscale OCR failed: {e}")
-            text_results.append(("Grayscale", f"Error: {str(e)}"))
+            filename, image = save_upload(file, original_filename)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        if run_async:
+            def work(progress):
+                return process_upload(image, filename, original_filename, progress=progress,
+                                      target_languages=target_languages)
+            job_id = submit_upload_job(filename, work)
+            if job_id is None:
+                return too_many_requests('Too many queued jobs, try again later', ocr_admission.retry_after())
+            return jsonify({
+                'message': 'File uploaded, processing in background',
+                'job_id': job_id,
+                'filename': filename,
+                'status_url': f'/jobs/{job_id}',
+                'events_url': f'/jobs/{job_id}/events'
+            }), 202
         
-        # Method 3: Enhanced contrast and brightness
+        result = process_upload(image, filename, original_filename, deadline=deadline,
+                                target_languages=target_languages)
+        with stage_timer('serialize'):
+            return jsonify(select_fields(result, fields))
+    
+    except Overloaded as e:
+        return too_many_requests(str(e), e.retry_after)
+    except Exception as e:
+        log.exception(f"❌ Error processing file: {str(e)}")
+        return jsonify({'error': f'Server error: {str(e)}'}), 500
+
+def upload_document(file, original_filename, run_async=False, fields=None, target_languages=None):
+    """/upload for a multi-page TIFF or PDF: streams one NDJSON line per page as it is OCRed
+    
+    The first line describes the `document`, then each line is a page
+    result (or an `error`), and a final `summary` line closes the stream.
+    With async, the pages are collected into the job result instead.
+    `fields` trims each page line as select_fields does.
+    """
+    try:
+        filename, filepath, page_count = save_document(file, original_filename)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    log.info(f"📚 {filename}: {page_count} page(s)")
+    
+    # save_document pinned the file; it stays pinned until the pages are done
+    if run_async:
+        def work(progress):
+            try:
+                return {
+                    'filename': filename,
+                    'original_name': original_filename,
+                    'pages': list(process_document(filepath, filename, original_filename, progress=progress,
+                                                   target_languages=target_languages))
+                }
+            finally:
+                upload_store.unpin(filename)
+        job_id = submit_upload_job(filename, work)
+        if job_id is None:
+            upload_store.unpin(filename)
+            return too_many_requests('Too many queued jobs, try again later', ocr_admission.retry_after())
+        return jsonify({
+            'message': 'Document uploaded, processing in background',
+            'job_id': job_id,
+            'filename': filename,
+            'pages': page_count,
+            'status_url': f'/jobs/{job_id}',
+            'events_url': f'/jobs/{job_id}/events'
+        }), 202
+    
+    def generate():
+        yield json.dumps({'document': {
+            'filename': filename,
+            'original_name': original_filename,
+            'path': filepath,
+            'pages': page_count
+        }}, ensure_ascii=False) + '\n'
+        
+        processed = 0
         try:
-            print("🔍 Trying enhanced OCR...")
-            enhanced_img = ImageEnhance.Contrast(pil_img).enhance(1.5)
-            enhanced_img = ImageEnhance.Brightness(enhanced_img).enhance(1.1)
-            text3 = pytesseract.image_to_string(enhanced_img, config='--psm 6')
-            text_results.append(("Enhanced", text3.strip()))
-            print(f"✅ Enhanced OCR result: {len(text3.strip())} characters")
+            for result in process_document(filepath, filename, original_filename,
+                                           target_languages=target_languages):
+                processed += 1
+                yield json.dumps(select_fields(result, fields, keep=('page',)), ensure_ascii=False) + '\n'
         except Exception as e:
-            print(f"❌ Enhanced OCR failed: {e}")
-            text_results.append(("Enhanced", f"Error: {str(e)}"))
+            log.error(f"❌ Error processing {filename} after {processed} page(s): {str(e)}")
+            yield json.dumps({'page': processed + 1, 'error': f'Server error: {str(e)}'}) + '\n'
+        
+        yield json.dumps({'summary': {'pages': page_count, 'processed': processed}}) + '\n'
+    
+    # call_on_close also runs when the client leaves before the stream starts
+    response = Response(generate(), mimetype='application/x-ndjson')
+    response.call_on_close(lambda: upload_store.unpin(filename))
+    return response
+
+@app.route('/upload_batch', methods=['POST'])
+def upload_batch():
+    """Upload many JPG files in one request; streams one NDJSON line per file as it finishes
+    
+    Files are sent as repeated `files` fields. Each line is the same body
+    /upload returns plus the file's `index` in the request, or an `error`.
+    A final line with `summary` closes the stream.
+    """
+    try:
+        # The per-file limit still applies in save_upload
+        request.max_content_length = BATCH_MAX_FILES * MAX_FILE_SIZE
+        files = request.files.getlist('files') or request.files.getlist('file')
+        
+        if not files:
+            return jsonify({'error': 'No files provided'}), 400
+        
+        if len(files) > BATCH_MAX_FILES:
+            return jsonify({'error': f'Too many files (max {BATCH_MAX_FILES} per batch)'}), 400
+        
+        try:
+            target_languages = requested_target_languages()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # One token per file, so a batch drains the bucket like separate uploads would
+        limited = check_rate_limit(cost=len(files))
+        if limited:
+            return limited
+        
+        saved = []
+        failed = []
+        for index, file in enumerate(files):
+            original_filename = file.filename
+            if not original_filename:
+                failed.append({'index': index, 'original_name': original_filename, 'error': 'No file selected'})
+            elif not allowed_file(original_filename):
+                failed.append({'index': index, 'original_name': original_filename, 'error': 'Only JPG files are allowed'})
+            elif is_document(original_filename):
+                failed.append({'index': index, 'original_name': original_filename,
+                               'error': 'Multi-page documents must be sent to /upload'})
+            else:
+                try:
+                    filename, image = save_upload(file, original_filename)
+                    saved.append((index, filename, original_filename, image))
+                except ValueError as e:
+                    failed.append({'index': index, 'original_name': original_filename, 'error': str(e)})
+        
+        log.info(f"📦 Batch of {len(files)} file(s): {len(saved)} saved, {len(failed)} rejected")
+        fields = requested_fields()
+        
+    except Exception as e:
+        log.error(f"❌ Error processing batch: {str(e)}")
+        return jsonify({'error': f'Server error: {str(e)}'}), 500
+    
+    def generate():
+        for line in failed:
+            yield json.dumps(line, ensure_ascii=False) + '\n'
+        
+        succeeded = 0
+        executor = ThreadPoolExecutor(max_workers=max(1, min(BATCH_CONCURRENCY, len(saved))),
+                                      thread_name_prefix='batch')
+        futures = {
+            executor.submit(process_upload, image, filename, original_filename,
+                            target_languages=target_languages): (index, original_filename)
+            for index, filename, original_filename, image in saved
+        }
+        try:
+            for future in as_completed(futures):
+                index, original_filename = futures[future]
+                try:
+                    line = {'index': index, **select_fields(future.result(), fields)}
+                    succeeded += 1
+                except Exception as e:
+                    line = {'index': index, 'original_name': original_filename, 'error': f'Server error: {str(e)}'}
+                yield json.dumps(line, ensure_ascii=False) + '\n'
+        finally:
+            # Client went away or we're done: drop anything not started yet
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=False)
+        
+        yield json.dumps({'summary': {
+            'total': len(files),
+            'succeeded': succeeded,
+            'failed': len(files) - succeeded
+        }}) + '\n'
+    
+    return Response(generate(), mimetype='application/x-ndjson')
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Status, progress events and (once done) the result of an async upload"""
+    job = job_store.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
+@app.route('/jobs/<job_id>/events', methods=['GET'])
+def stream_job_events(job_id):
+    """Server-sent events stream of an async upload's stages"""
+    if job_store.get(job_id) is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    def generate():
+        sent = 0
+        while True:
+            events, finished = job_store.wait_events(job_id, sent, timeout=15)
+            for event in events:
+                yield f"event: {event['stage']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+            sent += len(events)
+            if finished:
+                break
+            if not events:
+                yield ": keep-alive\n\n"
+    
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/translate', methods=['POST'])
+def translate_text():
+    """Endpoint to translate any text to Bengali
+    
+    `target_language` (default 'bn') may also be a list or a comma-separated
+    string, or sent as `target_languages`: the languages are translated
+    concurrently and returned under `translations`, with whatever finished before the
+    deadline when some are slow. `translation` is the first target's.
+    """
+    try:
+        data = request.get_json()
+        
+        if not data or 'text' not in data:
+            return jsonify({'error': 'No text provided'}), 400
         
-        # Method 4: OpenCV preprocessing
+        text = data['text']
+        requested = data.get('target_languages', data.get('target_language'))
         try:
-            print("🔍 Trying OpenCV preprocessed OCR...")
-            # Convert PIL to OpenCV format
-            cv_img = cv2.cvtColor(np.array(pil_img), cv2.COLOR_RGB2BGR)
-            processed_img = preprocess_image_for_ocr(cv_img)
+            target_languages = parse_target_languages(requested)  # Default to Bengali
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        translations = translate_text_to_languages(text, target_languages)
+        body = {
+            'message': 'Translation completed',
+            'translation': translations[target_languages[0]]
+        }
+        if isinstance(requested, list) or len(target_languages) > 1:
+            body['translations'] = translations
+            body['incomplete'] = sorted(dest for dest, result in translations.items() if result.get('timed_out'))
+        return jsonify(body)
+        
+    except Exception as e:
+        log.error(f"❌ Translation error: {str(e)}")
+        return jsonify({'error': f'Translation error: {str(e)}'}), 500
+
+def extract_text_from_image(source, progress=None):
+    """Extract text from image using OCR with preprocessing
+    
+    `source` is either a file path or an already decoded DecodedImage.
+    `progress(stage, **data)` is called as each OCR variant finishes.
+    """
+    try:
+        if isinstance(source, DecodedImage):
+            image = source
+            log.info(f"🔍 Starting text extraction from: {image.path or 'upload stream'}", extra=SAMPLED)
+        else:
+            filepath = source
+            log.info(f"🔍 Starting text extraction from: {filepath}", extra=SAMPLED)
             
-            # Convert back to PIL for OCR
-            if len(processed_img.shape) == 2:  # Grayscale
-                processed_pil = Image.fromarray(processed_img, mode='L')
-            else:  # Color
-                processed_pil = Image.fromarray(cv2.cvtColor(processed_img, cv2.COLOR_BGR2RGB))
+            # Verify file exists and is readable
+            if not os.path.exists(filepath):
+                return create_error_result("File not found")
             
-            text4 = pytesseract.image_to_string(processed_pil, config='--psm 6')
-            text_results.append(("Preprocessed", text4.strip()))
-            print(f"✅ Preprocessed OCR result: {len(text4.strip())} characters")
-        except Exception as e:
-            print(f"❌ Preprocessed OCR failed: {e}")
-            text_results.append(("Preprocessed", f"Error: {str(e)}"))
+            # Try to read the image file
+            try:
+                image = DecodedImage.from_path(filepath)
+            except Exception as e:
+                log.error(f"❌ Failed to load image with PIL: {e}")
+                return create_error_result(f"Failed to load image: {str(e)}")
         
-        # Method 5: Different PSM mode
-        try:
-            print("🔍 Trying PSM 3 OCR...")
-            text5 = pytesseract.image_to_string(pil_img, config='--psm 3')
-            text_results.append(("PSM 3", text5.strip()))
-            print(f"✅ PSM 3 OCR result: {len(text5.strip())} characters")
-        except Exception as e:
-            print(f"❌ PSM 3 OCR failed: {e}")
-            text_results.append(("PSM 3", f"Error: {str(e)}"))
+        log.debug(f"📷 Image loaded: {image.size}, mode: {image.mode}")
+        
+        if OCR_SCHEDULE == 'early_exit':
+            text_results, early_exit, osd, ran = run_ocr_plan(image, progress=progress)
+        else:
+            osd = apply_orientation_script(image) if OCR_OSD != 'off' else None
+            text_results = run_ocr_variants(image, adjust_variants(OCR_VARIANTS, osd), progress=progress,
+                                            lang=osd['lang'] if osd else None)
+            early_exit = False
+            ran = [method for method, *_ in text_results]
         
         # Filter out error results and find the best one
-        valid_results = [(method, text) for method, text in text_results if not text.startswith("Error:")]
+        valid_results = [result for result in text_results if not result[1].startswith("Error:")]
         
         if not valid_results:
-            error_messages = [text for _, text in text_results if text.startswith("Error:")]
+            error_messages = [text for _, text, *_ in text_results if text.startswith("Error:")]
             return create_error_result(f"All OCR methods failed. Last error: {error_messages[-1] if error_messages else 'Unknown error'}")
         
-        # Find the result with the most meaningful text
-        best_result = max(valid_results, key=lambda x: len(x[1].strip()))
-        
-        print(f"🔍 OCR Results Summary:")
-        for method, text in text_results:
-            status = "✅" if not text.startswith("Error:") else "❌"
-            char_count = len(text.strip()) if not text.startswith("Error:") else 0
-            print(f"  {status} {method}: {char_count} characters")
+        # The most confident variant supplies the layout; at each of its words
+        # the variants' readings are weighed by confidence
+        ranked = sorted(valid_results, key=lambda x: x[2], reverse=True)
+        best_result = ranked[0]
+        words, merged_words = merge_variant_words([result[4] for result in ranked])
+        # The win goes to the reading the merged text is closest to, the most confident on a tie
+        final_text = words.to_text()
+        source = max(ranked, key=lambda result: difflib.SequenceMatcher(None, result[1], final_text).ratio())
+        ocr_scheduler.record(ran, ocr_scheduler.credit(source[0], osd), early_exit)
         
-        print(f"🏆 Best result: {best_result[0]} with {len(best_result[1].strip())} characters")
+        if log.isEnabledFor(logging.DEBUG):
+            summary = ', '.join(f"{method} {len(text.strip()) if not text.startswith('Error:') else 'failed'}"
+                                f"/{confidence:.0f}" for method, text, confidence, *_ in text_results)
+            log.debug(f"🔍 OCR results (characters/confidence): {summary}")
+        log.info(f"🏆 Best result: {best_result[0]} with {len(words)} words, {merged_words} improved from other variants"
+                 f"{' (early exit)' if early_exit else ''}", extra=SAMPLED)
         
         result = {
-            'best_text': best_result[1],
+            'best_text': words.to_text(),
             'method_used': best_result[0],
-            'all_results': {method: text for method, text in valid_results},
-            'confidence': get_text_confidence(best_result[1]),
+            'all_results': {method: text for method, text, *_ in valid_results},
+            'confidence': int(round(words.confidence())),
+            'variant_confidences': {method: round(confidence, 1) for method, _, confidence, *_ in valid_results},
+            'words': words.to_dict(image.to_original_box),
+            'merged_words': merged_words,
+            'early_exit': early_exit,
+            'normalization': image.normalization,
+            'osd': osd,
+            'regions': best_result[3],
             'total_methods_tried': len(text_results),
             'successful_methods': len(valid_results)
         }
@@ -420,11 +2181,1424 @@ def extract_text_from_image(filepath):
         return result
         
     except Exception as e:
-        print(f"❌ Critical error in text extraction: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception(f"❌ Critical error in text extraction: {e}")
         return create_error_result(f"Critical error: {str(e)}")
 
+class DecodedImage:
+    """An image decoded once and shared by get_file_info and every OCR variant.
+    
+    Metadata comes from the header and the content hash from the raw bytes.
+    Pixel buffers are materialized lazily, only when a variant asks for
+    them, and then shared read-only: one RGB array for the variants that OCR
+    the colour image and one grayscale array that all preprocessing
+    variants start from.
+    """
+    
+    def __init__(self, pil_img, file_size=None, path=None, sha256=None, data=None):
+        self.format = pil_img.format
+        self.mode = pil_img.mode
+        self.width, self.height = pil_img.size
+        self.file_size = file_size
+        self.path = path
+        self.sha256 = sha256
+        self.normalization = None
+        self._regions = False  # not detected yet; None means OCR the whole frame
+        self._variants = {}
+        self._tile_locks = {}
+        self._data = data
+        self._pil = pil_img
+        self._loaded = False
+        self._rgb = None
+        self._gray = None
+        self._phash = None
+        self.rotation = 0  # degrees counter-clockwise the frame was turned to be upright
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def from_bytes(cls, data, path=None):
+        # Image.open only parses the header; pixels are decoded on first use,
+        # so a cache hit never pays for decoding
+        pil_img = Image.open(io.BytesIO(data))
+        return cls(pil_img, file_size=len(data), path=path,
+                   sha256=hashlib.sha256(data).hexdigest(), data=data)
+    
+    @classmethod
+    def from_page(cls, pil_img, path=None, format=None):
+        """Wrap an already decoded document page; the hash covers its pixels"""
+        digest = hashlib.sha256(f"{pil_img.mode}{pil_img.size}".encode())
+        digest.update(pil_img.tobytes())
+        image = cls(pil_img, path=path, sha256=digest.hexdigest())
+        image.format = format
+        return image
+    
+    @classmethod
+    def from_path(cls, path):
+        with open(path, 'rb') as f:
+            return cls.from_bytes(f.read(), path=path)
+    
+    @property
+    def size(self):
+        return (self.width, self.height)
+    
+    def _load(self):
+        """Decode the pixels once, at the normalized OCR resolution (caller holds the lock)"""
+        if self._loaded:
+            return
+        
+        scale = 1.0
+        if OCR_NORMALIZE:
+            try:
+                source = self._data if self._data is not None else self._pil
+                self.normalization = estimate_ocr_scale(source, self.width, self.height)
+                scale = self.normalization['scale']
+            except Exception as e:
+                log.warning(f"⚠️  Resolution probe failed, keeping full size: {e}")
+        
+        target = (max(1, round(self.width * scale)), max(1, round(self.height * scale)))
+        with stage_timer('decode'):
+            if scale < 1 and self.format == 'JPEG':
+                # Let the JPEG decoder skip DCT detail we'd throw away anyway
+                self._pil.draft(self._pil.mode, target)
+            self._pil.load()
+            if self._pil.size != target:
+                self._pil = self._pil.resize(target, Image.LANCZOS, reducing_gap=3.0)
+        if self.normalization is not None:
+            self.normalization['ocr_size'] = list(target)
+            self.normalization['draft_decoded'] = scale < 1 and self.format == 'JPEG'
+        
+        self._data = None
+        self._loaded = True
+    
+    def rgb(self):
+        """H x W x 3 uint8 RGB array at OCR resolution"""
+        with self._lock:
+            if self._rgb is None:
+                self._load()
+                pil_img = self._pil if self._pil.mode == 'RGB' else self._pil.convert('RGB')
+                self._rgb = np.asarray(pil_img)
+                if self._gray is not None:
+                    self._pil = None  # the arrays now hold everything we need
+            return self._rgb
+    
+    def gray(self):
+        """H x W uint8 grayscale array at OCR resolution"""
+        with self._lock:
+            if self._gray is None:
+                self._load()
+                if self._pil is not None:
+                    self._gray = np.asarray(self._pil.convert('L'))
+                else:
+                    self._gray = np.asarray(Image.fromarray(self._rgb).convert('L'))
+                if self._rgb is not None:
+                    self._pil = None
+            return self._gray
+    
+    def text_regions(self):
+        """Text block boxes (x, y, w, h) at OCR resolution in reading order, or None for the whole frame"""
+        if self._regions is False:
+            gray = self.gray()
+            regions = detect_text_regions(gray) if OCR_DETECT_REGIONS else None
+            with self._lock:
+                if self._regions is False:
+                    self._regions = regions
+        return self._regions
+    
+    def copy(self):
+        """A copy to turn or re-read without changing this image; buffers are shared until replaced"""
+        with self._lock:
+            self._load()
+            twin = copy.copy(self)
+            twin._lock = threading.Lock()
+            twin._variants = dict(self._variants)
+            twin._tile_locks = {}
+        return twin
+    
+    def use_whole_frame(self):
+        """Stop OCRing detected regions; later variants read the whole frame"""
+        with self._lock:
+            self._regions = None
+    
+    def variant(self, preparation, region=None, batch=()):
+        """Pixel buffer for a variant of the frame or of one (x, y, w, h) region
+        
+        'rgb' is a view of the colour buffer. Everything else comes from the
+        preprocessing engine, which builds this preparation and the rest of
+        `batch` for the tile in one pass per source buffer; the buffers are
+        kept for the other variants and regions of this image.
+        """
+        def crop(buffer):
+            if region is None:
+                return buffer
+            x, y, w, h = region
+            return buffer[y:y + h, x:x + w]
+        
+        if preparation == 'rgb':
+            return crop(self.rgb())
+        
+        tile = tuple(region) if region is not None else None
+        with self._lock:
+            tile_lock = self._tile_locks.setdefault(tile, threading.Lock())
+        with tile_lock:
+            if (preparation, tile) not in self._variants:
+                by_source = {}
+                for name in dict.fromkeys((preparation, *batch)):
+                    if name != 'rgb' and (name, tile) not in self._variants:
+                        by_source.setdefault(preprocessing.source(name), []).append(name)
+                for source, names in by_source.items():
+                    buffer = self.rgb() if source == 'rgb' else self.gray()
+                    for name, prepared in preprocessing.run(crop(buffer), names).items():
+                        self._variants[(name, tile)] = prepared
+            return self._variants[(preparation, tile)]
+    
+    def rotate(self, degrees):
+        """Turn the frame counter-clockwise by a multiple of 90 degrees (Tesseract's orientation)
+        
+        Text regions and prepared variants are rebuilt for the new frame, so
+        word and region boxes from then on are relative to the upright frame.
+        """
+        turns = (degrees // 90) % 4
+        if not turns:
+            return
+        transpose = (None, Image.Transpose.ROTATE_90, Image.Transpose.ROTATE_180, Image.Transpose.ROTATE_270)[turns]
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            if self._pil is not None:
+                self._pil = self._pil.transpose(transpose)
+            if self._rgb is not None:
+                self._rgb = np.ascontiguousarray(np.rot90(self._rgb, turns))
+            if self._gray is not None:
+                self._gray = np.ascontiguousarray(np.rot90(self._gray, turns))
+            self._variants = {}
+            self._tile_locks = {}
+            self._regions = False
+            self.rotation = (self.rotation + turns * 90) % 360
+    
+    def perceptual_hash(self):
+        """Difference hash (dHash) of a (PHASH_SIZE + 1) x PHASH_SIZE grayscale thumbnail, as an int
+        
+        Each bit says whether a thumbnail pixel is brighter than its right
+        neighbour, so re-encoding, rescaling and mild exposure changes flip
+        few bits. The thumbnail is cropped to the ink first; labels are mostly
+        blank and the whole frame would hash alike whatever the text. JPEGs
+        are draft-decoded at a fraction of full size for it.
+        """
+        with self._lock:
+            if self._phash is None:
+                if self._data is not None:
+                    thumb = Image.open(io.BytesIO(self._data))
+                    thumb.draft('L', (PHASH_SIZE * 32, PHASH_SIZE * 32))
+                elif self._pil is not None:
+                    thumb = self._pil
+                else:
+                    thumb = Image.fromarray(self._gray if self._gray is not None else self._rgb)
+                thumb = thumb.convert('L')
+                thumb.thumbnail((PHASH_SIZE * 32, PHASH_SIZE * 32))
+                pixels = np.asarray(thumb, dtype=np.int16)
+                ink = np.abs(pixels - int(np.median(pixels))) > 48
+                rows, cols = np.flatnonzero(ink.any(axis=1)), np.flatnonzero(ink.any(axis=0))
+                if len(rows) and len(cols):
+                    thumb = thumb.crop((cols[0], rows[0], cols[-1] + 1, rows[-1] + 1))
+                small = np.asarray(thumb.resize((PHASH_SIZE + 1, PHASH_SIZE), Image.BILINEAR), dtype=np.int16)
+                bits = (small[:, 1:] > small[:, :-1]).ravel()
+                self._phash = int.from_bytes(np.packbits(bits).tobytes(), 'big')
+            return self._phash
+    
+    def to_original_box(self, box):
+        """Map an (x, y, w, h) box at OCR resolution back to the uploaded image"""
+        scale = self.normalization['scale'] if self.normalization else 1.0
+        return [int(round(v / scale)) for v in box]
+    
+    def __getstate__(self):
+        # Locks don't pickle; needed when OCR runs on a process pool
+        state = self.__dict__.copy()
+        del state['_lock']
+        state['_tile_locks'] = {}
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+def estimate_text_height(gray):
+    """Median glyph height in pixels of a grayscale image, or None if no text-like blobs"""
+    binary = cv2.adaptiveThreshold(
+        gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, 25, 15
+    )
+    _, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+    widths = stats[1:, cv2.CC_STAT_WIDTH]
+    heights = stats[1:, cv2.CC_STAT_HEIGHT]
+    fill = stats[1:, cv2.CC_STAT_AREA] / np.maximum(widths * heights, 1)
+    
+    # Keep glyph-shaped components: not specks, lines, frames or solid blocks
+    glyphs = ((heights >= 4) & (heights <= gray.shape[0] * 0.3) &
+              (widths <= heights * 2) & (fill > 0.1) & (fill < 0.95))
+    if np.count_nonzero(glyphs) < 5:
+        return None
+    return float(np.median(heights[glyphs]))
+
+def merge_overlapping_boxes(boxes):
+    """Merge [x1, y1, x2, y2] boxes until none overlap
+    
+    Each pass sweeps the boxes left to right and grows a block by every box
+    that overlaps it, comparing only against blocks that reach past the
+    box's left edge. A grown block can overlap one its parts didn't, so
+    passes repeat until one merges nothing; that is usually the second.
+    """
+    while True:
+        blocks = []
+        active = []
+        for box in sorted(boxes):
+            active = [block for block in active if block[2] > box[0]]
+            for block in active:
+                if block[1] < box[3] and box[1] < block[3]:
+                    block[1:] = [min(block[1], box[1]), max(block[2], box[2]), max(block[3], box[3])]
+                    break
+            else:
+                block = list(box)
+                blocks.append(block)
+                active.append(block)
+        if len(blocks) == len(boxes):
+            return blocks
+        boxes = blocks
+
+def detect_text_regions(gray):
+    """Find text blocks with a morphological gradient; returns boxes or None
+    
+    Boxes are (x, y, w, h) in reading order. None means the whole frame
+    should be OCRed: nothing text-like was found, there are too many
+    blocks, text covers most of the image anyway, or some lettering is far
+    larger than the normalized text height and wouldn't be boxed as lines.
+    """
+    img_h, img_w = gray.shape[:2]
+    kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
+    gradient = cv2.morphologyEx(gray, cv2.MORPH_GRADIENT, kernel)
+    _, edges = cv2.threshold(gradient, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+    
+    # Smear glyph edges into words and lines; images are normalized, so
+    # glyphs are roughly OCR_TARGET_TEXT_HEIGHT tall
+    join = cv2.getStructuringElement(cv2.MORPH_RECT, (int(OCR_TARGET_TEXT_HEIGHT * 0.75), 3))
+    joined = cv2.morphologyEx(edges, cv2.MORPH_CLOSE, join)
+    contours, _ = cv2.findContours(joined, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if len(contours) > OCR_MAX_REGION_CONTOURS:
+        return None
+    
+    pad = int(OCR_TARGET_TEXT_HEIGHT * 0.5)
+    boxes = []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        if h < 6 or w < 6:
+            continue
+        density = cv2.countNonZero(edges[y:y + h, x:x + w]) / (w * h)
+        if h > OCR_TARGET_TEXT_HEIGHT * 3 and density >= 0.05:
+            # Big lettering (a brand name, or normalization is off): its
+            # glyphs don't join into lines and only their outlines are edged
+            return None
+        # Text lines are wider than tall and densely edged
+        if w < h * 0.8 or density < 0.15:
+            continue
+        boxes.append([max(x - pad, 0), max(y - pad, 0), min(x + w + pad, img_w), min(y + h + pad, img_h)])
+    
+    # Merge overlapping padded lines into blocks
+    boxes = merge_overlapping_boxes(boxes)
+    
+    if not boxes or len(boxes) > OCR_MAX_REGIONS:
+        return None
+    covered = sum((x2 - x1) * (y2 - y1) for x1, y1, x2, y2 in boxes)
+    if covered > img_w * img_h * OCR_REGION_MAX_COVERAGE:
+        return None
+    
+    # Reading order: top to bottom in bands of one text height, then left to right
+    boxes.sort(key=lambda b: (b[1] // int(OCR_TARGET_TEXT_HEIGHT), b[0]))
+    return [(x1, y1, x2 - x1, y2 - y1) for x1, y1, x2, y2 in boxes]
+
+def estimate_ocr_scale(source, width, height):
+    """Pick the scale that puts the image's text near OCR_TARGET_TEXT_HEIGHT
+    
+    `source` is the encoded image bytes or an already decoded PIL image.
+    Text height is measured on a small probe decoded with JPEG draft mode,
+    which costs a fraction of a full decode. Images are only shrunk when the
+    text is clearly larger than needed and only enlarged when it is too
+    small to read reliably.
+    """
+    probe = Image.open(io.BytesIO(source)) if isinstance(source, bytes) else source
+    factor = min(1.0, OCR_PROBE_SIZE / max(width, height))
+    if probe.format == 'JPEG' and factor < 1:
+        probe.draft('L', (round(width * factor), round(height * factor)))
+    probe = probe.convert('L')
+    if max(probe.size) > OCR_PROBE_SIZE * 1.5:
+        probe.thumbnail((OCR_PROBE_SIZE, OCR_PROBE_SIZE))
+    probe_factor = probe.width / width
+    
+    probe_height = estimate_text_height(np.asarray(probe))
+    scale = 1.0
+    text_height = None
+    if probe_height is not None:
+        text_height = probe_height / probe_factor
+        if text_height > OCR_TARGET_TEXT_HEIGHT * 1.25 and probe_height >= 8:
+            # Too coarse a probe can't vouch for small text, so only shrink on clear evidence
+            scale = OCR_TARGET_TEXT_HEIGHT / text_height
+        elif text_height < OCR_MIN_TEXT_HEIGHT:
+            scale = min(OCR_MAX_UPSCALE, OCR_TARGET_TEXT_HEIGHT / text_height)
+    
+    return {
+        'scale': round(scale, 4),
+        'estimated_text_height': round(text_height, 1) if text_height is not None else None,
+        'original_size': [width, height]
+    }
+
+# OCR variants tried on every image: (method name, image preparation, page segmentation mode, whitelist)
+OCR_WHITELIST = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz '
+OCR_VARIANTS = [
+    ("Original", "rgb", 6, OCR_WHITELIST),
+    ("Grayscale", "gray", 6, None),
+    ("Enhanced", "enhanced", 6, None),
+    ("Preprocessed", "preprocessed", 6, None),
+    ("PSM 3", "rgb", 3, None),
+]
+
+# Relative cost of each variant (preprocessing + recognition); the early-exit
+# plan starts with the cheapest until win rates say otherwise
+OCR_VARIANT_COSTS = {
+    "Grayscale": 1.0,
+    "Original": 1.1,
+    "Enhanced": 1.1,
+    "Preprocessed": 1.3,
+    "PSM 3": 1.6,
+}
+
+class TesseractHandlePool:
+    """Warm tesserocr API handles, pooled per (language, psm, whitelist) configuration.
+    
+    A handle is checked out for one recognition and returned afterwards, so
+    each OCR worker ends up reusing its own initialized handle and the
+    traineddata is loaded once per handle instead of once per call.
+    """
+    
+    def __init__(self, lang=OCR_LANG, path=TESSDATA_PATH):
+        self.lang = lang
+        self.path = path
+        self.created = 0
+        self._idle = {}
+        self._lock = threading.Lock()
+    
+    def _create(self, psm, whitelist, lang):
+        kwargs = {'lang': lang, 'psm': psm}
+        if self.path:
+            kwargs['path'] = self.path
+        api = tesserocr.PyTessBaseAPI(**kwargs)
+        if whitelist:
+            api.SetVariable('tessedit_char_whitelist', whitelist)
+        with self._lock:
+            self.created += 1
+        return api
+    
+    @contextmanager
+    def handle(self, psm, whitelist=None, lang=None):
+        lang = lang or self.lang
+        key = (lang, psm, whitelist or '')
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            api = idle.pop() if idle else None
+        if api is None:
+            api = self._create(psm, whitelist, lang)
+        try:
+            yield api
+        except Exception:
+            # Don't hand a handle in an unknown state to the next caller
+            api.End()
+            raise
+        api.Clear()
+        with self._lock:
+            self._idle[key].append(api)
+    
+    def stats(self):
+        with self._lock:
+            return {
+                'created': self.created,
+                'idle': sum(len(idle) for idle in self._idle.values())
+            }
+    
+    def close(self):
+        with self._lock:
+            handles = [api for idle in self._idle.values() for api in idle]
+            self._idle.clear()
+        for api in handles:
+            api.End()
+
+_tesseract_handles = None
+_ocr_backend = None
+_ocr_backend_lock = threading.Lock()
+
+def get_ocr_backend():
+    """Resolve OCR_BACKEND to the backend actually used ('tesserocr' or 'pytesseract')"""
+    global _ocr_backend, _tesseract_handles
+    with _ocr_backend_lock:
+        if _ocr_backend is None:
+            backend = OCR_BACKEND
+            if backend in ('auto', 'tesserocr'):
+                try:
+                    tesserocr.load()
+                    pool = TesseractHandlePool()
+                    with pool.handle(6):
+                        pass
+                    _tesseract_handles = pool
+                    backend = 'tesserocr'
+                except Exception as e:
+                    if OCR_BACKEND == 'tesserocr':
+                        raise
+                    log.warning(f"⚠️  In-process Tesseract unavailable ({e}), using pytesseract")
+                    backend = 'pytesseract'
+            _ocr_backend = backend
+            log.info(f"🔧 OCR backend: {_ocr_backend}")
+        return _ocr_backend
+
+def build_tesseract_config(psm, whitelist=None):
+    """Build a pytesseract config string for the given PSM and whitelist"""
+    config = f'--psm {psm}'
+    if whitelist:
+        config += f' -c tessedit_char_whitelist={whitelist}'
+    return config
+
+class OCRWords:
+    """Word-level output of one Tesseract pass, stored as parallel arrays.
+    
+    One entry per recognized word: its text, an (x, y, w, h) box, Tesseract's
+    0-100 word confidence, and block and line numbers describing the
+    layout. Boxes are in the pixels of the recognized image until shifted
+    into frame coordinates.
+    """
+    
+    __slots__ = ('words', 'boxes', 'confidences', 'blocks', 'lines')
+    
+    def __init__(self, words=(), boxes=(), confidences=(), blocks=(), lines=()):
+        self.words = list(words)
+        self.boxes = np.asarray(boxes, dtype=np.int32).reshape(len(self.words), 4)
+        self.confidences = np.asarray(confidences, dtype=np.float32)
+        self.blocks = np.asarray(blocks, dtype=np.int32)
+        self.lines = np.asarray(lines, dtype=np.int32)
+    
+    @classmethod
+    def from_tesserocr(cls, api):
+        """Words of the last Recognize() call, read from the result iterator"""
+        level = tesserocr.RIL.WORD
+        words, boxes, confidences, blocks, lines = [], [], [], [], []
+        block = line = 0
+        for word in tesserocr.iterate_level(api.GetIterator(), level):
+            if word.Empty(level):
+                continue
+            if words and word.IsAtBeginningOf(tesserocr.RIL.BLOCK):
+                block += 1
+            if words and word.IsAtBeginningOf(tesserocr.RIL.TEXTLINE):
+                line += 1
+            text = word.GetUTF8Text(level).strip()
+            if not text:
+                continue
+            x1, y1, x2, y2 = word.BoundingBox(level)
+            words.append(text)
+            boxes.append((x1, y1, x2 - x1, y2 - y1))
+            confidences.append(word.Confidence(level))
+            blocks.append(block)
+            lines.append(line)
+        return cls(words, boxes, confidences, blocks, lines)
+    
+    @classmethod
+    def from_tsv(cls, data):
+        """Words from pytesseract.image_to_data(..., output_type=Output.DICT)"""
+        words, boxes, confidences, blocks, lines = [], [], [], [], []
+        block_ids = {}
+        line_ids = {}
+        for i, text in enumerate(data['text']):
+            text = str(text).strip()
+            confidence = float(data['conf'][i])
+            if not text or confidence < 0:
+                continue
+            block = data['block_num'][i]
+            words.append(text)
+            boxes.append((data['left'][i], data['top'][i], data['width'][i], data['height'][i]))
+            confidences.append(confidence)
+            blocks.append(block_ids.setdefault(block, len(block_ids)))
+            lines.append(line_ids.setdefault((block, data['par_num'][i], data['line_num'][i]), len(line_ids)))
+        return cls(words, boxes, confidences, blocks, lines)
+    
+    def __len__(self):
+        return len(self.words)
+    
+    def confidence(self):
+        """Mean word confidence weighted by word length; 0 without words"""
+        if not self.words:
+            return 0.0
+        lengths = np.fromiter(map(len, self.words), dtype=np.float32, count=len(self.words))
+        return float(np.dot(self.confidences, lengths) / lengths.sum())
+    
+    def to_text(self):
+        """Words joined by spaces, one line per layout line, a blank line between blocks"""
+        parts = []
+        previous = None
+        for word, block, line in zip(self.words, self.blocks.tolist(), self.lines.tolist()):
+            if previous is not None:
+                parts.append(' ' if (block, line) == previous else '\n' if block == previous[0] else '\n\n')
+            parts.append(word)
+            previous = (block, line)
+        return ''.join(parts)
+    
+    @classmethod
+    def concat(cls, parts, offsets):
+        """Join per-tile words, moving each tile's boxes by its (dx, dy) offset
+        
+        Block and line numbers are renumbered so tiles stay distinct.
+        """
+        words, boxes, confidences, blocks, lines = [], [], [], [], []
+        block_base = line_base = 0
+        for part, (dx, dy) in zip(parts, offsets):
+            if not len(part):
+                continue
+            words.extend(part.words)
+            boxes.append(part.boxes + np.array([dx, dy, 0, 0], dtype=np.int32))
+            confidences.append(part.confidences)
+            blocks.append(part.blocks + block_base)
+            lines.append(part.lines + line_base)
+            block_base += int(part.blocks.max()) + 1
+            line_base += int(part.lines.max()) + 1
+        if not words:
+            return cls()
+        return cls(words, np.concatenate(boxes), np.concatenate(confidences),
+                   np.concatenate(blocks), np.concatenate(lines))
+    
+    def to_dict(self, map_box=None):
+        """Columnar JSON form; `map_box` converts each box, e.g. to upload coordinates"""
+        boxes = self.boxes.tolist()
+        return {
+            'text': list(self.words),
+            'bbox': [map_box(box) for box in boxes] if map_box else boxes,
+            'confidence': [round(confidence, 1) for confidence in self.confidences.tolist()],
+            'block': self.blocks.tolist(),
+            'line': self.lines.tolist()
+        }
+
+def box_iou(a, b):
+    """Pairwise intersection-over-union of (x, y, w, h) box arrays; len(a) x len(b)"""
+    a = a.astype(np.float32)
+    b = b.astype(np.float32)
+    left = np.maximum(a[:, None, 0], b[None, :, 0])
+    top = np.maximum(a[:, None, 1], b[None, :, 1])
+    right = np.minimum(a[:, None, 0] + a[:, None, 2], b[None, :, 0] + b[None, :, 2])
+    bottom = np.minimum(a[:, None, 1] + a[:, None, 3], b[None, :, 1] + b[None, :, 3])
+    intersection = np.clip(right - left, 0, None) * np.clip(bottom - top, 0, None)
+    areas_a = a[:, 2] * a[:, 3]
+    areas_b = b[:, 2] * b[:, 3]
+    return intersection / np.maximum(areas_a[:, None] + areas_b[None, :] - intersection, 1)
+
+def merge_variant_words(ranked, min_overlap=0.5):
+    """Confidence-weighted word-level vote across several variants' OCRWords
+    
+    `ranked` starts with the most confident variant, which supplies the
+    layout. At each of its words, every variant whose word box overlaps by
+    at least `min_overlap` IoU votes for its reading with its confidence,
+    and the reading with the highest total wins, so one variant's confident
+    misread can't override several that agree. Returns (merged OCRWords,
+    number of words that differ from the anchor).
+    """
+    anchor = ranked[0]
+    votes = [{word: confidence} for word, confidence in zip(anchor.words, anchor.confidences.tolist())]
+    best = [{word: confidence} for word, confidence in zip(anchor.words, anchor.confidences.tolist())]
+    for other in ranked[1:]:
+        if not len(anchor) or not len(other):
+            continue
+        overlaps = box_iou(anchor.boxes, other.boxes)
+        match = overlaps.argmax(axis=1)
+        for i in np.flatnonzero(overlaps[np.arange(len(anchor)), match] >= min_overlap).tolist():
+            j = int(match[i])
+            word = other.words[j]
+            confidence = float(other.confidences[j])
+            votes[i][word] = votes[i].get(word, 0.0) + confidence
+            best[i][word] = max(best[i].get(word, 0.0), confidence)
+    
+    words = [max(tally, key=tally.get) for tally in votes]
+    confidences = [best[i][word] for i, word in enumerate(words)]
+    changed = sum(word != original for word, original in zip(words, anchor.words))
+    return OCRWords(words, anchor.boxes, confidences, anchor.blocks, anchor.lines), changed
+
+def ocr_image(img, psm=6, whitelist=None, timeout=OCR_VARIANT_TIMEOUT, lang=None):
+    """Run Tesseract on a PIL image or uint8 NumPy array and return the recognized text"""
+    return ocr_image_words(img, psm=psm, whitelist=whitelist, timeout=timeout, lang=lang).to_text()
+
+def ocr_image_words(img, psm=6, whitelist=None, timeout=OCR_VARIANT_TIMEOUT, lang=None):
+    """Like ocr_image, but returns the words with boxes, layout and confidences as OCRWords
+    
+    Everything comes from the same recognition pass: the result iterator on
+    tesserocr, a single TSV run (image_to_data) on pytesseract.
+    """
+    if get_ocr_backend() == 'pytesseract':
+        if isinstance(img, np.ndarray):
+            img = Image.fromarray(img)  # shares the array's memory
+        metrics.inc('tesseract_subprocess_calls_total')
+        data = pytesseract.image_to_data(img, lang=lang or OCR_LANG,
+                                         config=build_tesseract_config(psm, whitelist),
+                                         timeout=timeout, output_type=pytesseract.Output.DICT)
+        return OCRWords.from_tsv(data)
+    
+    if not isinstance(img, np.ndarray):
+        if img.mode not in ('L', 'RGB'):
+            img = img.convert('RGB')
+        img = np.asarray(img)
+    height, width = img.shape[:2]
+    bytes_per_pixel = 1 if img.ndim == 2 else img.shape[2]
+    with _tesseract_handles.handle(psm, whitelist, lang) as api:
+        # Raw pixels go straight to Tesseract, no temp file or re-encode
+        api.SetImageBytes(_pixel_bytes(img), width, height,
+                          bytes_per_pixel, bytes_per_pixel * width)
+        if not api.Recognize(timeout=int(timeout * 1000)):
+            raise RuntimeError('Tesseract recognition failed or timed out')
+        return OCRWords.from_tesserocr(api)
+
+def _pixel_bytes(arr):
+    """Bytes for a pixel array, reusing the backing buffer when it already is one"""
+    # Arrays taken from PIL images with np.asarray are views over a bytes object
+    if isinstance(arr.base, bytes) and arr.flags.c_contiguous and len(arr.base) == arr.nbytes:
+        return arr.base
+    return arr.tobytes()
+
+_installed_languages = None
+
+def installed_languages():
+    """Traineddata names the active backend can load"""
+    global _installed_languages
+    if _installed_languages is None:
+        try:
+            if get_ocr_backend() == 'tesserocr':
+                languages = tesserocr.get_languages(os.path.join(TESSDATA_PATH, '') if TESSDATA_PATH else '')[1]
+            else:
+                languages = pytesseract.get_languages(config='')
+            _installed_languages = set(languages)
+        except Exception as e:
+            log.warning(f"⚠️  Could not list Tesseract languages: {e}")
+            _installed_languages = set(OCR_LANG.split('+'))
+    return _installed_languages
+
+def script_language(script):
+    """Tesseract language(s) for a detected script, falling back to OCR_LANG when not installed"""
+    lang = OCR_SCRIPT_LANGS.get(script)
+    if not lang:
+        return OCR_LANG
+    if all(part in installed_languages() for part in lang.split('+')):
+        return lang
+    log.warning(f"⚠️  {script} text detected but {lang} traineddata is not installed, using {OCR_LANG}",
+                extra=SAMPLED)
+    return OCR_LANG
+
+def detect_orientation_script(gray):
+    """Tesseract OSD on a downscaled frame
+    
+    Returns the orientation (degrees counter-clockwise that turn the frame
+    upright), the script and both confidences, or None when there is too
+    little text to tell.
+    """
+    height, width = gray.shape
+    factor = min(1.0, OCR_OSD_MAX_SIDE / max(height, width))
+    if factor < 1:
+        gray = cv2.resize(gray, (max(1, round(width * factor)), max(1, round(height * factor))),
+                          interpolation=cv2.INTER_AREA)
+        height, width = gray.shape
+    
+    try:
+        if get_ocr_backend() == 'pytesseract':
+            metrics.inc('tesseract_subprocess_calls_total')
+            data = pytesseract.image_to_osd(Image.fromarray(gray), config='--psm 0', timeout=OCR_VARIANT_TIMEOUT,
+                                            output_type=pytesseract.Output.DICT)
+            return {
+                'orientation': int(data['orientation']),
+                'orientation_confidence': round(float(data['orientation_conf']), 2),
+                'script': data['script'],
+                'script_confidence': round(float(data['script_conf']), 2)
+            }
+        
+        with _tesseract_handles.handle(0) as api:
+            api.SetImageBytes(_pixel_bytes(gray), width, height, 1, width)
+            data = api.DetectOrientationScript()
+    except Exception as e:
+        # pytesseract raises on too few characters; tesserocr returns None
+        log.debug(f"🧭 OSD gave no answer: {e}")
+        return None
+    if not data:
+        return None
+    return {
+        'orientation': int(data['orient_deg']),
+        'orientation_confidence': round(float(data['orient_conf']), 2),
+        'script': data['script_name'],
+        'script_confidence': round(float(data['script_conf']), 2)
+    }
+
+def apply_orientation_script(image):
+    """Detect orientation and script, turn the image upright and pick the language
+    
+    Orientation and script are only acted on above OCR_OSD_MIN_CONFIDENCE.
+    Returns the OSD report for the result (detection, `rotated` degrees in
+    total, the `lang` to read with), or None when OSD had nothing to say.
+    """
+    with metrics.timer('ocr_osd_duration_seconds'):
+        osd = detect_orientation_script(image.gray())
+    if osd is None:
+        metrics.inc('ocr_osd_total', outcome='no_text')
+        return None
+    
+    if osd['orientation'] and osd['orientation_confidence'] >= OCR_OSD_MIN_CONFIDENCE:
+        image.rotate(osd['orientation'])
+    osd['rotated'] = image.rotation
+    non_latin = osd['script'] != 'Latin' and osd['script_confidence'] >= OCR_OSD_MIN_CONFIDENCE
+    osd['lang'] = script_language(osd['script']) if non_latin else OCR_LANG
+    osd['whitelist'] = not non_latin
+    
+    outcome = 'rotated' if osd['rotated'] else 'script' if non_latin else 'upright'
+    metrics.inc('ocr_osd_total', outcome=outcome)
+    turned = f" after turning {osd['rotated']}°" if osd['rotated'] else ''
+    log.info(f"🧭 OSD: {osd['script']} ({osd['script_confidence']}), orientation {osd['orientation']}° "
+             f"({osd['orientation_confidence']}), reading with {osd['lang']}{turned}", extra=SAMPLED)
+    return osd
+
+def adjust_variants(variants, osd):
+    """Variants for the detected script: the ASCII whitelist would erase non-Latin text"""
+    if osd is None or osd['whitelist']:
+        return variants
+    return [(method, preparation, psm, None) for method, preparation, psm, _ in variants]
+
+def targeted_variant(image, variant, osd):
+    """The one pass OSD settles on: `variant`'s preparation without a whitelist, PSM 6 on
+    detected text blocks or 3 (automatic layout) on the whole page; recorded in `osd`"""
+    method, preparation, _, _ = variant
+    psm = 6 if image.text_regions() else 3
+    osd['targeted'] = [preparation, psm]
+    osd['targeted_from'] = method
+    return ("Targeted", preparation, psm, None)
+
+_ocr_executor = None
+_ocr_executor_lock = threading.Lock()
+
+def get_ocr_executor():
+    """Return the shared OCR worker pool, creating it on first use"""
+    global _ocr_executor
+    with _ocr_executor_lock:
+        if _ocr_executor is None:
+            if OCR_POOL_KIND == 'process':
+                _ocr_executor = ProcessPoolExecutor(max_workers=OCR_POOL_WORKERS)
+            else:
+                _ocr_executor = ThreadPoolExecutor(max_workers=OCR_POOL_WORKERS,
+                                                   thread_name_prefix='ocr')
+            log.info(f"🧵 OCR pool started: {OCR_POOL_KIND} x {OCR_POOL_WORKERS}")
+        return _ocr_executor
+
+def run_ocr_variant(method, image, preparation, psm, whitelist, timeout=OCR_VARIANT_TIMEOUT,
+                    region=None, batch=(), lang=None):
+    """Run a single OCR variant on the frame or one region; returns (method, text, confidence, words)
+    
+    `batch` names the other preparations running alongside this one, so the
+    first task to touch a tile builds all of them in one preprocessing pass.
+    Errors come back as 'Error: ...' text with no words. Confidence is the
+    length-weighted mean of Tesseract's word confidences.
+    """
+    start = time.perf_counter()
+    try:
+        variant_img = image.variant(preparation, region, batch)
+        words = ocr_image_words(variant_img, psm=psm, whitelist=whitelist, timeout=timeout, lang=lang)
+        text = words.to_text()
+        confidence = words.confidence()
+        if region is None:
+            log.debug(f"✅ {method} OCR result: {len(text)} characters, confidence {confidence:.0f}")
+        outcome = 'ok'
+        return (method, text, confidence, words)
+    except Exception as e:
+        log.warning(f"❌ {method} OCR failed: {e}")
+        outcome = 'error'
+        return (method, f"Error: {str(e)}", 0, None)
+    finally:
+        metrics.observe('ocr_variant_duration_seconds', time.perf_counter() - start, method=method)
+        metrics.inc('ocr_variant_runs_total', method=method, outcome=outcome)
+
+def combine_region_results(method, image, regions, tile_results):
+    """Merge per-tile results of one variant into (method, text, confidence, region details, words)
+    
+    Word boxes are moved from tile to frame coordinates.
+    """
+    if regions is None:
+        return (*tile_results[0][:3], None, tile_results[0][3])
+    
+    ok = [(region, text, confidence, words) for region, (_, text, confidence, words) in zip(regions, tile_results)
+          if not text.startswith("Error:")]
+    if not ok:
+        return (method, tile_results[-1][1], 0, None, None)
+    
+    words = OCRWords.concat([words for *_, words in ok], [region[:2] for region, *_ in ok])
+    text = words.to_text()
+    confidence = words.confidence()
+    details = [{'bbox': image.to_original_box(region), 'text': text, 'confidence': confidence}
+               for region, text, confidence, _ in ok]
+    log.debug(f"✅ {method} OCR result: {len(text)} characters from {len(ok)} region(s), confidence {confidence:.0f}")
+    return (method, text, confidence, details, words)
+
+def run_ocr_variants(image, variants=None, total_timeout=OCR_TOTAL_TIMEOUT, progress=None, lang=None):
+    """Run OCR variants concurrently on the worker pool.
+    
+    When text regions were detected, every (variant, region) pair is its
+    own task, so even a single variant spreads over all workers. Results
+    are (method, text, confidence, regions, words) in variant order regardless of
+    completion order. Tasks still queued when the total timeout expires are
+    cancelled; running ones are bounded by their own Tesseract timeout.
+    `lang` overrides OCR_LANG for every variant.
+    
+    Region OCR that reads little or unsurely (regions can miss lettering
+    detection didn't box) is repeated on the whole frame within the same
+    timeout, and the image reads the whole frame from then on. The stronger
+    of the two readings is returned.
+    """
+    start = time.monotonic()
+    variants = OCR_VARIANTS if variants is None else variants
+    executor = get_ocr_executor()
+    regions = image.text_regions()
+    tiles = regions or [None]
+    timeout = min(OCR_VARIANT_TIMEOUT, total_timeout)
+    
+    log.debug(f"🔍 Running {len(variants)} OCR variant(s) concurrently"
+          f"{f' on {len(regions)} text region(s)' if regions else ''}...")
+    batch = tuple(sorted({preparation for _, preparation, *_ in variants}))
+    futures = {}
+    for method, preparation, psm, whitelist in variants:
+        for index, region in enumerate(tiles):
+            future = executor.submit(run_ocr_variant, method, image, preparation, psm, whitelist,
+                                     timeout, region, batch, lang)
+            futures[future] = (method, index)
+    
+    tile_results = {method: [None] * len(tiles) for method, *_ in variants}
+    pending = {method: len(tiles) for method, *_ in variants}
+    combined = {}
+    
+    def finish(method):
+        combined[method] = combine_region_results(method, image, regions, tile_results[method])
+        if progress:
+            _, text, confidence, *_ = combined[method]
+            ok = not text.startswith("Error:")
+            progress('ocr_variant', method=method, success=ok, characters=len(text) if ok else 0,
+                     confidence=confidence)
+    
+    try:
+        for future in as_completed(futures, timeout=total_timeout):
+            method, index = futures[future]
+            try:
+                tile_results[method][index] = future.result()
+            except Exception as e:
+                tile_results[method][index] = (method, f"Error: {str(e)}", 0, None)
+            pending[method] -= 1
+            if pending[method] == 0:
+                finish(method)
+    except FuturesTimeoutError:
+        for future, (method, index) in futures.items():
+            if not future.done():
+                future.cancel()
+                tile_results[method][index] = (method, f"Error: Timed out after {total_timeout}s", 0, None)
+        for method in pending:
+            if method not in combined:
+                log.warning(f"⏱️  {method} OCR timed out")
+                finish(method)
+    
+    results = [combined[method] for method, *_ in variants]
+    if regions and region_reading_is_weak(results, regions):
+        remaining = total_timeout - (time.monotonic() - start)
+        image.use_whole_frame()
+        if remaining > 0:
+            log.info("🔲 Region OCR read little, trying the whole frame", extra=SAMPLED)
+            whole = run_ocr_variants(image, variants, total_timeout=remaining, progress=progress, lang=lang)
+            kept = 'whole_frame' if reading_strength(whole) > reading_strength(results) else 'regions'
+            metrics.inc('ocr_region_fallback_total', kept=kept)
+            if kept == 'whole_frame':
+                return whole
+    return results
+
+def reading_strength(results):
+    """(letters and digits, confidence) of the most confident successful result, for comparing readings"""
+    valid = [result for result in results if not result[1].startswith("Error:")]
+    if not valid:
+        return (-1, 0)
+    _, text, confidence, *_ = max(valid, key=lambda result: result[2])
+    return (sum(ch.isalnum() for ch in text), confidence)
+
+def region_reading_is_weak(results, regions):
+    """Whether the best region reading has under OCR_REGION_MIN_CHARS per region or OCR_REGION_MIN_CONFIDENCE"""
+    chars, confidence = reading_strength(results)
+    return chars < OCR_REGION_MIN_CHARS * len(regions) or confidence < OCR_REGION_MIN_CONFIDENCE
+
+class OCRVariantScheduler:
+    """Cost-ordered, confidence-gated plan for the OCR variants.
+    
+    The first variant of the plan runs alone. If its confidence clears the
+    threshold the others are skipped; otherwise the rest run concurrently
+    and the most confident result wins. Runs and wins are counted per
+    variant, and once a variant has OCR_ADAPTIVE_MIN_RUNS runs the plan
+    orders it by win rate per unit of cost instead of by cost alone. A win
+    goes to the variant whose reading the final text came from; Targeted
+    passes count for the planned variant they were built from.
+    """
+    
+    def __init__(self, variants=OCR_VARIANTS, costs=OCR_VARIANT_COSTS,
+                 threshold=OCR_CONFIDENCE_THRESHOLD, min_runs=OCR_ADAPTIVE_MIN_RUNS):
+        self.variants = variants
+        self.costs = costs
+        self.threshold = threshold
+        self.min_runs = min_runs
+        self.images = 0
+        self.early_exits = 0
+        self.runs = {method: 0 for method, *_ in variants}
+        self.wins = {method: 0 for method, *_ in variants}
+        self._lock = threading.Lock()
+    
+    def plan(self):
+        """Variants in the order they should be tried"""
+        prior = 1.0 / len(self.variants)
+        with self._lock:
+            def priority(variant):
+                method = variant[0]
+                runs = self.runs.get(method, 0)
+                win_rate = self.wins.get(method, 0) / runs if runs >= self.min_runs else prior
+                return -win_rate / self.costs.get(method, 1.0)
+            return sorted(self.variants, key=priority)
+    
+    def is_good_enough(self, text, confidence):
+        return not text.startswith("Error:") and bool(text.strip()) and confidence >= self.threshold
+    
+    def credit(self, method, osd):
+        """The planned variant a result counts for"""
+        if method == 'Targeted' and osd and osd.get('targeted_from'):
+            return osd['targeted_from']
+        return method
+    
+    def record(self, ran, winner, early_exit):
+        """Count one image: the planned variants in `ran` each ran once and `winner` won"""
+        with self._lock:
+            self.images += 1
+            if early_exit:
+                self.early_exits += 1
+            for method in set(ran):
+                self.runs[method] = self.runs.get(method, 0) + 1
+            self.wins[winner] = self.wins.get(winner, 0) + 1
+    
+    def stats(self):
+        with self._lock:
+            return {
+                'schedule': OCR_SCHEDULE,
+                'threshold': self.threshold,
+                'images': self.images,
+                'early_exits': self.early_exits,
+                'win_rates': {method: round(self.wins[method] / runs, 3) if runs else None
+                              for method, runs in self.runs.items()}
+            }
+
+ocr_scheduler = OCRVariantScheduler()
+
+def run_ocr_plan(image, progress=None):
+    """Run the scheduler's plan: best variant first, the rest only if it isn't confident
+    
+    With OCR_OSD the image is turned upright and read in the detected
+    script's language, starting with a targeted variant: before anything
+    else ('prepass'), or once the first planned variant has missed the
+    threshold ('fallback', when OSD finds something to change).
+    Returns (text_results in OCR_VARIANTS order, early_exit, osd report or
+    None, planned methods that ran). The last also counts reads dropped
+    because OSD turned the frame.
+    """
+    deadline = time.monotonic() + OCR_TOTAL_TIMEOUT
+    plan = ocr_scheduler.plan()
+    osd = apply_orientation_script(image) if OCR_OSD == 'prepass' else None
+    lang = osd['lang'] if osd else None
+    
+    first = [targeted_variant(image, plan[0], osd)] if osd else plan[:1]
+    text_results = run_ocr_variants(image, first, progress=progress, lang=lang)
+    ran = [plan[0][0]]
+    method, text, confidence, *_ = text_results[0]
+    early_exit = ocr_scheduler.is_good_enough(text, confidence)
+    
+    if not early_exit and OCR_OSD == 'fallback':
+        rotation = image.rotation
+        osd = apply_orientation_script(image)
+        if osd and (osd['rotated'] != rotation or not osd['whitelist']):
+            if osd['rotated'] != rotation:
+                text_results = []  # read sideways; their boxes belong to the old frame
+            lang = osd['lang']
+            targeted = run_ocr_variants(image, [targeted_variant(image, plan[0], osd)], progress=progress, lang=lang)
+            text_results += targeted
+            method, text, confidence, *_ = targeted[0]
+            early_exit = ocr_scheduler.is_good_enough(text, confidence)
+    
+    if early_exit:
+        log.debug(f"⚡ {method} reached confidence {confidence}, skipping remaining variants")
+    else:
+        remaining = max(deadline - time.monotonic(), 1.0)
+        text_results += run_ocr_variants(image, adjust_variants(plan[1:], osd), total_timeout=remaining,
+                                         progress=progress, lang=lang)
+        ran += [variant[0] for variant in plan[1:]]
+    
+    order = {variant[0]: i for i, variant in enumerate(OCR_VARIANTS)}
+    text_results.sort(key=lambda result: order.get(result[0], len(order)))
+    return text_results, early_exit, osd, ran
+
+class OCRResultCache:
+    """Content-addressed cache of extract_text_from_image results.
+    
+    Entries are keyed by the SHA-256 of the image bytes plus the OCR
+    configuration fingerprint. A bounded in-memory LRU sits in front of an
+    optional on-disk tier (one JSON file per entry) that survives restarts.
+    Results are copied on the way in and out so callers can annotate them.
+    """
+    
+    def __init__(self, max_entries=OCR_CACHE_SIZE, disk_dir=OCR_CACHE_DIR):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+    
+    @property
+    def enabled(self):
+        return self.max_entries > 0 or bool(self.disk_dir)
+    
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key[:2], f"{key}.json")
+    
+    def get(self, key, record=True):
+        """Copy of the cached result, or None; `record=False` leaves the hit counters alone"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += record
+                return copy.deepcopy(self._entries[key])
+        
+        if self.disk_dir:
+            try:
+                with open(self._disk_path(key), 'r', encoding='utf-8') as f:
+                    result = json.load(f)
+                self._remember(key, result)
+                with self._lock:
+                    self.hits += record
+                    self.disk_hits += record
+                return copy.deepcopy(result)
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                log.warning(f"⚠️  Could not read OCR cache entry {key[:12]}: {e}")
+        
+        with self._lock:
+            self.misses += record
+        return None
+    
+    def put(self, key, result):
+        result = copy.deepcopy(result)
+        self._remember(key, result)
+        
+        if self.disk_dir:
+            path = self._disk_path(key)
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.{threading.get_ident()}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(result, f, ensure_ascii=False)
+                os.replace(tmp_path, path)
+            except Exception as e:
+                log.warning(f"⚠️  Could not write OCR cache entry {key[:12]}: {e}")
+    
+    def _remember(self, key, result):
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'disk_enabled': bool(self.disk_dir),
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0
+            }
+
+ocr_cache = OCRResultCache()
+_ocr_fingerprint = None
+
+class PerceptualHashIndex:
+    """BK-tree of perceptual hashes for nearest-neighbour lookups by Hamming distance.
+    
+    Each node holds a hash and the OCR cache key of the result it came from;
+    children are keyed by their distance to the node, so a search within d
+    of a query at distance k only descends into children k-d..k+d. Past
+    `max_entries` the oldest keys are retired (searches skip them) and the
+    tree is rebuilt once retired nodes outnumber live ones.
+    """
+    
+    def __init__(self, max_entries=NEAR_DUPLICATE_INDEX_SIZE):
+        self.max_entries = max_entries
+        self.lookups = 0
+        self.matches = 0
+        self._root = None  # [hash, key, {distance: child}]
+        self._nodes = 0
+        self._live = OrderedDict()  # key -> (hash, original size)
+        self._lock = threading.Lock()
+    
+    def _insert(self, phash, key):
+        node = [phash, key, {}]
+        self._nodes += 1
+        if self._root is None:
+            self._root = node
+            return
+        current = self._root
+        while True:
+            distance = (current[0] ^ phash).bit_count()
+            child = current[2].get(distance)
+            if child is None:
+                current[2][distance] = node
+                return
+            current = child
+    
+    def add(self, phash, key, size):
+        with self._lock:
+            if key in self._live:
+                self._live.move_to_end(key)
+                return
+            self._live[key] = (phash, tuple(size))
+            self._insert(phash, key)
+            while len(self._live) > self.max_entries:
+                self._live.popitem(last=False)
+            if self._nodes > 2 * len(self._live):
+                self._root = None
+                self._nodes = 0
+                for live_key, (live_hash, _) in self._live.items():
+                    self._insert(live_hash, live_key)
+    
+    def discard(self, key):
+        with self._lock:
+            self._live.pop(key, None)
+    
+    def nearest(self, phash, max_distance):
+        """(distance, key, size) of the closest live entry within `max_distance` bits, or None"""
+        with self._lock:
+            self.lookups += 1
+            best = None
+            stack = [self._root] if self._root is not None else []
+            while stack:
+                node_hash, key, children = stack.pop()
+                distance = (node_hash ^ phash).bit_count()
+                if distance <= max_distance and key in self._live and (best is None or distance < best[0]):
+                    best = (distance, key, self._live[key][1])
+                    max_distance = distance
+                for child_distance, child in children.items():
+                    if distance - max_distance <= child_distance <= distance + max_distance:
+                        stack.append(child)
+            self.matches += best is not None
+            return best
+    
+    def stats(self):
+        with self._lock:
+            return {
+                'mode': NEAR_DUPLICATE_MODE,
+                'entries': len(self._live),
+                'nodes': self._nodes,
+                'max_entries': self.max_entries,
+                'max_distance': NEAR_DUPLICATE_MAX_DISTANCE,
+                'lookups': self.lookups,
+                'matches': self.matches
+            }
+
+phash_index = PerceptualHashIndex()
+
+def find_near_duplicate(image):
+    """Cached result of a perceptually near-identical image: (distance, key, size, result) or None"""
+    if NEAR_DUPLICATE_MODE == 'off' or not ocr_cache.enabled:
+        return None
+    try:
+        match = phash_index.nearest(image.perceptual_hash(), NEAR_DUPLICATE_MAX_DISTANCE)
+    except Exception as e:
+        log.warning(f"⚠️  Perceptual hash failed: {e}")
+        return None
+    if match is None:
+        return None
+    
+    distance, key, size = match
+    result = ocr_cache.get(key, record=False)
+    if result is None:
+        # The result was evicted from the cache; the hash is no use without it
+        phash_index.discard(key)
+        return None
+    return distance, key, size, result
+
+def worth_verifying(near):
+    """Whether verifying the match saves OCR: the stored result took more than one variant"""
+    _, _, _, stored = near
+    return stored.get('total_methods_tried', 0) > 1
+
+def verify_near_duplicate(image, near):
+    """Re-read a copy of `image` with the matched result's best variant; returns the text similarity (0-1)"""
+    _, _, _, stored = near
+    method = stored.get('method_used')
+    osd = stored.get('osd')
+    if osd and osd.get('targeted') and method == 'Targeted':
+        variant = ('Targeted', *osd['targeted'], None)
+    else:
+        variant = next((variant for variant in adjust_variants(OCR_VARIANTS, osd) if variant[0] == method), None)
+    if variant is None:
+        return 0.0
+    # Replay the winning configuration, including the turn OSD made, on a
+    # copy: a rejected match leaves the image as it was for the full pipeline
+    image = image.copy()
+    if osd:
+        image.rotate(osd['rotated'] - image.rotation)
+    [(_, text, *_)] = run_ocr_variants(image, [variant], lang=osd['lang'] if osd else None)
+    if text.startswith("Error:"):
+        return 0.0
+    expected = stored.get('all_results', {}).get(method, stored.get('best_text', ''))
+    return difflib.SequenceMatcher(None, text.strip(), expected.strip()).ratio()
+
+def rescale_result_boxes(result, from_size, to_size):
+    """Move the word and region boxes of a result from a `from_size` image onto a `to_size` copy"""
+    if tuple(from_size) == tuple(to_size):
+        return result
+    sx, sy = to_size[0] / from_size[0], to_size[1] / from_size[1]
+    
+    def scale(box):
+        x, y, w, h = box
+        return [int(round(x * sx)), int(round(y * sy)), int(round(w * sx)), int(round(h * sy))]
+    
+    words = result.get('words')
+    if isinstance(words, dict) and 'bbox' in words:
+        words['bbox'] = [scale(box) for box in words['bbox']]
+    for region in result.get('regions') or []:
+        region['bbox'] = scale(region['bbox'])
+    return result
+
+def reuse_near_duplicate(image, key, near, similarity=None, progress=None):
+    """The matched result, annotated with `near_duplicate` and cached under this image's key"""
+    distance, matched_key, size, result = near
+    to_size = image.size
+    if (result.get('osd') or {}).get('rotated') in (90, 270):
+        # Boxes are in the upright frame, which is the upload turned sideways
+        size, to_size = size[::-1], to_size[::-1]
+    result = rescale_result_boxes(result, size, to_size)
+    result.pop('cache_hit', None)
+    result['near_duplicate'] = {
+        'matched_sha256': matched_key.split('-')[0],
+        'distance': distance,
+        'similarity': round(1 - distance / PHASH_BITS, 3),
+        'verified_similarity': round(similarity, 3) if similarity is not None else None,
+        'matched_size': list(size)
+    }
+    ocr_cache.put(key, result)
+    metrics.inc('ocr_near_duplicate_total', outcome='reused')
+    log.info(f"🪞 Near-duplicate of {matched_key[:12]} ({distance} bits apart), reusing its OCR result",
+             extra=SAMPLED)
+    if progress:
+        progress('ocr_near_duplicate', distance=distance)
+    result['cache_hit'] = False
+    return result
+
+def remember_perceptual_hash(image, key):
+    if NEAR_DUPLICATE_MODE == 'off' or not ocr_cache.enabled:
+        return
+    try:
+        phash_index.add(image.perceptual_hash(), key, image.size)
+    except Exception as e:
+        log.warning(f"⚠️  Perceptual hash failed: {e}")
+
+def get_tesseract_version():
+    """Version string of the Tesseract used by the active backend"""
+    try:
+        if get_ocr_backend() == 'tesserocr':
+            return tesserocr.tesseract_version().splitlines()[0]
+        return str(pytesseract.get_tesseract_version())
+    except Exception:
+        return 'unknown'
+
+def get_ocr_fingerprint():
+    """Short hash of everything besides the pixels that determines an OCR result"""
+    global _ocr_fingerprint
+    if _ocr_fingerprint is None:
+        config = {
+            'variants': OCR_VARIANTS,
+            'schedule': OCR_SCHEDULE,
+            'threshold': OCR_CONFIDENCE_THRESHOLD,
+            'normalize': [OCR_NORMALIZE, OCR_TARGET_TEXT_HEIGHT, OCR_MIN_TEXT_HEIGHT],
+            'regions': [OCR_DETECT_REGIONS, OCR_REGION_MAX_COVERAGE, OCR_MAX_REGIONS,
+                        OCR_REGION_MIN_CHARS, OCR_REGION_MIN_CONFIDENCE],
+            'lang': OCR_LANG,
+            'osd': [OCR_OSD, OCR_OSD_MIN_CONFIDENCE, OCR_SCRIPT_LANGS],
+            'result_format': 2,  # word-level output
+            'tesseract': get_tesseract_version()
+        }
+        _ocr_fingerprint = hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()[:16]
+    return _ocr_fingerprint
+
+def extract_text_cached(image, progress=None, deadline=None):
+    """extract_text_from_image with the content-addressed result cache in front
+    
+    Cache misses then look for a perceptually near-identical cached image
+    (see NEAR_DUPLICATE_MODE) before running the full pipeline. OCR waits
+    for a slot first; with a `deadline` (time.monotonic() value) that can't
+    be met, Overloaded is raised instead of waiting. Concurrent misses for
+    the same content and configuration run the pipeline once and share the
+    result, marked `coalesced` for the ones that waited.
+    """
+    key = f"{image.sha256}-{get_ocr_fingerprint()}"
+    result = ocr_cache.get(key)
+    if result is not None:
+        log.info(f"♻️  OCR cache hit for {image.sha256[:12]}", extra=SAMPLED)
+        result['cache_hit'] = True
+        if progress:
+            progress('ocr_cached')
+        return result
+    
+    result, shared = ocr_flights.do(key, lambda: compute_text_uncached(image, key, progress, deadline),
+                                    deadline=deadline)
+    if shared:
+        log.info(f"🤝 Shared in-flight OCR of {image.sha256[:12]}", extra=SAMPLED)
+        result['coalesced'] = True
+        if progress:
+            progress('ocr_shared')
+    return result
+
+def compute_text_uncached(image, key, progress=None, deadline=None):
+    """The cache-miss half of extract_text_cached: near-duplicate reuse or a full OCR run"""
+    near = find_near_duplicate(image)
+    if near is not None and NEAR_DUPLICATE_MODE == 'reuse':
+        return reuse_near_duplicate(image, key, near, progress=progress)
+    
+    if near is not None and not worth_verifying(near):
+        metrics.inc('ocr_near_duplicate_total', outcome='unverified')
+        near = None
+    with ocr_admission.admit(deadline):
+        if near is not None:
+            similarity = verify_near_duplicate(image, near)
+            if similarity >= NEAR_DUPLICATE_MIN_SIMILARITY:
+                return reuse_near_duplicate(image, key, near, similarity=similarity, progress=progress)
+            metrics.inc('ocr_near_duplicate_total', outcome='rejected')
+            log.info(f"🪞 Near-duplicate of {near[1][:12]} failed verification "
+                     f"(text similarity {similarity:.2f}), running full OCR", extra=SAMPLED)
+        result = extract_text_from_image(image, progress=progress)
+    # Errors may be transient (timeouts, missing binary), so only successes are kept
+    if 'error' not in result:
+        ocr_cache.put(key, result)
+        remember_perceptual_hash(image, key)
+    result['cache_hit'] = False
+    return result
+
+# Cache misses for the same image and OCR configuration in flight at once run
+# once. A leader turned away by admission control doesn't fail its
+# followers, who may have other deadlines; they retry on their own. A
+# follower whose deadline passes first gets the admission queue's timeout
+ocr_flights = SingleFlight('ocr', copy_result=copy.deepcopy, retry_errors=(Overloaded,),
+                           timeout_error=lambda: ocr_admission.timeout_error())
+
 def create_error_result(error_message):
     """Create a standardized error result"""
     return {
@@ -437,76 +3611,97 @@ def create_error_result(error_message):
         'error': error_message
     }
 
-def preprocess_image_for_ocr(img):
-    """Preprocess image to improve OCR accuracy"""
-    try:
-        # Convert to grayscale
-        if len(img.shape) == 3:
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        else:
-            gray = img
-        
-        # Apply Gaussian blur to reduce noise
-        blurred = cv2.GaussianBlur(gray, (3, 3), 0)
-        
-        # Apply adaptive thresholding
-        thresh = cv2.adaptiveThreshold(
-            blurred, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2
-        )
-        
-        # Morphological operations to clean up the image
-        kernel = np.ones((2, 2), np.uint8)
-        processed = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, kernel)
-        processed = cv2.morphologyEx(processed, cv2.MORPH_OPEN, kernel)
-        
-        return processed
-        
-    except Exception as e:
-        print(f"Error in preprocessing: {e}")
-        return img
+class PreprocessingEngine:
+    """Builds OCR variant images from a frame's uint8 grayscale or RGB array.
+    
+    Variants are functions `(image, out) -> array` registered under the
+    preparation name used in OCR_VARIANTS, along with the `source` buffer
+    they read ('gray' or 'rgb'). run() produces all requested variants of
+    one input in a single pass: the input is made contiguous once, each
+    variant that writes pixels gets one preallocated output buffer (the
+    others get None), and every OpenCV step works in place on it.
+    """
+    
+    def __init__(self):
+        self.variants = OrderedDict()
+    
+    def register(self, name, source='gray', writes=True):
+        def decorator(func):
+            self.variants[name] = (func, source, writes)
+            return func
+        return decorator
+    
+    def source(self, name):
+        """The frame buffer ('gray' or 'rgb') a variant is built from"""
+        return self.variants[name][1]
+    
+    def run(self, image, names):
+        """Return {name: uint8 array} for variant names that all read `image`"""
+        image = np.ascontiguousarray(image)
+        results = {}
+        for name in names:
+            func, _, writes = self.variants[name]
+            results[name] = func(image, np.empty_like(image) if writes else None)
+        return results
 
-def get_text_confidence(text):
-    """Calculate a simple confidence score based on text characteristics"""
-    if not text or len(text.strip()) == 0:
-        return 0
+preprocessing = PreprocessingEngine()
+
+def contrast_brightness_lut(mean, contrast=1.5, brightness=1.1):
+    """256-entry table for contrast around `mean`, then brightness
     
-    # Remove error messages from confidence calculation
-    if text.startswith('Error extracting text:'):
-        return 0
+    Matches ImageEnhance.Contrast(...).enhance(contrast) followed by
+    ImageEnhance.Brightness(...).enhance(brightness), channel by channel.
+    """
+    mean = int(mean + 0.5)
+    lut = np.arange(256, dtype=np.float32)
+    lut = np.clip(mean + contrast * (lut - mean), 0, 255).astype(np.uint8)
+    return np.clip(lut * brightness, 0, 255).astype(np.uint8)
+
+@preprocessing.register('gray', writes=False)
+def _gray_variant(gray, out):
+    return gray
+
+@preprocessing.register('enhanced', source='rgb')
+def _enhanced_variant(rgb, out):
+    """Contrast 1.5x and brightness 1.1x via one lookup table on every channel
     
-    # Simple heuristics for text quality
-    score = 0
-    clean_text = text.strip()
+    Stays in colour: Tesseract thresholds colour input better than our
+    grayscale conversion of it, most of all on noisy photos.
+    """
+    # ImageEnhance.Contrast pivots on the mean of the luminance
+    mean = rgb.reshape(-1, 3).mean(axis=0) @ (0.299, 0.587, 0.114)
+    return cv2.LUT(rgb, contrast_brightness_lut(mean), dst=out)
+
+@preprocessing.register('preprocessed')
+def _threshold_variant(gray, out):
+    """Blur, adaptive threshold, then close and open to clean up speckle"""
+    cv2.GaussianBlur(gray, (3, 3), 0, dst=out)
+    cv2.adaptiveThreshold(out, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2, dst=out)
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (2, 2))
+    cv2.morphologyEx(out, cv2.MORPH_CLOSE, kernel, dst=out)
+    cv2.morphologyEx(out, cv2.MORPH_OPEN, kernel, dst=out)
+    return out
+
+def get_file_info(filepath, original_name, image=None):
+    """Get basic information about the uploaded file
     
-    # Length bonus (more text usually means better detection)
-    if len(clean_text) > 50:
-        score += 40
-    elif len(clean_text) > 20:
-        score += 25
-    elif len(clean_text) > 5:
-        score += 15
-    
-    # Word count bonus
-    words = clean_text.split()
-    if len(words) > 10:
-        score += 30
-    elif len(words) > 5:
-        score += 20
-    elif len(words) > 1:
-        score += 10
-    
-    # Alphanumeric ratio (good text should have reasonable letters/numbers)
-    if len(clean_text) > 0:
-        alphanumeric = sum(c.isalnum() for c in clean_text)
-        ratio = alphanumeric / len(clean_text)
-        score += int(ratio * 30)  # Max 30 points for good character ratio
-    
-    return min(score, 100)  # Cap at 100%
-
-def get_file_info(filepath, original_name):
-    """Get basic information about the uploaded file"""
+    Pass the DecodedImage when there is one to avoid reopening the file.
+    """
     try:
-        # Open image with PIL to get dimensions
+        if image is not None:
+            return {
+                'filename': original_name,
+                'saved_path': filepath,
+                'format': image.format,
+                'mode': image.mode,
+                'size': image.size,
+                'width': image.width,
+                'height': image.height,
+                'file_size_bytes': image.file_size,
+                'upload_time': datetime.now().isoformat()
+            }
+        
+        # Open image with PIL to get dimensions (reads the header only)
         with Image.open(filepath) as img:
             info = {
                 'filename': original_name,
@@ -517,83 +3712,265 @@ def get_file_info(filepath, original_name):
                 'width': img.width,
                 'height': img.height,
                 'file_size_bytes': os.path.getsize(filepath),
-                'upload_time': datetime.now().isoformat()
+                'upload_time': datetime.fromtimestamp(os.path.getmtime(filepath)).isoformat()
             }
             return info
     except Exception as e:
-        print(f"Error getting file info: {e}")
+        log.error(f"❌ Error getting file info: {e}")
         return {'error': str(e)}
 
-@app.route('/extract_text/<filename>', methods=['POST'])
+def extract_document_text(filename, filepath, fields, deadline):
+    """/extract_text for a stored TIFF or PDF: one NDJSON line per page as it is OCRed
+    
+    Lines follow /upload_document: each page result (or an `error`), then a
+    `summary`. The stream carries no ETag, since its headers go out before
+    any page could fail.
+    """
+    def generate():
+        processed = 0
+        try:
+            for number, image in pipeline_document_pages(filepath):
+                page = {'page': number, 'extracted_text': extract_text_cached(image, deadline=deadline)}
+                processed += 1
+                yield json.dumps(select_fields(page, fields, keep=('page',)), ensure_ascii=False) + '\n'
+        except Exception as e:
+            log.error(f"❌ Error extracting {filename} after {processed} page(s): {str(e)}")
+            yield json.dumps({'page': processed + 1, 'error': f'Server error: {str(e)}'}) + '\n'
+        
+        yield json.dumps({'summary': {'filename': filename, 'processed': processed}}) + '\n'
+    
+    upload_store.pin(filename)
+    response = Response(generate(), mimetype='application/x-ndjson')
+    response.call_on_close(lambda: upload_store.unpin(filename))
+    return response
+
+@app.route('/extract_text/<filename>', methods=['GET', 'POST'])
 def extract_text_from_specific_file(filename):
-    """Extract text from a specific uploaded file"""
+    """Extract text from a specific uploaded file
+    
+    For an image, the ETag is derived from the file's hash and the OCR
+    configuration, so a GET with a matching If-None-Match is answered with
+    304 before any OCR or cache lookup. Documents stream their pages.
+    """
+    deadline = time.monotonic() + REQUEST_DEADLINE
     try:
         filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
         
         if not os.path.exists(filepath):
             return jsonify({'error': 'File not found'}), 404
         
-        extracted_text = extract_text_from_image(filepath)
+        if is_document(filename):
+            limited = check_rate_limit()
+            if limited:
+                return limited
+            return extract_document_text(filename, filepath, requested_fields(), deadline)
         
-        return jsonify({
+        entry = upload_store.get(filename)
+        sha256 = entry['sha256'] if entry else None
+        if sha256 is None:
+            sha256 = file_sha256(filepath)
+            upload_store.update(filename, sha256=sha256)
+        etag = make_etag('extract_text', sha256, get_ocr_fingerprint())
+        cached = not_modified(etag)
+        if cached:
+            return cached
+        
+        limited = check_rate_limit()
+        if limited:
+            return limited
+        
+        fields = requested_fields()
+        extracted_text = extract_text_cached(DecodedImage.from_path(filepath), deadline=deadline)
+        
+        response = jsonify({
             'filename': filename,
-            'extracted_text': extracted_text,
+            'extracted_text': select_fields(extracted_text, fields),
             'message': 'Text extraction completed'
         })
-        
+        return response if 'error' in extracted_text else with_etag(response, etag)
+    
+    except Overloaded as e:
+        return too_many_requests(str(e), e.retry_after)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/files', methods=['GET'])
 def list_files():
-    """List all uploaded files"""
+    """List uploaded files, newest first, paginated with ?offset=&limit="""
     try:
-        files = []
-        for filename in os.listdir(app.config['UPLOAD_FOLDER']):
-            if filename.lower().endswith(('.jpg', '.jpeg')):
-                filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                files.append({
-                    'filename': filename,
-                    'path': filepath,
-                    'size': os.path.getsize(filepath),
-                    'modified': datetime.fromtimestamp(os.path.getmtime(filepath)).isoformat()
-                })
+        offset = max(request.args.get('offset', 0, type=int), 0)
+        limit = min(max(request.args.get('limit', FILES_PAGE_SIZE, type=int), 1), FILES_MAX_PAGE_SIZE)
+        
+        # The tag hashes the page itself: gunicorn workers each keep their own
+        # index, so a per-process change counter could match another worker's listing
+        entries, total = upload_store.page(offset, limit)
+        etag = make_etag('files', offset, limit, total,
+                         *((entry['filename'], entry['size'], entry['mtime'], entry['sha256']) for entry in entries))
+        cached = not_modified(etag)
+        if cached:
+            return cached
         
-        return jsonify({'files': files, 'count': len(files)})
+        files = [{
+            'filename': entry['filename'],
+            'path': os.path.join(app.config['UPLOAD_FOLDER'], entry['filename']),
+            'size': entry['size'],
+            'modified': datetime.fromtimestamp(entry['mtime']).isoformat(),
+            'sha256': entry['sha256']
+        } for entry in entries]
+        
+        next_offset = offset + len(files)
+        return with_etag(jsonify({
+            'files': files,
+            'count': total,
+            'offset': offset,
+            'limit': limit,
+            'next_offset': next_offset if next_offset < total else None
+        }), etag)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/file/<filename>', methods=['GET'])
 def get_file_details(filename):
-    """Get details of a specific file"""
+    """Get details of a specific file
+    
+    The header is read once per file; the info is kept in the upload index
+    and revalidated by size and modification time.
+    """
     try:
         filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
         
-        if not os.path.exists(filepath):
-            return jsonify({'error': 'File not found'}), 404
+        entry = upload_store.get(filename)
+        if entry is None:
+            if not os.path.exists(filepath):
+                return jsonify({'error': 'File not found'}), 404
+            # Not an indexed upload type: describe it without caching
+            return jsonify(select_fields({'filename': filename, 'info': get_file_info(filepath, filename)},
+                                         requested_fields()))
         
-        file_info = get_file_info(filepath, filename)
+        etag = make_etag('file', filename, entry['size'], entry['mtime'])
+        cached = not_modified(etag)
+        if cached:
+            return cached
         
-        return jsonify({
+        file_info = entry['info']
+        if file_info is None:
+            file_info = get_file_info(filepath, filename)
+            if 'error' in file_info:
+                return jsonify({'filename': filename, 'info': file_info})
+            upload_store.update(filename, info=file_info)
+        
+        return with_etag(jsonify(select_fields({
             'filename': filename,
             'info': file_info
-        })
+        }, requested_fields())), etag)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def _tesseract_handle_stats(key):
+    return _tesseract_handles.stats()[key] if _tesseract_handles is not None else 0
+
+metrics.describe('upload_jobs', 'gauge', 'Async upload jobs by status',
+                 lambda: {(('status', status),): count for status, count in job_store.counts().items()})
+metrics.describe('ocr_active', 'gauge', 'Images being OCRed', lambda: ocr_admission.stats()['active'])
+metrics.describe('ocr_waiting', 'gauge', 'Requests waiting for an OCR slot', lambda: ocr_admission.stats()['waiting'])
+metrics.describe('ocr_cache_hit_ratio', 'gauge', 'OCR result cache hit rate', lambda: ocr_cache.stats()['hit_rate'])
+metrics.describe('ocr_near_duplicate_index_entries', 'gauge', 'Perceptual hashes in the near-duplicate index',
+                 lambda: phash_index.stats()['entries'])
+metrics.describe('ocr_cache_entries', 'gauge', 'OCR results held in memory', lambda: ocr_cache.stats()['entries'])
+metrics.describe('translation_cache_hit_ratio', 'gauge', 'Translation segment cache hit rate',
+                 lambda: translation_service.stats()['hit_rate'])
+metrics.describe('translation_upstream_calls', 'gauge', 'Batched calls made to the translation backend',
+                 lambda: translation_service.stats()['upstream_calls'])
+metrics.describe('ocr_early_exit_ratio', 'gauge', 'Images settled by the first planned OCR variant',
+                 lambda: ocr_scheduler.early_exits / ocr_scheduler.images if ocr_scheduler.images else 0)
+metrics.describe('tesseract_handles_created', 'gauge', 'In-process Tesseract handles created',
+                 lambda: _tesseract_handle_stats('created'))
+metrics.describe('tesseract_handles_idle', 'gauge', 'In-process Tesseract handles waiting in the pool',
+                 lambda: _tesseract_handle_stats('idle'))
+metrics.describe('upload_store_files', 'gauge', 'Files in the upload folder', lambda: upload_store.stats()['files'])
+metrics.describe('upload_store_bytes', 'gauge', 'Bytes in the upload folder', lambda: upload_store.stats()['total_bytes'])
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus scrape endpoint: stage timers, request counters, queue and cache gauges"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+def warm_up():
+    """Load the OCR backend and run every variant once on a rendered sample
+    
+    Creates the Tesseract handles for each configuration, starts the OCR
+    pool threads and touches the preprocessing code, so the first real
+    request runs at steady-state speed. Returns the time taken.
+    """
+    start = time.perf_counter()
+    get_ocr_backend()
+    sample = Image.new('RGB', (480, 96), 'white')
+    ImageDraw.Draw(sample).text((12, 24), "Warm up 0123", fill='black', font=ImageFont.load_default(size=36))
+    buffer = io.BytesIO()
+    sample.save(buffer, 'JPEG')
+    run_ocr_variants(DecodedImage.from_bytes(buffer.getvalue()))
+    elapsed = time.perf_counter() - start
+    log.info(f"🔥 Warm-up finished in {elapsed:.2f}s (pid {os.getpid()})")
+    return elapsed
+
+def create_app():
+    """App factory for production servers: gunicorn -c gunicorn.conf.py "server:create_app()"
+    
+    Runs once in each worker process after it is forked, so thread pools
+    and Tesseract handles are created per process. The worker is warmed up
+    before it returns, and only then starts accepting requests.
+    """
+    # Preprocessing runs inside the OCR pool, which is already sized to the cores
+    cv2.setNumThreads(1)
+    configure_tesseract()
+    upload_store.start_janitor()
+    warm_up()
+    health_prober.start()
+    return app
+
+def shutdown(wait=True):
+    """Let queued async jobs finish, then stop the OCR pool and free Tesseract handles"""
+    _job_executor.shutdown(wait=wait)
+    if _translation_executor is not None:
+        _translation_executor.shutdown(wait=wait, cancel_futures=not wait)
+    translation_service.backend.close()
+    if _ocr_executor is not None:
+        _ocr_executor.shutdown(wait=wait, cancel_futures=not wait)
+    if _tesseract_handles is not None:
+        _tesseract_handles.close()
+    log.info(f"👋 Worker {os.getpid()} shut down")
+
+@app.route('/healthz', methods=['GET'])
+def liveness():
+    """Liveness probe: the process is up and serving; no OCR or network calls"""
+    return jsonify({'status': 'ok', 'pid': os.getpid(), 'uptime_seconds': round(time.time() - STARTED_AT, 1)})
+
 @app.route('/test', methods=['GET'])
 def test_server():
-    """Test endpoint to check if server, OCR, and translation are working"""
-    tesseract_working = test_tesseract()
-    translate_working = test_google_translate()
+    """Server, OCR, and translation status from the cached health probes
+    
+    ?refresh=1 runs the probes now instead of reporting the cached results.
+    """
+    if request.args.get('refresh', '').lower() in ('1', 'true', 'yes'):
+        health_prober.refresh()
+    health = health_prober.status()
     
     return jsonify({
         'message': 'Server is running',
         'tesseract_configured': pytesseract.pytesseract.tesseract_cmd is not None,
         'tesseract_path': pytesseract.pytesseract.tesseract_cmd,
-        'tesseract_working': tesseract_working,
-        'google_translate_working': translate_working,
+        'tesseract_working': health['tesseract']['ok'],
+        'ocr_backend': _ocr_backend,
+        'ocr_cache': ocr_cache.stats(),
+        'ocr_scheduler': ocr_scheduler.stats(),
+        'near_duplicates': phash_index.stats(),
+        'ocr_admission': ocr_admission.stats(),
+        'coalescing': {'ocr': ocr_flights.stats(), 'translation': translation_flights.stats()},
+        'upload_store': upload_store.stats(),
+        'translation_cache': translation_service.stats(),
+        'google_translate_working': health['google_translate']['ok'],
+        'health': health,
         'upload_folder': os.path.abspath(UPLOAD_FOLDER),
         'upload_folder_exists': os.path.exists(UPLOAD_FOLDER)
     })
@@ -605,6 +3982,8 @@ if __name__ == '__main__':
     # Configure and test Tesseract
     print("\n🔧 Configuring Tesseract OCR...")
     tesseract_configured = configure_tesseract()
+    # Pick the OCR backend before any threads start: tesserocr only imports on the main thread
+    get_ocr_backend()
     
     if tesseract_configured:
         tesseract_working = test_tesseract()
@@ -627,10 +4006,15 @@ if __name__ == '__main__':
     print(f"\n🌐 Server running on http://localhost:5000")
     print("\n📋 Available endpoints:")
     print("  POST /upload              - Upload JPG files, extract and translate text")
+    print("                              (multi-page TIFF/PDF: one NDJSON line per page)")
     print("  POST /translate           - Translate any text to Bengali")
     print("  GET  /files               - List uploaded files")
     print("  GET  /file/<filename>     - Get file details")
     print("  POST /extract_text/<filename> - Extract text from specific file")
-    print("  GET  /test                - Test server, OCR, and translation status")
+    print("  GET  /test                - Test server, OCR, and translation status (cached probes)")
+    print("  GET  /healthz             - Liveness probe")
+    print("  GET  /metrics             - Prometheus metrics")
+    print("\n💡 Development server; in production run: gunicorn -c gunicorn.conf.py \"server:create_app()\"")
     
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    app.run(debug=os.environ.get('FLASK_DEBUG') == '1', host='0.0.0.0',
+            port=int(os.environ.get('PORT', 5000)), threaded=True)
\ No newline at end of file
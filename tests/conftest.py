@@ -0,0 +1,54 @@
+"""Shared fixtures: the server module runs offline against a scratch upload folder"""
+import io
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Offline translation, no persistent OCR cache and no rate limit unless a
+# test installs one
+os.environ.setdefault('TRANSLATION_BACKEND', 'stub')
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+os.environ.pop('OCR_CACHE_DIR', None)
+os.environ['RATE_LIMIT_PER_MINUTE'] = '0'
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+# The server indexes and writes uploads relative to the working directory
+os.chdir(tempfile.mkdtemp(prefix='ocr-tests-'))
+
+import server  # noqa: E402
+from PIL import Image, ImageDraw  # noqa: E402
+
+# tesserocr can only be imported on the main thread; create_app does the same
+server.get_ocr_backend()
+
+
+def render_label(text='HELLO WORLD 123', size=(500, 100), font_size=32):
+    """JPEG bytes of black text on a white label"""
+    image = Image.new('RGB', size, 'white')
+    ImageDraw.Draw(image).text((10, size[1] // 2 - font_size // 2), text, fill='black', font_size=font_size)
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=92)
+    return buffer.getvalue()
+
+
+def add_upload(filename, data):
+    """Put a file in the upload folder and index it, as save_upload would"""
+    with open(os.path.join(server.UPLOAD_FOLDER, filename), 'wb') as f:
+        f.write(data)
+    server.upload_store.add(filename, len(data))
+
+
+@pytest.fixture
+def client():
+    return server.app.test_client()
+
+
+@pytest.fixture(scope='session')
+def ocr():
+    """Skip tests that need a working Tesseract install"""
+    if not server.test_tesseract():
+        pytest.skip('Tesseract is not available')
@@ -0,0 +1,112 @@
+import io
+import threading
+import time
+
+import pytest
+
+import server
+from tests.conftest import render_label
+
+
+def post_upload(client, data=None, headers=None):
+    files = {'file': (io.BytesIO(data), 'label.jpg')} if data is not None else {}
+    return client.post('/upload', data=files, content_type='multipart/form-data', headers=headers or {})
+
+
+def test_rate_limiter_allows_the_burst_then_asks_to_wait():
+    limiter = server.RateLimiter(per_minute=60, burst=2)
+    assert limiter.take('client') == 0
+    assert limiter.take('client') == 0
+    wait = limiter.take('client')
+    assert 0.9 < wait <= 1.0
+    assert limiter.take('someone else') == 0
+
+
+def test_rate_limiter_disabled_at_zero():
+    limiter = server.RateLimiter(per_minute=0, burst=1)
+    assert all(limiter.take('client') == 0 for _ in range(10))
+
+
+def test_upload_over_rate_limit_is_429_with_retry_after(client, monkeypatch):
+    monkeypatch.setattr(server, 'rate_limiter', server.RateLimiter(per_minute=6, burst=2))
+    # Requests without a file still spend a token: the limit applies before parsing
+    assert post_upload(client).status_code == 400
+    assert post_upload(client).status_code == 400
+
+    response = post_upload(client)
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) == response.get_json()['retry_after'] >= 1
+
+    # Buckets are per client
+    assert post_upload(client, headers={'X-Forwarded-For': '203.0.113.9'}).status_code == 400
+
+
+def test_admission_rejects_when_queue_is_full():
+    admission = server.AdmissionController(max_active=1, max_waiting=0, queue_timeout=1)
+    with admission.admit():
+        with pytest.raises(server.Overloaded) as excinfo:
+            with admission.admit(deadline=time.monotonic() + 30):
+                pass
+    assert excinfo.value.reason == 'queue_full'
+    assert excinfo.value.retry_after >= 1
+    assert admission.stats()['rejected'] == 1
+
+
+def test_admission_rejects_waits_that_would_miss_the_deadline():
+    admission = server.AdmissionController(max_active=1, max_waiting=4, queue_timeout=10)
+    admission.service_time = 5.0
+    with admission.admit():
+        with pytest.raises(server.Overloaded) as excinfo:
+            with admission.admit(deadline=time.monotonic() + 2):
+                pass
+    assert excinfo.value.reason == 'deadline'
+
+
+def test_admission_lets_waiters_in_when_a_slot_frees():
+    admission = server.AdmissionController(max_active=1, max_waiting=1, queue_timeout=5)
+    admitted = threading.Event()
+
+    def waiter():
+        with admission.admit(deadline=time.monotonic() + 10):
+            admitted.set()
+
+    with admission.admit():
+        thread = threading.Thread(target=waiter)
+        thread.start()
+        while not admission.stats()['waiting']:
+            time.sleep(0.005)
+        assert not admitted.is_set()
+    thread.join(5)
+    assert admitted.is_set()
+    assert admission.stats()['active'] == 0
+
+
+def test_upload_is_429_when_ocr_slots_are_taken(client, monkeypatch):
+    admission = server.AdmissionController(max_active=1, max_waiting=0)
+    monkeypatch.setattr(server, 'ocr_admission', admission)
+    with admission.admit():
+        response = post_upload(client, render_label('BUSY SERVER 429'))
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) >= 1
+    assert 'busy' in response.get_json()['error']
+
+
+def test_coalesced_ocr_waiter_gives_up_at_its_deadline(monkeypatch):
+    admission = server.AdmissionController()
+    monkeypatch.setattr(server, 'ocr_admission', admission)
+    image = server.DecodedImage.from_bytes(render_label('STUCK LEADER'))
+    key = f"{image.sha256}-{server.get_ocr_fingerprint()}"
+    release = threading.Event()
+    leader = threading.Thread(target=server.ocr_flights.do, args=(key, lambda: release.wait(5)))
+    leader.start()
+    while key not in server.ocr_flights._calls:
+        time.sleep(0.005)
+
+    try:
+        with pytest.raises(server.Overloaded) as excinfo:
+            server.extract_text_cached(image, deadline=time.monotonic() + 0.1)
+        assert excinfo.value.reason == 'timeout'
+        assert admission.stats()['rejected'] == 1
+    finally:
+        release.set()
+        leader.join(5)
@@ -0,0 +1,61 @@
+import json
+import os
+import subprocess
+import sys
+
+import bulk_ocr
+from tests.conftest import REPO_DIR, render_label
+
+
+def write_jsonl(path, entries, tail=''):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(''.join(json.dumps(entry) + '\n' for entry in entries) + tail)
+
+
+def test_trim_torn_line_keeps_whole_lines(tmp_path):
+    path = tmp_path / 'out.jsonl'
+    write_jsonl(path, [{'a': 1}, {'b': 2}], tail='{"c": 3, "trunc')
+    bulk_ocr.trim_torn_line(str(path), chunk_size=4)
+    assert bulk_ocr.read_jsonl(str(path)) == [{'a': 1}, {'b': 2}]
+
+    bulk_ocr.trim_torn_line(str(path))
+    assert path.read_text().endswith('}\n')
+
+
+def test_manifest_skips_failures_only_when_not_retrying(tmp_path):
+    path = tmp_path / 'run.manifest'
+    write_jsonl(path, [
+        {'path': '/a.jpg', 'size': 1, 'mtime': 1.0, 'status': 'ok'},
+        {'path': '/b.jpg', 'size': 2, 'mtime': 2.0, 'status': 'error'},
+    ])
+    assert bulk_ocr.load_manifest(str(path)) == {'/a.jpg': (1, 1.0), '/b.jpg': (2, 2.0)}
+    assert bulk_ocr.load_manifest(str(path), retry_errors=True) == {'/a.jpg': (1, 1.0)}
+
+
+def run_bulk(root, output, *args):
+    result = subprocess.run([sys.executable, os.path.join(REPO_DIR, 'bulk_ocr.py'), str(root),
+                             '--output', str(output), '--no-translate', '--workers', '1', *args],
+                            capture_output=True, text=True, timeout=300)
+    assert result.returncode == 0, result.stdout + result.stderr
+    return result.stdout
+
+
+def test_interrupted_run_resumes_where_it_stopped(tmp_path, ocr):
+    root = tmp_path / 'labels'
+    (root / 'nested').mkdir(parents=True)
+    (root / 'first.jpg').write_bytes(render_label('FIRST LABEL 1'))
+    (root / 'nested' / 'second.jpg').write_bytes(render_label('SECOND LABEL 2'))
+    output = tmp_path / 'results.jsonl'
+
+    assert '1 file(s) to process, 0 already done' in run_bulk(root, output, '--limit', '1')
+    assert '1 file(s) to process, 1 already done' in run_bulk(root, output)
+    assert '0 file(s) to process, 2 already done' in run_bulk(root, output)
+
+    lines = bulk_ocr.read_jsonl(str(output))
+    assert sorted(os.path.relpath(line['path'], root) for line in lines) == ['first.jpg', 'nested/second.jpg']
+    assert all('LABEL' in line['extracted_text']['best_text'] for line in lines)
+
+    # A file that changed since is done again
+    (root / 'first.jpg').write_bytes(render_label('FIRST LABEL CHANGED'))
+    assert '1 file(s) to process, 1 already done' in run_bulk(root, output)
+    assert len(bulk_ocr.read_jsonl(str(output))) == 3
@@ -0,0 +1,82 @@
+import io
+import json
+import os
+
+from PIL import Image
+
+import server
+from tests.conftest import add_upload
+
+
+def render_tiff(pages=2, size=(200, 80)):
+    """Multi-page TIFF bytes of blank pages"""
+    frames = [Image.new('L', size, 255) for _ in range(pages)]
+    buffer = io.BytesIO()
+    frames[0].save(buffer, 'TIFF', save_all=True, append_images=frames[1:])
+    return buffer.getvalue()
+
+
+def upload(client, name, data):
+    return client.post('/upload', content_type='multipart/form-data',
+                       data={'file': (io.BytesIO(data), name)})
+
+
+def stored(prefix):
+    return [name for name in os.listdir(server.UPLOAD_FOLDER) if name.startswith(prefix)]
+
+
+def test_oversized_document_is_deleted_and_not_indexed(client, monkeypatch):
+    monkeypatch.setattr(server, 'DOCUMENT_MAX_BYTES', 1024)
+    response = upload(client, 'huge_scan.tif', render_tiff() + b'\0' * 4096)
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'File too large (max 0MB)'
+    assert stored('huge_scan') == []
+    assert not any(entry['filename'].startswith('huge_scan') for entry in server.upload_store.page(0, 1000)[0])
+
+
+def test_document_with_too_many_pages_is_deleted(client, monkeypatch):
+    monkeypatch.setattr(server, 'DOCUMENT_MAX_PAGES', 1)
+    response = upload(client, 'long_scan.tif', render_tiff(pages=2))
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Too many pages (max 1)'
+    assert stored('long_scan') == []
+
+
+def test_janitor_passes_over_pinned_files(tmp_path):
+    store = server.UploadStore(str(tmp_path), max_age=3600, max_bytes=0)
+    for name in ('in_flight.tif', 'done.jpg'):
+        (tmp_path / name).write_bytes(b'x' * 10)
+    store.add('in_flight.tif', 10, pin=True)
+    store.add('done.jpg', 10)
+
+    assert store.enforce_quotas() == 1
+    assert os.listdir(tmp_path) == ['in_flight.tif']
+    assert store.stats()['total_bytes'] == 10
+
+    store.unpin('in_flight.tif')
+    assert store.enforce_quotas() == 1
+    assert os.listdir(tmp_path) == []
+
+
+def test_extract_text_streams_document_pages(client, monkeypatch):
+    monkeypatch.setattr(server, 'extract_text_cached', lambda image, deadline=None: {'best_text': 'blank'})
+    add_upload('stored_scan.tif', render_tiff(pages=3))
+
+    response = client.get('/extract_text/stored_scan.tif')
+    assert response.mimetype == 'application/x-ndjson'
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    response.close()
+    assert [line['page'] for line in lines[:-1]] == [1, 2, 3]
+    assert lines[-1] == {'summary': {'filename': 'stored_scan.tif', 'processed': 3}}
+    assert 'ETag' not in response.headers
+    assert 'stored_scan.tif' not in server.upload_store._pins
+
+
+def test_uploaded_document_is_unpinned_once_streamed(client, monkeypatch):
+    monkeypatch.setattr(server, 'process_document', lambda *args, **kwargs: iter([{'page': 1}]))
+    response = upload(client, 'pinned_scan.tif', render_tiff(pages=1))
+    filename = json.loads(response.get_data(as_text=True).splitlines()[0])['document']['filename']
+    assert filename in server.upload_store._pins
+    response.close()
+    assert filename not in server.upload_store._pins
+    assert stored('pinned_scan') == [filename]
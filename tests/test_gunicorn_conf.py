@@ -0,0 +1,45 @@
+import builtins
+import io
+import os
+import runpy
+
+from tests.conftest import REPO_DIR
+
+CONF = os.path.join(REPO_DIR, 'gunicorn.conf.py')
+
+
+def load_conf(monkeypatch, affinity=8, files=None):
+    """Run gunicorn.conf.py with a fake CPU affinity and fake cgroup files"""
+    files = files or {}
+    real_open = builtins.open
+
+    def fake_open(path, *args, **kwargs):
+        if str(path).startswith('/sys/fs/cgroup/'):
+            if path not in files:
+                raise FileNotFoundError(path)
+            return io.StringIO(files[path])
+        return real_open(path, *args, **kwargs)
+
+    monkeypatch.setattr(os, 'sched_getaffinity', lambda pid: set(range(affinity)), raising=False)
+    monkeypatch.setattr(builtins, 'open', fake_open)
+    # The config sets defaults in os.environ for the workers
+    monkeypatch.setattr(os, 'environ', {key: value for key, value in os.environ.items()
+                                         if key not in ('WEB_CONCURRENCY', 'WEB_THREADS', 'OCR_POOL_WORKERS')})
+    return runpy.run_path(CONF)
+
+
+def test_one_worker_scaled_with_threads(monkeypatch):
+    conf = load_conf(monkeypatch)
+    assert (conf['cores'], conf['workers'], conf['threads']) == (8, 1, 16)
+    assert os.environ['OCR_POOL_WORKERS'] == '8'
+
+
+def test_cgroup_v2_quota_caps_the_cores(monkeypatch):
+    conf = load_conf(monkeypatch, files={'/sys/fs/cgroup/cpu.max': '150000 100000\n'})
+    assert conf['cores'] == 2
+
+
+def test_cgroup_v1_quota_and_unlimited(monkeypatch):
+    v1 = {'/sys/fs/cgroup/cpu/cpu.cfs_quota_us': '300000\n', '/sys/fs/cgroup/cpu/cpu.cfs_period_us': '100000\n'}
+    assert load_conf(monkeypatch, files=v1)['cores'] == 3
+    assert load_conf(monkeypatch, files={'/sys/fs/cgroup/cpu.max': 'max 100000\n'})['cores'] == 8
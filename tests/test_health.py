@@ -0,0 +1,81 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+import server
+from benchmark import measure_import_time
+from tests.conftest import REPO_DIR
+
+# Cold `import server` budget in seconds, as benchmark.py --import-budget
+IMPORT_BUDGET = float(os.environ.get('IMPORT_BUDGET', 0.5))
+HEAVY_MODULES = ('cv2', 'numpy', 'pytesseract', 'tesserocr', 'pypdfium2', 'googletrans')
+
+
+def test_cold_import_is_within_budget():
+    assert measure_import_time(runs=3) <= IMPORT_BUDGET
+
+
+def test_import_leaves_heavy_modules_unloaded():
+    code = (f"import sys, json; sys.path.insert(0, {REPO_DIR!r}); import server; "
+            f"print(json.dumps([name for name in {HEAVY_MODULES!r} if name in sys.modules]))")
+    output = subprocess.check_output([sys.executable, '-c', code], text=True,
+                                     env=dict(os.environ, LOG_LEVEL='WARNING'), cwd=os.getcwd())
+    assert json.loads(output.strip().splitlines()[-1]) == []
+
+
+
+def test_benchmark_helpers_import_without_touching_the_environment():
+    code = (f"import os, sys; sys.path.insert(0, {REPO_DIR!r}); before = dict(os.environ); "
+            f"import benchmark; print(dict(os.environ) == before)")
+    env = {key: value for key, value in os.environ.items() if key not in ('TRANSLATION_BACKEND', 'OCR_CACHE_SIZE')}
+    output = subprocess.check_output([sys.executable, '-c', code], text=True, env=env, cwd=os.getcwd())
+    assert output.strip().splitlines()[-1] == 'True'
+
+
+def test_healthz_answers_without_probing(client, monkeypatch):
+    def no_probe():
+        raise AssertionError('liveness must not run probes')
+
+    monkeypatch.setattr(server, 'health_prober', server.HealthProber({'tesseract': no_probe}))
+    response = client.get('/healthz')
+    body = response.get_json()
+    assert response.status_code == 200
+    assert body['status'] == 'ok'
+    assert body['pid'] == os.getpid()
+    assert body['uptime_seconds'] >= 0
+
+
+def test_prober_caches_results_and_marks_them_stale():
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        raise RuntimeError('network down')
+
+    prober = server.HealthProber({'ok': lambda: True, 'flaky': flaky}, ttl=60)
+    status = prober.status()
+    assert status['ok']['ok'] is None and status['ok']['stale'] is True
+
+    prober.refresh()
+    status = prober.status()
+    assert status['ok']['ok'] is True and status['ok']['stale'] is False
+    assert status['flaky']['ok'] is False
+    prober.status()
+    assert len(calls) == 1  # reading the status never re-runs probes
+
+    prober.ttl = 0
+    time.sleep(0.01)
+    assert prober.status()['ok']['stale'] is True
+
+
+def test_status_endpoint_reads_the_cache(client, monkeypatch):
+    prober = server.HealthProber({'tesseract': lambda: True, 'google_translate': lambda: False})
+    monkeypatch.setattr(prober, 'start', lambda: None)  # no background refresh during the test
+    monkeypatch.setattr(server, 'health_prober', prober)
+    body = client.get('/test').get_json()
+    assert body['tesseract_working'] is None
+
+    body = client.get('/test?refresh=1').get_json()
+    assert body['tesseract_working'] is True
@@ -0,0 +1,58 @@
+import gzip
+
+import server
+from tests.conftest import add_upload, render_label
+
+
+def test_files_listing_revalidates_with_304(client):
+    add_upload('etag_a.jpg', render_label('ETAG A'))
+    response = client.get('/files')
+    etag = response.headers['ETag']
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == 'no-cache'
+
+    again = client.get('/files', headers={'If-None-Match': etag})
+    assert again.status_code == 304
+    assert again.data == b''
+
+    # A new upload changes the listing and therefore the tag
+    add_upload('etag_b.jpg', render_label('ETAG B'))
+    changed = client.get('/files', headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+
+
+def test_files_tag_depends_on_page_and_fields(client):
+    add_upload('etag_c.jpg', render_label('ETAG C'))
+    tags = {client.get(url).headers['ETag'] for url in ('/files', '/files?limit=1', '/files?fields=files')}
+    assert len(tags) == 3
+
+
+def test_file_details_revalidate_with_304(client):
+    add_upload('etag_details.jpg', render_label('DETAILS'))
+    response = client.get('/file/etag_details.jpg')
+    assert response.status_code == 200
+    assert response.get_json()['info']['width'] == 500
+    assert client.get('/file/etag_details.jpg', headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+
+
+def test_large_bodies_are_gzipped(client):
+    for index in range(20):
+        add_upload(f'gzip_{index:02d}.jpg', render_label(f'GZIP {index}'))
+    response = client.get('/files?limit=50', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert b'"gzip_00.jpg"' in gzip.decompress(response.data)
+
+
+def test_extract_text_304_skips_ocr(client, ocr, monkeypatch):
+    add_upload('etag_ocr.jpg', render_label('NOT MODIFIED 304'))
+    response = client.get('/extract_text/etag_ocr.jpg')
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+
+    def no_ocr(*args, **kwargs):
+        raise AssertionError('OCR ran for a revalidated request')
+
+    monkeypatch.setattr(server, 'extract_text_cached', no_ocr)
+    assert client.get('/extract_text/etag_ocr.jpg', headers={'If-None-Match': etag}).status_code == 304
@@ -0,0 +1,98 @@
+import threading
+
+import pytest
+
+import server
+
+
+def sse_events(response):
+    """(event, data) pairs of a server-sent events body"""
+    events = []
+    for block in response.get_data(as_text=True).split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.splitlines() if not line.startswith(':'))
+        if 'event' in fields:
+            events.append((fields['event'], server.json.loads(fields['data'])))
+    return events
+
+
+def wait_until_finished(job_id, timeout=5):
+    events, finished = [], False
+    while not finished:
+        new, finished = server.job_store.wait_events(job_id, len(events), timeout)
+        assert new or finished, 'job made no progress'
+        events += new
+    return server.job_store.get(job_id)
+
+
+def test_job_store_lifecycle():
+    store = server.JobStore(ttl=60)
+    job_id = store.create('label.jpg')
+    assert store.get(job_id)['status'] == 'queued'
+
+    store.add_event(job_id, 'saved', filename='label.jpg')
+    assert store.get(job_id)['status'] == 'queued'
+    store.add_event(job_id, 'ocr_done', characters=12)
+    assert store.get(job_id)['status'] == 'running'
+
+    store.finish(job_id, result={'ok': True})
+    job = store.get(job_id)
+    assert job['status'] == 'done' and job['result'] == {'ok': True}
+    assert [event['stage'] for event in job['events']] == ['saved', 'ocr_done', 'done']
+
+    events, finished = store.wait_events(job_id, 1, timeout=0)
+    assert finished and [event['stage'] for event in events] == ['ocr_done', 'done']
+
+
+def test_finished_jobs_expire():
+    store = server.JobStore(ttl=0)
+    job_id = store.create('old.jpg')
+    store.finish(job_id, result={})
+    store.create('new.jpg')  # creating a job sweeps expired ones
+    assert store.get(job_id) is None
+
+
+def test_job_result_and_event_stream(client):
+    release = threading.Event()
+
+    def work(progress):
+        progress('ocr_done', method_used='Grayscale', characters=5)
+        release.wait(5)
+        return {'message': 'done', 'best_text': 'HELLO'}
+
+    job_id = server.submit_upload_job('stream.jpg', work)
+    assert job_id is not None
+    assert client.get(f'/jobs/{job_id}').get_json()['status'] in ('queued', 'running')
+
+    release.set()
+    job = wait_until_finished(job_id)
+    assert job['status'] == 'done'
+
+    body = client.get(f'/jobs/{job_id}').get_json()
+    assert body['result'] == {'message': 'done', 'best_text': 'HELLO'}
+
+    response = client.get(f'/jobs/{job_id}/events')
+    assert response.mimetype == 'text/event-stream'
+    events = sse_events(response)
+    assert [stage for stage, _ in events] == ['saved', 'ocr_done', 'done']
+    assert events[1][1]['characters'] == 5
+    assert events[-1][1]['result']['best_text'] == 'HELLO'
+
+
+def test_failed_job_reports_the_error():
+    def work(progress):
+        raise RuntimeError('tesseract exploded')
+
+    job = wait_until_finished(server.submit_upload_job('broken.jpg', work))
+    assert job['status'] == 'failed'
+    assert job['error'] == 'tesseract exploded'
+
+
+def test_full_job_queue_refuses_new_jobs(monkeypatch):
+    monkeypatch.setattr(server, '_job_slots', threading.BoundedSemaphore(1))
+    server._job_slots.acquire()
+    assert server.submit_upload_job('queued.jpg', lambda progress: {}) is None
+
+
+@pytest.mark.parametrize('path', ['/jobs/missing', '/jobs/missing/events'])
+def test_unknown_jobs_are_404(client, path):
+    assert client.get(path).status_code == 404
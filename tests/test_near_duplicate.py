@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+import server
+from tests.conftest import render_label
+
+
+def stored_result(methods_tried):
+    return {'best_text': 'Paracetamol 500 mg', 'method_used': 'Grayscale', 'confidence': 91,
+            'all_results': {'Grayscale': 'Paracetamol 500 mg'}, 'osd': None,
+            'total_methods_tried': methods_tried, 'successful_methods': methods_tried}
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    """Stand-ins for matching, verification and OCR that record which ran"""
+    calls = []
+    near = [None]
+    monkeypatch.setattr(server, 'NEAR_DUPLICATE_MODE', 'verify')
+    monkeypatch.setattr(server, 'find_near_duplicate', lambda image: near[0])
+
+    def verify(image, match):
+        calls.append('verify')
+        return 1.0
+
+    def extract(image, progress=None):
+        calls.append('ocr')
+        return stored_result(1)
+
+    monkeypatch.setattr(server, 'verify_near_duplicate', verify)
+    monkeypatch.setattr(server, 'extract_text_from_image', extract)
+    return calls, near
+
+
+def test_single_variant_match_is_ocred_not_verified(pipeline):
+    calls, near = pipeline
+    near[0] = (4, 'a' * 64 + '-fp', (500, 100), stored_result(1))
+    image = server.DecodedImage.from_bytes(render_label('Paracetamol 500 mg'))
+    result = server.compute_text_uncached(image, 'key-single')
+    assert calls == ['ocr']
+    assert 'near_duplicate' not in result
+
+
+def test_multi_variant_match_is_verified_and_reused(pipeline):
+    calls, near = pipeline
+    near[0] = (4, 'b' * 64 + '-fp', (500, 100), stored_result(5))
+    image = server.DecodedImage.from_bytes(render_label('Paracetamol 500 mg'))
+    result = server.compute_text_uncached(image, 'key-multi')
+    assert calls == ['verify']
+    assert result['near_duplicate']['verified_similarity'] == 1.0
+
+
+def test_copy_turns_without_changing_the_original():
+    image = server.DecodedImage.from_bytes(render_label('Paracetamol 500 mg'))
+    gray = image.variant('gray')
+    twin = image.copy()
+    twin.rotate(90)
+    twin.use_whole_frame()
+    assert twin.rotation == 90
+    assert image.rotation == 0
+    assert image.variant('gray') is gray
+    assert twin.variant('gray').shape == gray.shape[::-1]
+    assert np.array_equal(np.rot90(gray), twin.variant('gray'))
@@ -0,0 +1,37 @@
+import server
+from tests.conftest import render_label
+
+
+def reading(method, words, confidence):
+    boxes = [(10 + 120 * i, 10, 100, 30) for i in range(len(words))]
+    ocr_words = server.OCRWords(words, boxes, [confidence] * len(words), [0] * len(words), [0] * len(words))
+    return (method, ocr_words.to_text(), confidence, None, ocr_words)
+
+
+def test_win_goes_to_the_reading_the_merged_text_came_from(monkeypatch):
+    scheduler = server.OCRVariantScheduler()
+    monkeypatch.setattr(server, 'ocr_scheduler', scheduler)
+    monkeypatch.setattr(server, 'OCR_SCHEDULE', 'early_exit')
+    # The most confident variant misreads a word the other two agree on
+    results = [reading('Original', ['Paracetamo1', '500'], 90),
+               reading('Grayscale', ['Paracetamol', '500'], 60),
+               reading('Enhanced', ['Paracetamol', '500'], 55)]
+    monkeypatch.setattr(server, 'run_ocr_plan', lambda image, progress=None: (
+        results, False, None, ['Grayscale', 'Original', 'Enhanced', 'Preprocessed', 'PSM 3']))
+
+    result = server.extract_text_from_image(server.DecodedImage.from_bytes(render_label('Paracetamol 500')))
+    assert result['best_text'] == 'Paracetamol 500'
+    assert result['method_used'] == 'Original'
+    assert scheduler.wins['Grayscale'] == 1 and scheduler.wins['Original'] == 0
+    assert all(runs == 1 for runs in scheduler.runs.values())
+
+
+def test_targeted_pass_counts_for_its_planned_variant():
+    scheduler = server.OCRVariantScheduler()
+    osd = {'targeted': ['gray', 3], 'targeted_from': 'Grayscale'}
+    winner = scheduler.credit('Targeted', osd)
+    # Grayscale's whitelisted read was dropped when OSD turned the frame
+    scheduler.record(['Grayscale', 'Grayscale'], winner, early_exit=True)
+    assert scheduler.runs['Grayscale'] == 1 and scheduler.wins['Grayscale'] == 1
+    assert 'Targeted' not in scheduler.runs and 'Targeted' not in scheduler.wins
+    assert scheduler.credit('Enhanced', osd) == 'Enhanced'
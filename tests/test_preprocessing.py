@@ -0,0 +1,38 @@
+import numpy as np
+from PIL import Image, ImageEnhance
+
+import server
+from tests.conftest import render_label
+
+
+def test_pass_through_variant_gets_no_buffer():
+    engine = server.PreprocessingEngine()
+    seen = {}
+
+    @engine.register('same', writes=False)
+    def same(gray, out):
+        seen['same'] = out
+        return gray
+
+    @engine.register('inverted')
+    def inverted(gray, out):
+        seen['inverted'] = out
+        np.subtract(255, gray, out=out)
+        return out
+
+    gray = np.arange(12, dtype=np.uint8).reshape(3, 4)
+    variants = engine.run(gray, ['same', 'inverted'])
+    assert seen['same'] is None
+    assert variants['inverted'] is seen['inverted'] and variants['inverted'][0, 0] == 255
+
+
+def test_enhanced_comes_from_the_engine_in_colour():
+    image = server.DecodedImage.from_bytes(render_label('Paracetamol 500 mg'))
+    assert server.preprocessing.source('enhanced') == 'rgb'
+    enhanced = image.variant('enhanced', batch=('gray', 'preprocessed'))
+    assert enhanced.shape == image.rgb().shape
+    assert image.variant('gray') is image.gray()
+
+    pil = Image.fromarray(image.rgb())
+    expected = ImageEnhance.Brightness(ImageEnhance.Contrast(pil).enhance(1.5)).enhance(1.1)
+    assert np.array_equal(enhanced, np.asarray(expected))
@@ -0,0 +1,126 @@
+import copy
+import threading
+import time
+
+import pytest
+
+from server import SingleFlight
+
+
+def wait_for_waiters(flight, key, count, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with flight._lock:
+            call = flight._calls.get(key)
+            if call is not None and call.waiters >= count:
+                return
+        time.sleep(0.005)
+    raise AssertionError(f"{count} follower(s) never joined")
+
+
+def run_concurrently(flight, key, func, followers):
+    """Start a leader and `followers` callers for `key`; returns their (result, shared) or exceptions"""
+    release = threading.Event()
+    outcomes = []
+    lock = threading.Lock()
+
+    def blocked():
+        release.wait(5)
+        return func()
+
+    def call():
+        try:
+            outcome = flight.do(key, blocked)
+        except Exception as e:
+            outcome = e
+        with lock:
+            outcomes.append(outcome)
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    while not flight.stats()['in_flight']:
+        time.sleep(0.005)
+    threads = [threading.Thread(target=call) for _ in range(followers)]
+    for thread in threads:
+        thread.start()
+    wait_for_waiters(flight, key, followers)
+    release.set()
+    for thread in [leader, *threads]:
+        thread.join(5)
+    return outcomes
+
+
+def test_concurrent_callers_share_one_computation():
+    flight = SingleFlight('test')
+    calls = []
+
+    def work():
+        calls.append(1)
+        return 'result'
+
+    outcomes = run_concurrently(flight, 'key', work, followers=4)
+    assert len(calls) == 1
+    assert sorted(outcomes, key=lambda outcome: outcome[1]) == [('result', False)] + [('result', True)] * 4
+    assert flight.stats() == {'in_flight': 0, 'computed': 1, 'shared': 4, 'saved_ratio': 0.8}
+
+
+def test_followers_get_their_own_copy():
+    flight = SingleFlight('test', copy_result=copy.deepcopy)
+    outcomes = run_concurrently(flight, 'key', lambda: {'words': ['a']}, followers=2)
+    results = [result for result, _ in outcomes]
+    results[0]['words'].append('changed')
+    assert [result['words'] for result in results[1:]] == [['a'], ['a']]
+    assert len({id(result) for result in results}) == 3
+
+
+def test_leader_error_reaches_followers():
+    flight = SingleFlight('test')
+
+    def fail():
+        raise ValueError('upstream down')
+
+    outcomes = run_concurrently(flight, 'key', fail, followers=2)
+    assert len(outcomes) == 3
+    assert all(isinstance(outcome, ValueError) for outcome in outcomes)
+    assert flight.stats()['in_flight'] == 0
+
+
+def test_followers_retry_after_retryable_leader_error():
+    flight = SingleFlight('test', retry_errors=(TimeoutError,))
+    calls = []
+
+    def work():
+        calls.append(1)
+        if len(calls) == 1:
+            raise TimeoutError('leader ran out of time')
+        return 'second try'
+
+    outcomes = run_concurrently(flight, 'key', work, followers=2)
+    assert isinstance(outcomes[0], TimeoutError)
+    # Each follower retries; the second may still coalesce with the first
+    assert [result for result, _ in outcomes[1:]] == ['second try', 'second try']
+    assert 2 <= len(calls) <= 3
+
+
+def test_finished_calls_are_not_cached():
+    flight = SingleFlight('test')
+    assert flight.do('key', lambda: 1) == (1, False)
+    assert flight.do('key', lambda: 2) == (2, False)
+    with pytest.raises(KeyError):
+        flight.do('other', lambda: {}['missing'])
+
+
+def test_followers_stop_waiting_at_their_deadline():
+    flight = SingleFlight('test', timeout_error=lambda: TimeoutError('busy'))
+    release = threading.Event()
+    leader = threading.Thread(target=flight.do, args=('key', lambda: release.wait(5)))
+    leader.start()
+    while not flight.stats()['in_flight']:
+        time.sleep(0.005)
+
+    start = time.monotonic()
+    with pytest.raises(TimeoutError, match='busy'):
+        flight.do('key', lambda: 'never runs', deadline=start + 0.1)
+    assert time.monotonic() - start < 1
+    release.set()
+    leader.join(5)
@@ -0,0 +1,65 @@
+import os
+
+import numpy as np
+import pytest
+
+import server
+from tests.conftest import REPO_DIR
+
+SAMPLES = os.path.join(REPO_DIR, 'uploads')
+# One of each pair of identical uploads
+SAMPLE_FILES = ['Albendazole-Picsart-BackgroundChanger_20250611_212327.jpg',
+                'Ketocol-Picsart-BackgroundChanger_20250611_212209.jpg',
+                'amodis_20250611_212141.jpg',
+                'paracetamol_5_20250611_211835.jpg',
+                'rhinil-Picsart-BackgroundChanger_20250611_212225.jpg',
+                'rhinil_20250611_211132.jpg']
+
+
+def read(filename, detect_regions, monkeypatch):
+    monkeypatch.setattr(server, 'OCR_DETECT_REGIONS', detect_regions)
+    return server.extract_text_from_image(server.DecodedImage.from_path(os.path.join(SAMPLES, filename)))
+
+
+@pytest.mark.parametrize('normalize', [True, False])
+@pytest.mark.parametrize('filename', SAMPLE_FILES)
+def test_regions_read_the_samples_as_well_as_the_whole_frame(filename, normalize, ocr, monkeypatch):
+    monkeypatch.setattr(server, 'OCR_NORMALIZE', normalize)
+    whole = read(filename, False, monkeypatch)
+    regions = read(filename, True, monkeypatch)
+    assert 'error' not in regions
+    assert len(regions['best_text'].strip()) >= len(whole['best_text'].strip())
+
+
+def test_large_lettering_means_whole_frame(monkeypatch):
+    # The brand name is several times the normalized text height
+    monkeypatch.setattr(server, 'OCR_NORMALIZE', False)
+    image = server.DecodedImage.from_path(os.path.join(SAMPLES, 'amodis_20250611_212141.jpg'))
+    assert server.detect_text_regions(image.gray()) is None
+
+
+def test_weak_region_reading_falls_back_to_the_whole_frame(ocr, monkeypatch):
+    # A box around the logo alone, as detection found before tall lettering was handled
+    monkeypatch.setattr(server, 'OCR_NORMALIZE', False)
+    image = server.DecodedImage.from_path(os.path.join(SAMPLES, 'amodis_20250611_212141.jpg'))
+    image._regions = [(813, 164, 63, 68)]
+    results = server.run_ocr_variants(image, server.OCR_VARIANTS[:1])
+    assert image.text_regions() is None
+    assert results[0][3] is None
+    assert 'Amod' in results[0][1]
+
+
+def test_merging_reaches_boxes_only_a_grown_block_overlaps():
+    # The first two merge into a block that then overlaps the third
+    boxes = [[0, 0, 50, 20], [40, 15, 200, 30], [150, 0, 180, 10], [300, 300, 350, 320]]
+    assert sorted(server.merge_overlapping_boxes(boxes)) == [[0, 0, 200, 30], [300, 300, 350, 320]]
+
+
+def test_busy_frame_is_read_whole_before_merging(monkeypatch):
+    gray = np.full((400, 800), 255, np.uint8)
+    for y in range(20, 380, 40):
+        for x in range(20, 780, 60):
+            gray[y:y + 20, x:x + 30] = 0
+    monkeypatch.setattr(server, 'OCR_MAX_REGION_CONTOURS', 50)
+    monkeypatch.setattr(server, 'merge_overlapping_boxes', lambda boxes: pytest.fail('merged a busy frame'))
+    assert server.detect_text_regions(gray) is None
@@ -0,0 +1,143 @@
+import io
+import threading
+import time
+
+import pytest
+
+import server
+from benchmark import start_translation_stand_in
+from tests.conftest import render_label
+
+
+@pytest.fixture
+def stand_in(monkeypatch):
+    """Point the translation service at a local stand-in server; yields a function that starts it"""
+    started = []
+
+    def start(latency=0.0, **kwargs):
+        httpd = start_translation_stand_in(latency)
+        backend = server.LibreTranslateBackend(f"http://127.0.0.1:{httpd.server_address[1]}/translate", **kwargs)
+        monkeypatch.setattr(server, 'translation_service', server.CachedTranslator(backend))
+        started.append((httpd, backend))
+        return backend
+
+    yield start
+    for httpd, backend in started:
+        backend.close()
+        httpd.shutdown()
+
+
+def test_translate_accepts_a_list_of_targets(client, stand_in):
+    stand_in()
+    response = client.post('/translate', json={'text': 'Take one tablet', 'target_languages': ['bn', 'hi', 'en']})
+    body = response.get_json()
+    assert response.status_code == 200
+    assert set(body['translations']) == {'bn', 'hi', 'en'}
+    assert body['translations']['hi']['translated_text'] == '[hi] Take one tablet'
+    assert body['translations']['hi']['target_language'] == 'hi'
+    assert body['translations']['bn']['bengali_text'] == '[bn] Take one tablet'
+    assert body['translation'] == body['translations']['bn']
+    assert body['incomplete'] == []
+
+
+def test_single_target_keeps_the_old_response_shape(client, stand_in):
+    stand_in()
+    body = client.post('/translate', json={'text': 'Shake well'}).get_json()
+    assert 'translations' not in body and 'incomplete' not in body
+    assert body['translation']['bengali_text'] == '[bn] Shake well'
+    assert body['translation']['translator_service'] == 'LibreTranslate'
+
+
+
+def test_comma_separated_targets_get_the_multi_target_body(client, stand_in):
+    stand_in()
+    body = client.post('/translate', json={'text': 'Shake well', 'target_language': 'bn,hi'}).get_json()
+    assert set(body['translations']) == {'bn', 'hi'}
+    assert body['incomplete'] == []
+    assert body['translation'] == body['translations']['bn']
+
+
+@pytest.mark.parametrize('targets', [['bn', 'not a language'], ['x' * 10], list('abcdefghij')])
+def test_bad_target_lists_are_400(client, targets):
+    assert client.post('/translate', json={'text': 'Hello', 'target_languages': targets}).status_code == 400
+
+
+def test_targets_are_translated_concurrently(stand_in):
+    stand_in(latency=0.3)
+    start = time.monotonic()
+    results = server.translate_text_to_languages('Store below 30C', ['bn', 'hi', 'ar'])
+    assert time.monotonic() - start < 0.8
+    assert all(result['translation_success'] for result in results.values())
+
+
+def test_slow_targets_time_out_with_partial_results(client, stand_in):
+    stand_in(latency={'fr': 2.0})
+    results = server.translate_text_to_languages('Keep dry', ['bn', 'fr'], timeout=0.5)
+    assert results['bn']['translation_success'] is True
+    assert results['fr']['translation_success'] is False
+    assert results['fr']['timed_out'] is True
+    assert results['fr']['translated_text'] == 'Keep dry'
+
+
+def test_single_target_respects_the_deadline(stand_in):
+    stand_in(latency=2.0)
+    start = time.monotonic()
+    result = server.translate_text_to_languages('Slow upstream', ['bn'], timeout=0.3)['bn']
+    assert time.monotonic() - start < 1.0
+    assert result['timed_out'] is True
+    assert result['bengali_text'] == 'Slow upstream'
+
+
+def test_incomplete_lists_timed_out_targets(client, stand_in, monkeypatch):
+    stand_in(latency={'fr': 2.0})
+    translate = server.translate_text_to_languages
+    monkeypatch.setattr(server, 'translate_text_to_languages',
+                        lambda text, targets: translate(text, targets, timeout=0.5))
+    body = client.post('/translate', json={'text': 'Keep cool', 'target_language': ['bn', 'fr']}).get_json()
+    assert body['incomplete'] == ['fr']
+    assert body['translations']['bn']['translation_success'] is True
+
+
+def test_stub_backend_counts_concurrent_calls():
+    backend = server.StubTranslationBackend()
+    barrier = threading.Barrier(8)
+
+    def translate():
+        barrier.wait()
+        for _ in range(500):
+            backend.translate_batch(['Hello'], 'bn')
+
+    threads = [threading.Thread(target=translate) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert backend.calls == 8 * 500
+
+
+def test_connections_are_kept_alive_and_reused(stand_in):
+    backend = stand_in(latency=0.01)
+    for index in range(10):
+        server.translate_text_to_languages(f'Sequential phrase {index}', ['bn'])
+    assert backend.stats()['requests'] == 10
+    assert backend.stats()['connections_opened'] == 1
+
+    threads = [threading.Thread(target=server.translate_text_to_languages, args=(f'Phrase {index}', ['bn', 'hi']))
+               for index in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert backend.stats()['requests'] == 26
+    assert backend.stats()['connections_opened'] <= server.TRANSLATION_CONCURRENCY
+
+
+def test_upload_translates_into_every_requested_language(client, stand_in, ocr):
+    stand_in()
+    response = client.post('/upload?target_languages=bn,hi', content_type='multipart/form-data',
+                           data={'file': (io.BytesIO(render_label('TRANSLATE ME')), 'label.jpg')})
+    extracted = response.get_json()['extracted_text']
+    assert set(extracted['translations']) == {'bn', 'hi'}
+    assert extracted['translation'] == extracted['translations']['bn']
+    assert client.post('/upload?target_languages=??', content_type='multipart/form-data',
+                       data={'file': (io.BytesIO(render_label('BAD')), 'bad.jpg')}).status_code == 400
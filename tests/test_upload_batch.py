@@ -0,0 +1,72 @@
+import io
+import json
+import threading
+
+import server
+from tests.conftest import render_label
+
+
+def post_batch(client, files):
+    return client.post('/upload_batch', content_type='multipart/form-data',
+                       data={'files': [(io.BytesIO(data), name) for name, data in files]})
+
+
+def ndjson(response):
+    assert response.mimetype == 'application/x-ndjson'
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_rejected_files_get_their_own_error_lines(client):
+    lines = ndjson(post_batch(client, [('notes.txt', b'hello'), ('scan.pdf', b'%PDF-1.4')]))
+    errors = {line['index']: line for line in lines[:-1]}
+    assert errors[0] == {'index': 0, 'original_name': 'notes.txt', 'error': 'Only JPG files are allowed'}
+    assert errors[1]['error'] == 'Multi-page documents must be sent to /upload'
+    assert lines[-1] == {'summary': {'total': 2, 'succeeded': 0, 'failed': 2}}
+
+
+def test_good_files_are_processed_alongside_bad_ones(client, ocr):
+    lines = ndjson(post_batch(client, [
+        ('bad.txt', b'not an image'),
+        ('good.jpg', render_label('BATCH GOOD 42')),
+        ('broken.jpg', b'\xff\xd8 not really a jpeg'),
+    ]))
+    by_index = {line['index']: line for line in lines if 'index' in line}
+    assert set(by_index) == {0, 1, 2}
+    assert 'error' in by_index[0] and 'error' in by_index[2]
+    assert 'BATCH GOOD' in by_index[1]['extracted_text']['best_text']
+    assert by_index[1]['original_name'] == 'good.jpg'
+    assert lines[-1] == {'summary': {'total': 3, 'succeeded': 1, 'failed': 2}}
+
+
+def test_batch_size_limit(client, monkeypatch):
+    monkeypatch.setattr(server, 'BATCH_MAX_FILES', 1)
+    response = post_batch(client, [('a.jpg', b'1'), ('b.jpg', b'2')])
+    assert response.status_code == 400
+    assert 'max 1' in response.get_json()['error']
+
+
+def test_batch_without_files(client):
+    response = client.post('/upload_batch', data={}, content_type='multipart/form-data')
+    assert response.status_code == 400
+
+
+def test_same_name_in_the_same_second_gets_separate_files():
+    start = threading.Barrier(8)
+    created = []
+
+    def create():
+        start.wait()
+        filename, filepath, f = server.create_upload_file('label.jpg')
+        with f:
+            f.write(filename.encode())
+        created.append((filename, filepath))
+
+    threads = [threading.Thread(target=create) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len({filename for filename, _ in created}) == 8
+    for filename, filepath in created:
+        with open(filepath, 'rb') as f:
+            assert f.read() == filename.encode()